@@ -0,0 +1,34 @@
+"""incremental_typing_profiles
+
+Revision ID: 3b9e1c7d2a40
+Revises: 685f9ecf76b5
+Create Date: 2025-08-26 18:40:12.204511
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b9e1c7d2a40'
+down_revision: Union[str, Sequence[str], None] = '685f9ecf76b5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('sessions', sa.Column('profiled', sa.Boolean(), server_default=sa.false(), nullable=False))
+    op.add_column('user_typing_profiles', sa.Column('recent_wpm', sa.Float(), nullable=True))
+    op.add_column('user_typing_profiles', sa.Column('recent_accuracy', sa.Float(), nullable=True))
+    op.create_index(op.f('ix_user_typing_profiles_user_id'), 'user_typing_profiles', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_user_typing_profiles_user_id'), table_name='user_typing_profiles')
+    op.drop_column('user_typing_profiles', 'recent_accuracy')
+    op.drop_column('user_typing_profiles', 'recent_wpm')
+    op.drop_column('sessions', 'profiled')
@@ -0,0 +1,50 @@
+"""hot_query_indexes
+
+Revision ID: 9d2f4a61c8e3
+Revises: 3b9e1c7d2a40
+Create Date: 2025-08-28 10:12:44.318207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d2f4a61c8e3'
+down_revision: Union[str, Sequence[str], None] = '3b9e1c7d2a40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _is_postgresql() -> bool:
+    return op.get_bind().dialect.name == 'postgresql'
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if _is_postgresql():
+        # build without locking writes on large tables; needs to run outside a transaction
+        with op.get_context().autocommit_block():
+            op.create_index('ix_keystroke_events_session_id_down_ts', 'keystroke_events', ['session_id', 'down_ts'],
+                            unique=False, postgresql_include=['up_ts', 'is_correction', 'is_error'],
+                            postgresql_concurrently=True, if_not_exists=True)
+            op.create_index('ix_sessions_user_id_started_at', 'sessions', ['user_id', 'started_at'],
+                            unique=False, postgresql_concurrently=True, if_not_exists=True)
+    else:
+        op.create_index('ix_keystroke_events_session_id_down_ts', 'keystroke_events', ['session_id', 'down_ts'], unique=False)
+        op.create_index('ix_sessions_user_id_started_at', 'sessions', ['user_id', 'started_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if _is_postgresql():
+        with op.get_context().autocommit_block():
+            op.drop_index('ix_sessions_user_id_started_at', table_name='sessions',
+                          postgresql_concurrently=True, if_exists=True)
+            op.drop_index('ix_keystroke_events_session_id_down_ts', table_name='keystroke_events',
+                          postgresql_concurrently=True, if_exists=True)
+    else:
+        op.drop_index('ix_sessions_user_id_started_at', table_name='sessions')
+        op.drop_index('ix_keystroke_events_session_id_down_ts', table_name='keystroke_events')
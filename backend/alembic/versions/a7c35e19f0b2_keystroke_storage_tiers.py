@@ -0,0 +1,124 @@
+"""keystroke_storage_tiers
+
+Revision ID: a7c35e19f0b2
+Revises: 9d2f4a61c8e3
+Create Date: 2025-08-30 14:03:27.551093
+
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c35e19f0b2'
+down_revision: Union[str, Sequence[str], None] = '9d2f4a61c8e3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# monthly partitions created ahead of the cutover; app.archive keeps adding them
+MONTHS_AHEAD = 2
+
+
+def _next_month(month: datetime) -> datetime:
+    return (month + timedelta(days=32)).replace(day=1)
+
+
+def _partition_keystroke_events() -> None:
+    """Turn keystroke_events into a table range-partitioned by created_at.
+
+    down_ts is a client clock (seconds since page load in the web app), so
+    the partition key is the server-assigned created_at. The existing table
+    is attached as the partition for everything before the cutover (the
+    first month boundary after now; its rows all got the migration's now()
+    as created_at), so no rows are copied. A validated CHECK constraint lets
+    the ATTACH skip its own full scan.
+    """
+    start = datetime.now(timezone.utc)
+    cutover = _next_month(start.replace(day=1, hour=0, minute=0, second=0, microsecond=0))
+    bound = f"'{cutover.isoformat()}'"
+
+    op.execute("ALTER TABLE keystroke_events RENAME TO keystroke_events_legacy")
+    op.execute("ALTER TABLE keystroke_events_legacy RENAME CONSTRAINT keystroke_events_pkey TO keystroke_events_legacy_pkey")
+    op.execute("ALTER INDEX ix_keystroke_events_id RENAME TO ix_keystroke_events_legacy_id")
+    op.execute("ALTER INDEX ix_keystroke_events_session_id_down_ts RENAME TO ix_keystroke_events_legacy_session_id_down_ts")
+
+    # the partition key has to be part of the primary key
+    op.execute("""
+        CREATE TABLE keystroke_events (
+            id INTEGER NOT NULL DEFAULT nextval('keystroke_events_id_seq'),
+            session_id INTEGER NOT NULL REFERENCES sessions (id),
+            key VARCHAR NOT NULL,
+            down_ts FLOAT NOT NULL,
+            up_ts FLOAT NOT NULL,
+            target_char VARCHAR,
+            position_in_text INTEGER,
+            is_correction VARCHAR,
+            is_error VARCHAR,
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            CONSTRAINT keystroke_events_pkey PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    op.execute("ALTER SEQUENCE keystroke_events_id_seq OWNED BY keystroke_events.id")
+    op.execute("CREATE INDEX ix_keystroke_events_id ON keystroke_events (id)")
+    op.execute("CREATE INDEX ix_keystroke_events_session_id_down_ts ON keystroke_events (session_id, down_ts) "
+               "INCLUDE (up_ts, is_correction, is_error)")
+
+    op.execute(f"ALTER TABLE keystroke_events_legacy ADD CONSTRAINT keystroke_events_legacy_range "
+               f"CHECK (created_at < {bound}) NOT VALID")
+    op.execute("ALTER TABLE keystroke_events_legacy VALIDATE CONSTRAINT keystroke_events_legacy_range")
+    op.execute(f"ALTER TABLE keystroke_events ATTACH PARTITION keystroke_events_legacy "
+               f"FOR VALUES FROM (MINVALUE) TO ({bound})")
+    op.execute("ALTER TABLE keystroke_events_legacy DROP CONSTRAINT keystroke_events_legacy_range")
+
+    month = cutover
+    for _ in range(MONTHS_AHEAD + 1):
+        upper = _next_month(month)
+        op.execute(f"CREATE TABLE keystroke_events_p{month:%Y%m} PARTITION OF keystroke_events "
+                   f"FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')")
+        month = upper
+    # rows outrunning the partitions app.archive creates ahead are still accepted
+    op.execute("CREATE TABLE keystroke_events_default PARTITION OF keystroke_events DEFAULT")
+
+
+def _unpartition_keystroke_events() -> None:
+    op.execute("CREATE TABLE keystroke_events_flat (LIKE keystroke_events INCLUDING DEFAULTS)")
+    op.execute("INSERT INTO keystroke_events_flat SELECT * FROM keystroke_events")
+    op.execute("ALTER SEQUENCE keystroke_events_id_seq OWNED BY NONE")
+    op.execute("DROP TABLE keystroke_events CASCADE")
+    op.execute("ALTER TABLE keystroke_events_flat RENAME TO keystroke_events")
+    op.execute("ALTER SEQUENCE keystroke_events_id_seq OWNED BY keystroke_events.id")
+    op.execute("ALTER TABLE keystroke_events ADD CONSTRAINT keystroke_events_pkey PRIMARY KEY (id)")
+    op.execute("ALTER TABLE keystroke_events ADD CONSTRAINT keystroke_events_session_id_fkey "
+               "FOREIGN KEY (session_id) REFERENCES sessions (id)")
+    op.execute("CREATE INDEX ix_keystroke_events_id ON keystroke_events (id)")
+    op.execute("CREATE INDEX ix_keystroke_events_session_id_down_ts ON keystroke_events (session_id, down_ts) "
+               "INCLUDE (up_ts, is_correction, is_error)")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('keystroke_archives',
+    sa.Column('session_id', sa.Integer(), nullable=False),
+    sa.Column('event_count', sa.Integer(), nullable=False),
+    sa.Column('payload', sa.LargeBinary(), nullable=False),
+    sa.Column('archived_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['session_id'], ['sessions.id'], ),
+    sa.PrimaryKeyConstraint('session_id')
+    )
+    with op.batch_alter_table('keystroke_events') as batch_op:
+        batch_op.add_column(sa.Column('created_at', sa.DateTime(timezone=True),
+                                      server_default=sa.func.now(), nullable=False))
+    if op.get_bind().dialect.name == 'postgresql':
+        _partition_keystroke_events()
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        _unpartition_keystroke_events()
+    with op.batch_alter_table('keystroke_events') as batch_op:
+        batch_op.drop_column('created_at')
+    op.drop_table('keystroke_archives')
@@ -0,0 +1,36 @@
+"""sessions_keystrokes_purged
+
+Revision ID: b6f1d9e3c852
+Revises: a2d8e4f7b615
+Create Date: 2025-09-18 09:12:40.118326
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6f1d9e3c852'
+down_revision: Union[str, Sequence[str], None] = 'a2d8e4f7b615'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('sessions', sa.Column('keystrokes_purged', sa.Boolean(), server_default=sa.false(), nullable=False))
+    # sessions whose archive retention already dropped
+    op.execute(
+        "UPDATE sessions SET keystrokes_purged = true "
+        "WHERE ended_at IS NOT NULL "
+        "AND NOT EXISTS (SELECT 1 FROM keystroke_events e WHERE e.session_id = sessions.id) "
+        "AND NOT EXISTS (SELECT 1 FROM keystroke_archives a WHERE a.session_id = sessions.id) "
+        "AND EXISTS (SELECT 1 FROM session_summaries s WHERE s.session_id = sessions.id)"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('sessions', 'keystrokes_purged')
@@ -0,0 +1,61 @@
+"""session_rollups
+
+Revision ID: c4e8f2a9b731
+Revises: a7c35e19f0b2
+Create Date: 2025-09-02 09:21:05.640318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e8f2a9b731'
+down_revision: Union[str, Sequence[str], None] = 'a7c35e19f0b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('sessions', sa.Column('duration_secs', sa.Float(), nullable=True))
+    op.add_column('sessions', sa.Column('rolled_up', sa.Boolean(), server_default=sa.false(), nullable=False))
+    op.create_table('session_rollups',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('period', sa.String(length=1), nullable=False),
+    sa.Column('period_start', sa.Date(), nullable=False),
+    sa.Column('sessions', sa.Integer(), nullable=False),
+    sa.Column('wpm_sum', sa.Float(), nullable=False),
+    sa.Column('accuracy_sum', sa.Float(), nullable=False),
+    sa.Column('best_wpm', sa.Float(), nullable=False),
+    sa.Column('practice_secs', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'period', 'period_start')
+    )
+    op.create_table('user_rollups',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('sessions', sa.Integer(), nullable=False),
+    sa.Column('wpm_sum', sa.Float(), nullable=False),
+    sa.Column('accuracy_sum', sa.Float(), nullable=False),
+    sa.Column('avg_wpm', sa.Float(), nullable=False),
+    sa.Column('avg_accuracy', sa.Float(), nullable=False),
+    sa.Column('best_wpm', sa.Float(), nullable=False),
+    sa.Column('practice_secs', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_index('ix_user_rollups_avg_wpm', 'user_rollups', ['avg_wpm'], unique=False)
+    op.create_index('ix_user_rollups_best_wpm', 'user_rollups', ['best_wpm'], unique=False)
+    # existing sessions are counted by `python -m app.rollups`
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_user_rollups_best_wpm', table_name='user_rollups')
+    op.drop_index('ix_user_rollups_avg_wpm', table_name='user_rollups')
+    op.drop_table('user_rollups')
+    op.drop_table('session_rollups')
+    op.drop_column('sessions', 'rolled_up')
+    op.drop_column('sessions', 'duration_secs')
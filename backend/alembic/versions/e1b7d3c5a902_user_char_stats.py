@@ -0,0 +1,40 @@
+"""user_char_stats
+
+Revision ID: e1b7d3c5a902
+Revises: c4e8f2a9b731
+Create Date: 2025-09-09 14:02:47.118230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1b7d3c5a902'
+down_revision: Union[str, Sequence[str], None] = 'c4e8f2a9b731'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('user_char_stats',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('char', sa.String(), nullable=False),
+    sa.Column('total_typed', sa.Integer(), nullable=False),
+    sa.Column('error_count', sa.Integer(), nullable=False),
+    sa.Column('dwell_sum', sa.Float(), nullable=False),
+    sa.Column('difficulty', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'char')
+    )
+    op.create_index('ix_user_char_stats_user_difficulty', 'user_char_stats', ['user_id', 'difficulty'], unique=False)
+    # existing sessions are counted by `python -m app.char_stats`
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_user_char_stats_user_difficulty', table_name='user_char_stats')
+    op.drop_table('user_char_stats')
@@ -0,0 +1,34 @@
+"""progress_rollups
+
+Revision ID: f3a9c2e6d184
+Revises: e1b7d3c5a902
+Create Date: 2025-09-11 10:37:52.904471
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a9c2e6d184'
+down_revision: Union[str, Sequence[str], None] = 'e1b7d3c5a902'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('session_rollups', sa.Column('error_sum', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('session_rollups', sa.Column('correction_sum', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('session_rollups', sa.Column('wpm_hist', sa.Text(), nullable=True))
+    # the new columns and the running-total ('c') rows are filled in by `python -m app.rollups`
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DELETE FROM session_rollups WHERE period = 'c'")
+    op.drop_column('session_rollups', 'wpm_hist')
+    op.drop_column('session_rollups', 'correction_sum')
+    op.drop_column('session_rollups', 'error_sum')
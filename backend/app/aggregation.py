@@ -0,0 +1,155 @@
+from collections import defaultdict
+
+from sqlalchemy import bindparam, delete, insert, select, update
+from sqlalchemy.orm import Session
+
+from . import models
+
+# Incremental per-character and per-bigram aggregation into typing_analytics.
+#
+# Each uploaded keystroke batch is folded into running sums: a row with
+# prev_char NULL aggregates every press of `char` in the session, a row with
+# prev_char set aggregates presses of `char` that directly followed
+# `prev_char` and carries their average flight time. dwell_count is the
+# number of presses a row covers.
+#
+# Batches may arrive out of order. The only events outside the batch we look
+# at are its two time-neighbours (one indexed lookup each): the bigrams
+# prev->first and last->next are added, and if the batch landed between two
+# events that used to be adjacent, their bigram is retracted. Batches are
+# assumed not to interleave in time with each other.
+
+_T = models.TypingAnalytics
+_E = models.KeystrokeEvent
+
+# delta slots: dwell_sum, count, errors, flight_sum
+_DWELL, _COUNT, _ERRORS, _FLIGHT = range(4)
+
+
+def _new_delta():
+    return [0.0, 0, 0, 0.0]
+
+
+def _add(deltas, key, dwell, is_error, flight=None, sign=1):
+    d = deltas[key]
+    d[_DWELL] += sign * dwell
+    d[_COUNT] += sign
+    d[_ERRORS] += sign * (1 if is_error else 0)
+    if flight is not None:
+        d[_FLIGHT] += sign * flight
+
+
+def batch_deltas(events, prev_event=None, next_event=None) -> dict:
+    """Per-(char, prev_char) deltas for one batch of keystrokes.
+
+    `events` and the neighbours are (key, down_ts, up_ts, is_error) tuples;
+    the batch may be in any order.
+    """
+    deltas = defaultdict(_new_delta)
+    events = sorted(events, key=lambda e: e[1])
+    before = prev_event
+    for key, down, up, is_error in events:
+        _add(deltas, (key, None), up - down, is_error)
+        if before is not None:
+            _add(deltas, (key, before[0]), up - down, is_error, flight=down - before[2])
+        before = (key, down, up, is_error)
+
+    if events and next_event is not None:
+        key, down, up, is_error = next_event
+        _add(deltas, (key, events[-1][0]), up - down, is_error, flight=down - events[-1][2])
+        if prev_event is not None:
+            # prev and next were adjacent until this batch arrived
+            _add(deltas, (key, prev_event[0]), up - down, is_error,
+                 flight=down - prev_event[2], sign=-1)
+    return deltas
+
+
+def _neighbours(db: Session, session_id: int, first_down: float, last_down: float):
+    cols = (_E.key, _E.down_ts, _E.up_ts, _E.is_error)
+    prev_event = db.execute(
+        select(*cols)
+        .where(_E.session_id == session_id, _E.down_ts < first_down)
+        .order_by(_E.down_ts.desc())
+        .limit(1)
+    ).first()
+    next_event = db.execute(
+        select(*cols)
+        .where(_E.session_id == session_id, _E.down_ts > last_down)
+        .order_by(_E.down_ts)
+        .limit(1)
+    ).first()
+    return (tuple(prev_event) if prev_event else None,
+            tuple(next_event) if next_event else None)
+
+
+def apply_deltas(db: Session, session_id: int, deltas: dict) -> None:
+    """Fold deltas into typing_analytics with one read and bulk writes."""
+    # a re-linked bigram can net to zero presses but still move the flight sum
+    deltas = {k: d for k, d in deltas.items() if any(d)}
+    if not deltas:
+        return
+
+    chars = {char for char, _ in deltas}
+    existing = {
+        (row.char, row.prev_char): row
+        for row in db.execute(
+            select(_T.id, _T.char, _T.prev_char, _T.avg_dwell_time, _T.dwell_count,
+                   _T.error_count, _T.flight_time)
+            .where(_T.session_id == session_id, _T.char.in_(chars))
+        )
+    }
+
+    inserts, updates, deletes = [], [], []
+    for (char, prev_char), d in deltas.items():
+        row = existing.get((char, prev_char))
+        old_count = row.dwell_count if row else 0
+        count = old_count + d[_COUNT]
+        if row and count <= 0:
+            deletes.append(row.id)
+            continue
+        dwell_sum = (row.avg_dwell_time * old_count if row else 0.0) + d[_DWELL]
+        flight_sum = ((row.flight_time or 0.0) * old_count if row else 0.0) + d[_FLIGHT]
+        values = {
+            "avg_dwell_time": dwell_sum / count if count else 0.0,
+            "dwell_count": count,
+            "error_count": ((row.error_count or 0) if row else 0) + d[_ERRORS],
+            "flight_time": (flight_sum / count if count else None) if prev_char is not None else None,
+        }
+        if row:
+            updates.append({"row_id": row.id, **values})
+        else:
+            inserts.append({"session_id": session_id, "char": char, "prev_char": prev_char, **values})
+
+    if inserts:
+        db.execute(insert(_T), inserts)
+    if updates:
+        table = _T.__table__
+        db.connection().execute(
+            update(table).where(table.c.id == bindparam("row_id")).values(
+                avg_dwell_time=bindparam("avg_dwell_time"),
+                dwell_count=bindparam("dwell_count"),
+                error_count=bindparam("error_count"),
+                flight_time=bindparam("flight_time"),
+            ),
+            updates,
+        )
+    if deletes:
+        db.execute(delete(_T).where(_T.id.in_(deletes)))
+
+
+def fold_keystroke_batch(db: Session, session_id: int, events) -> None:
+    """Aggregate a batch of (key, down_ts, up_ts, is_error) rows before it is inserted.
+
+    Must run before the batch's rows are flushed so the neighbour lookups
+    only see earlier batches.
+    """
+    if not events:
+        return
+    batch = [(key, down, up, bool(is_error)) for key, down, up, is_error in events]
+    downs = [e[1] for e in batch]
+    prev_event, next_event = _neighbours(db, session_id, min(downs), max(downs))
+    if prev_event:
+        prev_event = prev_event[:3] + (bool(prev_event[3]),)
+    if next_event:
+        next_event = next_event[:3] + (bool(next_event[3]),)
+    apply_deltas(db, session_id, batch_deltas(batch, prev_event, next_event))
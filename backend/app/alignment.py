@@ -0,0 +1,510 @@
+import difflib
+from collections import defaultdict
+
+from .metrics import timed
+
+# Alignment engine for typing transcripts.
+#
+# The typed text stays close to the target almost everywhere, so instead of
+# aligning the whole strings at once we walk both of them left to right,
+# skip matching runs with slice comparisons and only run a small banded
+# edit-distance (optimal string alignment, so transpositions count as one
+# error) over a window around each divergence. Isolated slips are classified
+# directly from slice comparisons; anything messier gets a window that is
+# committed up to the last point where the two strings re-synchronise, which
+# keeps the total work at O(n + errors * window * band). A skipped or pasted
+# run wider than the band would make the window drift along the wrong
+# diagonal, so divergences first look for the nearest k-mer anchor where the
+# strings agree again and, when it lies off the diagonal, align the gap up to
+# it directly. A run longer than MAX_WINDOW has no anchor in reach, so when
+# the window over it comes back garbled the stretch up to the next long
+# resync is aligned with difflib instead (matching blocks, found globally).
+
+MATCH = "="
+SUBSTITUTION = "S"
+INSERTION = "I"
+DELETION = "D"
+TRANSPOSITION = "T"
+
+WINDOW = 32        # initial window length (chars of target / typed text)
+MAX_WINDOW = 768   # past this we commit a best-effort prefix and move on
+BAND = 8           # initial diagonal band half-width
+MAX_BAND = 64
+RESYNC = 4         # consecutive matches needed to trust an alignment prefix
+ANCHOR = 12        # agreeing chars that re-find the diagonal after a long skip
+
+
+def _match_run(a: str, b: str, i: int, j: int) -> int:
+    """Length of the common run of a[i:] and b[j:], compared in slices."""
+    limit = min(len(a) - i, len(b) - j)
+    k = 0
+    step = 64
+    while step:
+        while k + step <= limit and a[i + k:i + k + step] == b[j + k:j + k + step]:
+            k += step
+        step >>= 1
+    return k
+
+
+def _align_window(t: str, u: str, band: int, end: str | None):
+    """Banded OSA alignment of two short strings.
+
+    Returns (ops, touched_band) where ops is the forward list of
+    (tag, a, b) steps in window coordinates. `end` says which sides of the
+    window are the true end of their string: "both" pins the path to the
+    corner, "row" / "col" let it stop anywhere on the last row / column
+    (the rest of the other string is a plain insertion/deletion tail) and
+    None lets it stop as soon as either side runs out, so a window cut in
+    the middle of the text doesn't produce spurious tail edits.
+    """
+    n, m = len(t), len(u)
+    if end == "both":
+        band = max(band, abs(n - m))
+    inf = n + m + 1
+    rows = []
+    prev2 = None
+    prev = [inf] * (m + 1)
+    for b in range(0, min(m, band) + 1):
+        prev[b] = b
+    rows.append(prev)
+    for a in range(1, n + 1):
+        cur = [inf] * (m + 1)
+        lo = a - band
+        hi = a + band
+        if hi > m:
+            hi = m
+        if lo <= 0:
+            cur[0] = a
+            lo = 1
+        ta = t[a - 1]
+        tp = t[a - 2] if a > 1 else None
+        for b in range(lo, hi + 1):
+            ub = u[b - 1]
+            cost = prev[b - 1] + (ta != ub)
+            x = prev[b] + 1
+            if x < cost:
+                cost = x
+            x = cur[b - 1] + 1
+            if x < cost:
+                cost = x
+            if prev2 is not None and b > 1 and ta != ub and ta == u[b - 2] and tp == ub:
+                x = prev2[b - 2] + 1
+                if x < cost:
+                    cost = x
+            cur[b] = cost
+        rows.append(cur)
+        prev2, prev = prev, cur
+
+    if end == "both":
+        a, b = n, m
+    elif end == "row":
+        # whatever is left of u after the path is inserted
+        best = None
+        for bb in range(max(0, n - band), min(m, n + band) + 1):
+            key = rows[n][bb] + m - bb
+            if best is None or key < best:
+                best, a, b = key, n, bb
+    elif end == "col":
+        best = None
+        for aa in range(max(0, m - band), min(n, m + band) + 1):
+            key = rows[aa][m] + n - aa
+            if best is None or key < best:
+                best, a, b = key, aa, m
+    else:
+        # cheapest cell on the last row / column, preferring the longest path
+        best = None
+        for bb in range(max(0, n - band), min(m, n + band) + 1):
+            key = (rows[n][bb], -(n + bb))
+            if best is None or key < best:
+                best, a, b = key, n, bb
+        for aa in range(max(0, m - band), min(n, m + band) + 1):
+            key = (rows[aa][m], -(aa + m))
+            if best is None or key < best:
+                best, a, b = key, aa, m
+
+    ops = []
+    touched = False
+    while a > 0 or b > 0:
+        if abs(a - b) >= band and not (a == n and b == m):
+            touched = True
+        d = rows[a][b]
+        if a > 0 and b > 0 and t[a - 1] == u[b - 1] and rows[a - 1][b - 1] == d:
+            ops.append((MATCH, a - 1, b - 1))
+            a -= 1
+            b -= 1
+        elif (a > 1 and b > 1 and t[a - 1] == u[b - 2] and t[a - 2] == u[b - 1]
+              and t[a - 1] != u[b - 1] and rows[a - 2][b - 2] + 1 == d):
+            ops.append((TRANSPOSITION, a - 2, b - 2))
+            a -= 2
+            b -= 2
+        elif a > 0 and b > 0 and rows[a - 1][b - 1] + 1 == d:
+            ops.append((SUBSTITUTION, a - 1, b - 1))
+            a -= 1
+            b -= 1
+        elif a > 0 and rows[a - 1][b] + 1 == d:
+            ops.append((DELETION, a - 1, b))
+            a -= 1
+        else:
+            ops.append((INSERTION, a, b - 1))
+            b -= 1
+    ops.reverse()
+    return ops, touched
+
+
+def _op_width(tag: str) -> tuple[int, int]:
+    if tag == TRANSPOSITION:
+        return 2, 2
+    if tag == DELETION:
+        return 1, 0
+    if tag == INSERTION:
+        return 0, 1
+    return 1, 1
+
+
+def _single_edit(t: str, u: str, i: int, j: int) -> str | None:
+    """Classify an isolated error at (i, j) without running the DP.
+
+    Most divergences are one slip followed by correct typing. If exactly one
+    single-edit explanation re-synchronises the strings for RESYNC chars, use
+    it; anything ambiguous or messier goes to the windowed alignment.
+    """
+    r = RESYNC
+    found = None
+    if t[i + 1:i + 1 + r] == u[j + 1:j + 1 + r]:
+        found = SUBSTITUTION
+    if t[i:i + r] == u[j + 1:j + 1 + r]:
+        if found:
+            return None
+        found = INSERTION
+    if t[i + 1:i + 1 + r] == u[j:j + r]:
+        if found:
+            return None
+        found = DELETION
+    if (i + 1 < len(t) and j + 1 < len(u) and t[i] == u[j + 1] and t[i + 1] == u[j]
+            and t[i + 2:i + 2 + r] == u[j + 2:j + 2 + r]):
+        if found:
+            return None
+        found = TRANSPOSITION
+    return found
+
+
+def _anchor(t: str, u: str, i: int, j: int, strict: bool = False) -> tuple[int, int] | None:
+    """Nearest point (i + a, j + b) from which both strings agree for a while.
+
+    "Nearest" is by max(a, b), the fewest edits that can get there, so a
+    long skipped or inserted run shows up as an anchor far off the
+    diagonal. Candidates come from ANCHOR-char k-mers; off-diagonal ones
+    (all of them when `strict`) must be followed by a clean run of
+    4 * ANCHOR or reach the end of a string, which keeps repeated words from
+    pulling the path onto the wrong copy. The search
+    reach doubles from WINDOW up to MAX_WINDOW.
+    """
+    reach = WINDOW
+    verify = 4 * ANCHOR
+    while True:
+        positions = defaultdict(list)
+        for b in range(0, min(reach, len(u) - j - ANCHOR) + 1):
+            positions[u[j + b:j + b + ANCHOR]].append(b)
+        best = None
+        for a in range(0, min(reach, len(t) - i - ANCHOR) + 1):
+            if best is not None and a > best[0]:
+                break
+            for b in positions.get(t[i + a:i + a + ANCHOR], ()):
+                if best is not None and (max(a, b), a + b) >= best[:2]:
+                    break
+                if abs(a - b) <= BAND and not strict:
+                    # near the diagonal the windowed alignment copes anyway
+                    best = (max(a, b), a + b, a, b)
+                    break
+                run = _match_run(t, u, i + a, j + b)
+                if run >= verify or i + a + run == len(t) or j + b + run == len(u):
+                    best = (max(a, b), a + b, a, b)
+                    break
+        if best is not None:
+            return best[2], best[3]
+        if reach >= MAX_WINDOW or (i + reach >= len(t) and j + reach >= len(u)):
+            return None
+        reach *= 2
+
+
+def _difflib_ops(t: str, u: str) -> list:
+    """Ops for t against u from difflib's opcodes, up to the first equal block of
+    4 * ANCHOR chars after an error (the rest is left to the fast path)."""
+    ops = []
+    matcher = difflib.SequenceMatcher(None, t, u, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            if ops and i2 - i1 >= 4 * ANCHOR:
+                break
+            ops += [(MATCH, i1 + k, j1 + k) for k in range(i2 - i1)]
+            continue
+        pairs = min(i2 - i1, j2 - j1)
+        ops += [(SUBSTITUTION, i1 + k, j1 + k) for k in range(pairs)]
+        ops += [(DELETION, a, j1 + pairs) for a in range(i1 + pairs, i2)]
+        ops += [(INSERTION, i1 + pairs, b) for b in range(j1 + pairs, j2)]
+    return ops
+
+
+def _window_ops(target_text: str, user_input: str, i: int, j: int) -> list:
+    """Aligned ops for a messy divergence at (i, j), up to the last resync."""
+    n, m = len(target_text), len(user_input)
+    window, band = WINDOW, BAND
+    while True:
+        # once a side fits in the window its true end is known and
+        # everything the path doesn't reach on the other side is tail
+        t_end = i + window >= n
+        u_end = j + window >= m
+        if t_end and u_end:
+            end = "both"
+            t = target_text[i:]
+            u = user_input[j:]
+        elif t_end:
+            end = "row"
+            t = target_text[i:]
+            u = user_input[j:j + len(t) + band]
+        elif u_end:
+            end = "col"
+            u = user_input[j:]
+            t = target_text[i:i + len(u) + band]
+        else:
+            end = None
+            t = target_text[i:i + window]
+            u = user_input[j:j + window]
+        ops, touched = _align_window(t, u, band, end)
+        if touched and band < MAX_BAND:
+            band *= 2
+            window = max(window, 4 * band)
+            continue
+        if end:
+            return ops
+        # commit up to the last error that is followed by a resync run
+        commit = 0
+        run = 0
+        for idx in range(len(ops) - 1, -1, -1):
+            if ops[idx][0] == MATCH:
+                run += 1
+            else:
+                if run >= RESYNC:
+                    commit = idx + 1
+                    break
+                run = 0
+        if commit:
+            return ops[:commit]
+        if window < MAX_WINDOW:
+            window *= 2
+            band = min(MAX_BAND, band * 2)
+            continue
+        # hopelessly garbled stretch: take the first half and move on
+        return ops[:max(1, len(ops) // 2)]
+
+
+def align(target_text: str, user_input: str) -> list[tuple[str, int, int]]:
+    """Align typed text against the target and return the error operations.
+
+    Each operation is a (tag, target_pos, input_pos) tuple where tag is one
+    of SUBSTITUTION, INSERTION, DELETION or TRANSPOSITION. Insertions carry
+    the target position the extra character was typed in front of.
+    """
+    n, m = len(target_text), len(user_input)
+    errors = []
+    i = j = 0
+    while True:
+        k = _match_run(target_text, user_input, i, j)
+        i += k
+        j += k
+        if i >= n or j >= m:
+            break
+
+        single = _single_edit(target_text, user_input, i, j)
+        if single:
+            errors.append((single, i, j))
+            wa, wb = _op_width(single)
+            i += wa
+            j += wb
+            continue
+
+        # a skipped or pasted run wider than the band: align the gap up to
+        # the anchor on its own, with the band opened to cover it. A window
+        # that comes back mostly errors has drifted off the diagonal (often
+        # onto a repeated word), so look again, trusting only long resyncs;
+        # with none in reach the run is longer than MAX_WINDOW: use difflib.
+        anchor = _anchor(target_text, user_input, i, j)
+        ops = None
+        if not anchor or abs(anchor[0] - anchor[1]) <= BAND:
+            ops = _window_ops(target_text, user_input, i, j)
+            errs = sum(1 for op in ops if op[0] != MATCH)
+            if errs > BAND and 2 * errs > len(ops):
+                anchor = _anchor(target_text, user_input, i, j, strict=True)
+                if anchor is None:
+                    ops = _difflib_ops(target_text[i:], user_input[j:])
+                elif abs(anchor[0] - anchor[1]) > BAND:
+                    ops = None
+        if ops is None:
+            a, b = anchor
+            ops, _ = _align_window(target_text[i:i + a], user_input[j:j + b], BAND, "both")
+
+        di = dj = 0
+        for tag, a, b in ops:
+            if tag != MATCH:
+                errors.append((tag, i + a, j + b))
+            wa, wb = _op_width(tag)
+            di += wa
+            dj += wb
+        i += di
+        j += dj
+
+    for a in range(i, n):
+        errors.append((DELETION, a, m))
+    for b in range(j, m):
+        errors.append((INSERTION, n, b))
+    return errors
+
+
+@timed("analyze_errors")
+def analyze_errors(target_text: str, user_input: str) -> dict:
+    """Analyze typing errors in detail."""
+    if not target_text:
+        return {
+            'total_errors': 0,
+            'substitutions': [],
+            'insertions': [],
+            'deletions': [],
+            'transpositions': [],
+            'error_positions': [],
+            'problematic_characters': {},
+            'accuracy_by_position': [],
+            'error_rate': 0,
+        }
+
+    substitutions = []
+    insertions = []
+    deletions = []
+    transpositions = []
+    error_positions = []
+    problematic_chars = defaultdict(int)
+
+    for tag, i, j in align(target_text, user_input):
+        if tag == SUBSTITUTION:
+            substitutions.append({
+                'position': i,
+                'expected': target_text[i],
+                'actual': user_input[j]
+            })
+            problematic_chars[target_text[i]] += 1
+        elif tag == DELETION:
+            deletions.append({
+                'position': i,
+                'expected': target_text[i],
+                'actual': ''
+            })
+            problematic_chars[target_text[i]] += 1
+        elif tag == INSERTION:
+            insertions.append({
+                'position': i,
+                'expected': '',
+                'actual': user_input[j]
+            })
+        else:
+            transpositions.append({
+                'position': i,
+                'expected': target_text[i:i + 2],
+                'actual': user_input[j:j + 2]
+            })
+            problematic_chars[target_text[i]] += 1
+        error_positions.append(i)
+
+    total_errors = len(error_positions)
+
+    # Positional accuracy, same definition as calculate_accuracy
+    accuracy_by_position = [1 if a == b else 0 for a, b in zip(target_text, user_input)]
+    accuracy_by_position.extend([0] * (len(target_text) - len(accuracy_by_position)))
+
+    return {
+        'total_errors': total_errors,
+        'substitutions': substitutions,
+        'insertions': insertions,
+        'deletions': deletions,
+        'transpositions': transpositions,
+        'error_positions': error_positions,
+        'problematic_characters': dict(problematic_chars),
+        'accuracy_by_position': accuracy_by_position,
+        'error_rate': (total_errors / len(target_text)) * 100
+    }
+
+
+def analyze_errors_difflib(target_text: str, user_input: str) -> dict:
+    """Previous difflib-based analysis, kept as a reference for tests and benchmarks."""
+    if not target_text:
+        return {
+            'total_errors': 0,
+            'substitutions': [],
+            'insertions': [],
+            'deletions': [],
+            'error_positions': [],
+            'problematic_characters': {},
+            'accuracy_by_position': []
+        }
+
+    matcher = difflib.SequenceMatcher(None, target_text, user_input)
+    opcodes = matcher.get_opcodes()
+
+    substitutions = []
+    insertions = []
+    deletions = []
+    error_positions = []
+    problematic_chars = defaultdict(int)
+
+    total_errors = 0
+
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag == 'replace':  # Substitution
+            for i, j in zip(range(i1, i2), range(j1, j2)):
+                target_char = target_text[i] if i < len(target_text) else ''
+                user_char = user_input[j] if j < len(user_input) else ''
+                substitutions.append({
+                    'position': i,
+                    'expected': target_char,
+                    'actual': user_char
+                })
+                problematic_chars[target_char] += 1
+                error_positions.append(i)
+                total_errors += 1
+
+        elif tag == 'delete':  # Missing characters (deletions)
+            for i in range(i1, i2):
+                deletions.append({
+                    'position': i,
+                    'expected': target_text[i],
+                    'actual': ''
+                })
+                problematic_chars[target_text[i]] += 1
+                error_positions.append(i)
+                total_errors += 1
+
+        elif tag == 'insert':  # Extra characters (insertions)
+            for j in range(j1, j2):
+                insertions.append({
+                    'position': i1,  # Position in target where extra char was inserted
+                    'expected': '',
+                    'actual': user_input[j]
+                })
+                error_positions.append(i1)
+                total_errors += 1
+
+    accuracy_by_position = []
+    for i, char in enumerate(target_text):
+        if i < len(user_input):
+            accuracy_by_position.append(1 if target_text[i] == user_input[i] else 0)
+        else:
+            accuracy_by_position.append(0)  # Missing character
+
+    return {
+        'total_errors': total_errors,
+        'substitutions': substitutions,
+        'insertions': insertions,
+        'deletions': deletions,
+        'error_positions': error_positions,
+        'problematic_characters': dict(problematic_chars),
+        'accuracy_by_position': accuracy_by_position,
+        'error_rate': (total_errors / len(target_text)) * 100 if target_text else 0
+    }
@@ -0,0 +1,118 @@
+from dataclasses import dataclass, field
+
+import numpy as np
+from sqlalchemy import Select, select
+from sqlalchemy.orm import Session
+
+from . import archive, models
+from .metrics import timed
+
+PERCENTILES = (50, 90, 95)
+
+# columns summarize_session needs, in the order they come back from the query
+SUMMARY_COLUMNS = (
+    models.KeystrokeEvent.down_ts,
+    models.KeystrokeEvent.up_ts,
+    models.KeystrokeEvent.is_correction,
+    models.KeystrokeEvent.is_error,
+)
+
+
+@dataclass
+class KeystrokeColumns:
+    """One session's keystrokes as parallel arrays, ordered by down_ts."""
+    down_ts: np.ndarray
+    up_ts: np.ndarray
+    is_correction: np.ndarray  # bool
+    is_error: np.ndarray       # bool
+    key: np.ndarray | None = None
+
+    def __len__(self) -> int:
+        return len(self.down_ts)
+
+
+@dataclass
+class KeystrokeStats:
+    count: int = 0
+    duration_secs: float = 0.0
+    avg_dwell_ms: float = 0.0
+    avg_flight_ms: float = 0.0
+    dwell_percentiles_ms: dict[str, float] = field(default_factory=dict)
+    flight_percentiles_ms: dict[str, float] = field(default_factory=dict)
+    correction_count: int = 0
+    error_keystroke_count: int = 0
+
+    def wpm(self, chars_typed: int) -> float:
+        return (chars_typed / 5) / (self.duration_secs / 60) if self.duration_secs > 0 else 0
+
+    def cpm(self, chars_typed: int) -> float:
+        return chars_typed / (self.duration_secs / 60) if self.duration_secs > 0 else 0
+
+
+def _flags(values) -> np.ndarray:
+    # same truthiness as `if e.is_correction` on the ORM objects
+    return np.array(values, dtype=object).astype(bool)
+
+
+def columns_from_rows(rows, with_keys: bool = False) -> KeystrokeColumns:
+    """Build KeystrokeColumns from (down_ts, up_ts, is_correction, is_error[, key]) rows."""
+    if not rows:
+        empty = np.empty(0, dtype=np.float64)
+        return KeystrokeColumns(empty, empty, np.empty(0, dtype=bool), np.empty(0, dtype=bool),
+                                np.empty(0, dtype=object) if with_keys else None)
+    cols = list(zip(*rows))
+    return KeystrokeColumns(
+        down_ts=np.array(cols[0], dtype=np.float64),
+        up_ts=np.array(cols[1], dtype=np.float64),
+        is_correction=_flags(cols[2]),
+        is_error=_flags(cols[3]),
+        key=np.array(cols[4], dtype=object) if with_keys else None,
+    )
+
+
+def keystroke_columns_query(session_id: int, with_keys: bool = False) -> Select:
+    """One session's SUMMARY_COLUMNS in down_ts order (served by ix_keystroke_events_session_id_down_ts)."""
+    columns = SUMMARY_COLUMNS + ((models.KeystrokeEvent.key,) if with_keys else ())
+    return (
+        select(*columns)
+        .where(models.KeystrokeEvent.session_id == session_id)
+        .order_by(models.KeystrokeEvent.down_ts)
+    )
+
+
+def load_keystroke_columns(db: Session, session_id: int, with_keys: bool = False) -> KeystrokeColumns:
+    """Fetch only the columns the analytics need, skipping ORM object construction.
+
+    Reads hot rows and, for compacted sessions, the keystroke archive.
+    """
+    rows = db.execute(keystroke_columns_query(session_id, with_keys)).all()
+    rows = archive.summary_rows(db.get(models.KeystrokeArchive, session_id), rows, with_keys)
+    return columns_from_rows(rows, with_keys)
+
+
+def _percentiles(values: np.ndarray) -> dict[str, float]:
+    if not len(values):
+        return {}
+    return {f"p{p}": float(v) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))}
+
+
+@timed("keystroke_stats")
+def keystroke_stats(cols: KeystrokeColumns) -> KeystrokeStats:
+    """Timing and flag statistics for one session in a few vectorized passes."""
+    count = len(cols)
+    if count == 0:
+        return KeystrokeStats()
+
+    dwells = (cols.up_ts - cols.down_ts) * 1000
+    flights = (cols.down_ts[1:] - cols.up_ts[:-1]) * 1000
+
+    return KeystrokeStats(
+        count=count,
+        duration_secs=float(cols.up_ts[-1] - cols.down_ts[0]),
+        avg_dwell_ms=float(dwells.mean()),
+        avg_flight_ms=float(flights.mean()) if len(flights) else 0.0,
+        dwell_percentiles_ms=_percentiles(dwells),
+        flight_percentiles_ms=_percentiles(flights),
+        correction_count=int(np.count_nonzero(cols.is_correction)),
+        error_keystroke_count=int(np.count_nonzero(cols.is_error)),
+    )
@@ -0,0 +1,228 @@
+import argparse
+import os
+import zlib
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, exists, func, select, text, update
+from sqlalchemy.orm import Session
+
+from . import keystroke_codec, models
+from .ingest import KEYSTROKE_COLUMNS
+
+# Keystroke storage tiers.
+#
+# Hot: keystroke_events, one row per event. On PostgreSQL the table is
+# range-partitioned by the server-assigned created_at (down_ts is the
+# client's clock, seconds since page load in the web app) into monthly
+# partitions named keystroke_events_pYYYYMM (see migration a7c35e19f0b2).
+#
+# Archive: once a session has been ended for COMPACT_AFTER_HOURS, and has
+# hot rows created before that same cutoff, its events are packed into one
+# keystroke_archives row (keystroke_codec columns, byte-shuffled, zlib) and
+# deleted from the hot table. A monthly partition wholly before the cutoff
+# is therefore emptied once its sessions have ended, and dropped. Archives are kept for
+# ARCHIVE_RETENTION_DAYS (0 = forever); summaries, typing_analytics and
+# profiles are never purged. A purged session is flagged keystrokes_purged:
+# its stored summary is then served as is (even from an older
+# SUMMARY_VERSION) and re-analysis skips it, since recomputing from no
+# keystrokes would zero its timing metrics.
+#
+# Readers go through summary_rows(), which merges a session's archive with
+# any hot rows uploaded after it was compacted.
+#
+# Run the job with:  python -m app.archive
+
+COMPACT_AFTER_HOURS = int(os.getenv("KEYSTROKE_COMPACT_AFTER_HOURS", "24"))
+ARCHIVE_RETENTION_DAYS = int(os.getenv("KEYSTROKE_ARCHIVE_RETENTION_DAYS", "0"))
+PARTITION_MONTHS_AHEAD = int(os.getenv("KEYSTROKE_PARTITION_MONTHS_AHEAD", "2"))
+
+_E = models.KeystrokeEvent
+_A = models.KeystrokeArchive
+_EVENT_COLUMNS = tuple(getattr(_E, name) for name in KEYSTROKE_COLUMNS[1:])
+
+
+def pack(rows) -> bytes:
+    return zlib.compress(keystroke_codec.encode(rows, shuffle=True), 6)
+
+
+def unpack(payload: bytes) -> list[tuple]:
+    """Archived rows in KEYSTROKE_COLUMNS[1:] order, sorted by down_ts."""
+    return keystroke_codec.decode(zlib.decompress(payload))
+
+
+def summary_rows(record: models.KeystrokeArchive | None, rows, with_keys: bool = False) -> list:
+    """Merge an archive with hot rows, as (down_ts, up_ts, is_correction, is_error[, key]) tuples."""
+    if record is None:
+        return rows
+    archived = [
+        (down, up, correction, error, key) if with_keys else (down, up, correction, error)
+        for key, down, up, _, _, correction, error in unpack(record.payload)
+    ]
+    if not rows:
+        return archived
+    return sorted(archived + [tuple(r) for r in rows], key=lambda r: r[0])
+
+
+def archive_session(db: Session, session_id: int) -> int:
+    """Move a session's hot rows into its archive; the caller commits.
+
+    Returns the number of rows moved. Merges into an existing archive, so
+    late uploads to an already compacted session are picked up next run.
+    """
+    rows = [tuple(r) for r in db.execute(
+        select(*_EVENT_COLUMNS).where(_E.session_id == session_id).order_by(_E.down_ts)
+    )]
+    if not rows:
+        return 0
+
+    record = db.get(_A, session_id)
+    if record is None:
+        record = _A(session_id=session_id)
+        db.add(record)
+    else:
+        rows = sorted(unpack(record.payload) + rows, key=lambda r: r[1])
+    record.event_count = len(rows)
+    record.payload = pack(rows)
+    record.archived_at = datetime.now(timezone.utc)
+
+    return db.execute(delete(_E).where(_E.session_id == session_id)).rowcount
+
+
+def compactable_sessions(db: Session, ended_before: datetime, limit: int) -> list[int]:
+    """Ended sessions that still have hot rows created before the cutoff, oldest first."""
+    S = models.Session
+    return list(db.execute(
+        select(S.id)
+        .where(S.ended_at < ended_before,
+               exists().where(_E.session_id == S.id, _E.created_at < ended_before))
+        .order_by(S.ended_at)
+        .limit(limit)
+    ).scalars())
+
+
+def compact(db: Session, ended_before: datetime, batch: int = 100) -> tuple[int, int]:
+    """Archive every session ended before `ended_before`, committing per batch."""
+    sessions = events = 0
+    while True:
+        ids = compactable_sessions(db, ended_before, batch)
+        if not ids:
+            return sessions, events
+        for sid in ids:
+            events += archive_session(db, sid)
+        db.commit()
+        sessions += len(ids)
+
+
+def purge_archives(db: Session, ended_before: datetime) -> int:
+    """Apply the retention policy: drop archives of sessions ended before the cutoff."""
+    S = models.Session
+    expired = select(_A.session_id).join(S, S.id == _A.session_id).where(S.ended_at < ended_before)
+    db.execute(update(S).where(S.id.in_(expired)).values(keystrokes_purged=True))
+    purged = db.execute(delete(_A).where(_A.session_id.in_(expired))).rowcount
+    db.commit()
+    return purged
+
+
+# ─── PostgreSQL partitions ───────────────────────────────────────────────────
+
+def _month_start(when: datetime) -> datetime:
+    return when.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _next_month(month: datetime) -> datetime:
+    return (month + timedelta(days=32)).replace(day=1)
+
+
+def partition_name(month: datetime) -> str:
+    return f"keystroke_events_p{month:%Y%m}"
+
+
+def _monthly_partitions(db: Session) -> list[str]:
+    return sorted(db.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = 'keystroke_events' AND c.relname LIKE 'keystroke\\_events\\_p%'"
+    )).scalars())
+
+
+def _partition_month(name: str) -> datetime:
+    return datetime.strptime(name[-6:], "%Y%m").replace(tzinfo=timezone.utc)
+
+
+def ensure_partitions(db: Session, now: datetime, months_ahead: int = PARTITION_MONTHS_AHEAD) -> list[str]:
+    """Extend the monthly partitions so they cover `months_ahead` months past `now`.
+
+    New partitions start after the newest existing one; everything before
+    the first monthly partition belongs to keystroke_events_legacy.
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return []
+    existing = _monthly_partitions(db)
+    month = _next_month(_partition_month(existing[-1])) if existing else _month_start(now)
+    horizon = _month_start(now)
+    for _ in range(months_ahead):
+        horizon = _next_month(horizon)
+
+    created = []
+    while month <= horizon:
+        upper = _next_month(month)
+        name = partition_name(month)
+        db.execute(text(
+            f"CREATE TABLE {name} PARTITION OF keystroke_events "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')"
+        ))
+        created.append(name)
+        month = upper
+    db.commit()
+    return created
+
+
+def drop_empty_partitions(db: Session, before: datetime) -> list[str]:
+    """Drop monthly partitions that ended before `before` and have been fully compacted."""
+    if db.get_bind().dialect.name != "postgresql":
+        return []
+    dropped = []
+    for name in _monthly_partitions(db):
+        if _next_month(_partition_month(name)) > before:
+            continue
+        if db.execute(text(f"SELECT EXISTS (SELECT 1 FROM {name})")).scalar():
+            continue
+        db.execute(text(f"DROP TABLE {name}"))
+        dropped.append(name)
+    db.commit()
+    return dropped
+
+
+def run(db: Session, now: datetime | None = None,
+        compact_after_hours: int = COMPACT_AFTER_HOURS,
+        retention_days: int = ARCHIVE_RETENTION_DAYS) -> dict:
+    """One maintenance pass: partitions ahead, compaction, retention, empty partitions."""
+    now = now or datetime.now(timezone.utc)
+    compact_before = now - timedelta(hours=compact_after_hours)
+    report = {"partitions_created": ensure_partitions(db, now)}
+    report["sessions_compacted"], report["events_compacted"] = compact(db, compact_before)
+    report["archives_purged"] = (
+        purge_archives(db, now - timedelta(days=retention_days)) if retention_days else 0
+    )
+    report["partitions_dropped"] = drop_empty_partitions(db, compact_before)
+    report["archived_sessions"] = db.execute(select(func.count()).select_from(_A)).scalar()
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compact and expire archived keystrokes.")
+    parser.add_argument("--compact-after-hours", type=int, default=COMPACT_AFTER_HOURS)
+    parser.add_argument("--retention-days", type=int, default=ARCHIVE_RETENTION_DAYS,
+                        help="drop archives of sessions older than this; 0 keeps them forever")
+    args = parser.parse_args(argv)
+
+    from .database import SessionLocal
+    with SessionLocal() as db:
+        report = run(db, compact_after_hours=args.compact_after_hours, retention_days=args.retention_days)
+    for key, value in report.items():
+        print(f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+# Verified-token cache for get_current_user.
+#
+# Maps a bearer token to the identity it proved, so repeat requests with the
+# same token skip both the JWT signature check and the users lookup. Entries
+# live for AUTH_CACHE_TTL seconds but never past the token's own `exp`, and
+# the cache keeps at most AUTH_CACHE_SIZE tokens, evicting the least
+# recently used. AUTH_CACHE_TTL=0 turns it off.
+#
+# Within one request FastAPI already resolves get_current_user once, even
+# though the typing router declares it both router-wide and per handler.
+
+CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "4096"))
+CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "60"))
+
+
+@dataclass(frozen=True, slots=True)
+class UserSnapshot:
+    """The parts of a User that request handlers need."""
+    id: int
+    email: str
+
+
+class TokenCache:
+    def __init__(self, maxsize: int = CACHE_SIZE, ttl: float = CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, UserSnapshot]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str, now: float | None = None) -> UserSnapshot | None:
+        if self.ttl <= 0:
+            return None
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            expires_at, user = entry
+            if expires_at <= now:
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return user
+
+    def put(self, token: str, user: UserSnapshot, token_exp: float | None, now: float | None = None) -> None:
+        if self.ttl <= 0:
+            return
+        now = time.time() if now is None else now
+        expires_at = now + self.ttl
+        if token_exp is not None:
+            expires_at = min(expires_at, token_exp)
+        with self._lock:
+            self._entries[token] = (expires_at, user)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+tokens = TokenCache()
@@ -0,0 +1,154 @@
+import argparse
+import os
+
+from sqlalchemy import Select, delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from . import models
+
+# Per-user, per-character totals behind /typing/analytics/character-problems.
+#
+#   user_char_stats  (user_id, char) -> total_typed, error_count, dwell_sum,
+#                    difficulty, with (user_id, difficulty) indexed
+#
+# apply_session() adds a session's typing_analytics char rows (prev_char
+# NULL, one per distinct key) to its user's totals. profiles.apply_session
+# calls it, so it runs once per session under the same `profiled` guard and
+# costs O(distinct chars), not O(keystrokes) or O(sessions). Keystrokes
+# uploaded after that (late batches to an ended, profiled session) go
+# through apply_batch() from ingest.store_rows, so the totals keep matching
+# rebuild()'s. Only single
+# characters are kept; named keys (Backspace, Shift, ...) are not
+# "characters" the user can be bad at.
+#
+# difficulty is the error rate shrunk towards 0 for rarely typed characters,
+# errors / (typed + DIFFICULTY_PRIOR), so one slip on a character typed twice
+# doesn't top the list. It is > 0 exactly when there were errors, and the
+# top-N read is a range scan of the index in difficulty order: no sort, and
+# the same cost for 10 or 10,000 sessions.
+#
+# rebuild() recomputes everything from typing_analytics (backfill):
+#
+#   python -m app.char_stats [--user ID]
+
+DIFFICULTY_PRIOR = int(os.getenv("CHAR_DIFFICULTY_PRIOR", "20"))
+
+_C = models.UserCharStat
+_T = models.TypingAnalytics
+_S = models.Session
+
+
+def difficulty(errors: int, typed: int) -> float:
+    return errors / (typed + DIFFICULTY_PRIOR)
+
+
+def _add(db: Session, user_id: int, observed: dict) -> None:
+    """Add {char: [typed, errors, dwell_sum]} to the user's totals."""
+    if not observed:
+        return
+    existing = {
+        row.char: row
+        for row in db.execute(select(_C).where(_C.user_id == user_id, _C.char.in_(list(observed)))).scalars()
+    }
+    for char, (count, errors, dwell_sum) in observed.items():
+        row = existing.get(char)
+        if row is None:
+            row = _C(user_id=user_id, char=char, total_typed=0, error_count=0, dwell_sum=0.0)
+            db.add(row)
+        row.total_typed += count
+        row.error_count += errors
+        row.dwell_sum += dwell_sum
+        row.difficulty = difficulty(row.error_count, row.total_typed)
+
+
+def apply_session(db: Session, sess: models.Session) -> None:
+    """Add one session's per-character totals to its user's; stages changes only."""
+    _add(db, sess.user_id, {
+        row.char: [row.dwell_count, row.error_count or 0, row.avg_dwell_time * row.dwell_count]
+        for row in db.execute(
+            select(_T.char, _T.dwell_count, _T.error_count, _T.avg_dwell_time)
+            .where(_T.session_id == sess.id, _T.prev_char.is_(None))
+        )
+        if len(row.char) == 1 and row.dwell_count
+    })
+
+
+def apply_batch(db: Session, user_id: int, events) -> None:
+    """Add a late batch of (key, down_ts, up_ts, is_error) rows to the user's totals; stages changes only."""
+    observed = {}
+    for key, down, up, is_error in events:
+        if len(key) != 1:
+            continue
+        totals = observed.get(key)
+        if totals is None:
+            totals = observed[key] = [0, 0, 0.0]
+        totals[0] += 1
+        totals[1] += 1 if is_error else 0
+        totals[2] += up - down
+    _add(db, user_id, observed)
+
+
+def rebuild(db: Session, user_id: int | None = None) -> int:
+    """Recompute one user's (or everyone's) totals from typing_analytics; commits.
+
+    Covers the profiled sessions, i.e. the ones apply_session has seen or
+    would have. Returns the number of (user, char) rows written.
+    """
+    where = (_T.prev_char.is_(None), func.length(_T.char) == 1, _S.profiled.is_(True))
+    if user_id is not None:
+        where += (_S.user_id == user_id,)
+        db.execute(delete(_C).where(_C.user_id == user_id))
+    else:
+        db.execute(delete(_C))
+
+    rows = db.execute(
+        select(_S.user_id, _T.char, func.sum(_T.dwell_count), func.sum(func.coalesce(_T.error_count, 0)),
+               func.sum(_T.avg_dwell_time * _T.dwell_count))
+        .join(_S, _S.id == _T.session_id)
+        .where(*where)
+        .group_by(_S.user_id, _T.char)
+        .having(func.sum(_T.dwell_count) > 0)
+    ).all()
+    if rows:
+        db.execute(insert(_C), [
+            {"user_id": uid, "char": char, "total_typed": typed, "error_count": errors,
+             "dwell_sum": dwell_sum, "difficulty": difficulty(errors, typed)}
+            for uid, char, typed, errors, dwell_sum in rows
+        ])
+    db.commit()
+    return len(rows)
+
+
+# ─── reads ───────────────────────────────────────────────────────────────────
+
+def problems_query(user_id: int, limit: int) -> Select:
+    """The user's `limit` hardest characters with at least one error, in index order."""
+    return (
+        select(_C.char, _C.error_count, _C.total_typed)
+        .where(_C.user_id == user_id, _C.difficulty > 0)
+        .order_by(_C.difficulty.desc())
+        .limit(limit)
+    )
+
+
+def character_problems(db: Session, user_id: int, limit: int) -> list[dict]:
+    return [
+        {"character": char, "error_count": errors, "total_typed": typed,
+         "error_rate": errors / typed * 100 if typed else 0.0}
+        for char, errors, typed in db.execute(problems_query(user_id, limit))
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild the per-user character totals.")
+    parser.add_argument("--user", type=int, help="only rebuild this user's totals")
+    args = parser.parse_args(argv)
+
+    from .database import SessionLocal
+    with SessionLocal() as db:
+        written = rebuild(db, args.user)
+    print(f"rows_written: {written}")
+
+
+if __name__ == "__main__":
+    main()
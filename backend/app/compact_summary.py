@@ -0,0 +1,124 @@
+import base64
+
+import numpy as np
+import orjson
+from fastapi import Response
+
+from . import http_cache, summaries
+
+# Compact SessionSummary representation (?format=compact or
+# Accept: COMPACT_MEDIA_TYPE).
+#
+# Same top-level fields as SessionSummary; only error_details changes, since
+# it is the part that grows with the text:
+#
+#   length           len(target_text)
+#   accuracy_runs    accuracy_by_position run-length encoded: the first bit,
+#                    then the lengths of alternating runs ([1, 40, 1, 9] =
+#                    40 correct, 1 wrong, 9 correct)
+#   error_bitset     base64 of the bit-packed (MSB first) set of positions
+#                    with at least one error, length + 1 bits (insertions
+#                    after the last character sit at position `length`)
+#   substitutions / insertions / deletions / transpositions
+#                    [position, expected, actual] triples instead of objects
+#
+# error_positions is dropped: it is the sorted positions of the four error
+# lists. expand() restores the full form.
+#
+# Summaries are trusted internal results, so both forms are serialized with
+# orjson straight into the Response, without a pydantic round trip.
+
+COMPACT_MEDIA_TYPE = "application/vnd.typing-coach.summary-compact+json"
+ERROR_KINDS = ("substitutions", "insertions", "deletions", "transpositions")
+
+
+def rle(bits) -> list[int]:
+    a = np.asarray(bits, dtype=np.int8)
+    if not len(a):
+        return []
+    bounds = np.concatenate(([0], np.flatnonzero(np.diff(a)) + 1, [len(a)]))
+    return [int(a[0])] + np.diff(bounds).tolist()
+
+
+def unrle(runs: list[int]) -> list[int]:
+    if not runs:
+        return []
+    lengths = runs[1:]
+    values = (np.arange(len(lengths)) + runs[0]) % 2
+    return np.repeat(values, lengths).tolist()
+
+
+def bitset(positions, length: int) -> str:
+    bits = np.zeros(length, dtype=bool)
+    bits[np.asarray(positions, dtype=np.int64)] = True
+    return base64.b64encode(np.packbits(bits)).decode("ascii")
+
+
+def unbitset(data: str, length: int) -> list[int]:
+    bits = np.unpackbits(np.frombuffer(base64.b64decode(data), dtype=np.uint8), count=length)
+    return np.flatnonzero(bits).tolist()
+
+
+def compact(summary: dict) -> dict:
+    details = summary.get("error_details")
+    if not details:
+        return summary
+    length = len(details.get("accuracy_by_position") or [])
+    packed = {
+        "total_errors": details["total_errors"],
+        "error_rate": details["error_rate"],
+        "problematic_characters": details["problematic_characters"],
+        "length": length,
+        "accuracy_runs": rle(details["accuracy_by_position"]),
+        "error_bitset": bitset(details["error_positions"], length + 1),
+    }
+    for kind in ERROR_KINDS:
+        packed[kind] = [[e["position"], e["expected"], e["actual"]] for e in details.get(kind, [])]
+    return {**summary, "error_details": packed}
+
+
+def expand(packed_summary: dict) -> dict:
+    """Inverse of compact()."""
+    packed = packed_summary.get("error_details")
+    if not packed or "accuracy_runs" not in packed:
+        return packed_summary
+    details = {
+        "total_errors": packed["total_errors"],
+        "error_rate": packed["error_rate"],
+        "problematic_characters": packed["problematic_characters"],
+        "accuracy_by_position": unrle(packed["accuracy_runs"]),
+    }
+    positions = []
+    for kind in ERROR_KINDS:
+        details[kind] = [{"position": p, "expected": e, "actual": a} for p, e, a in packed[kind]]
+        positions += [p for p, _, _ in packed[kind]]
+    details["error_positions"] = sorted(positions)
+    return {**packed_summary, "error_details": details}
+
+
+def wants_compact(format: str | None, accept: str | None) -> bool:
+    return format == "compact" or (accept is not None and COMPACT_MEDIA_TYPE in accept)
+
+
+def summary_response(summary_json: bytes, compact_mode: bool) -> Response:
+    """Serve a summary's JSON as is, or re-encoded in compact form."""
+    # the Accept header picks the representation; clients always revalidate
+    headers = {"Vary": "Accept", "Cache-Control": "private, no-cache"}
+    if compact_mode:
+        body = orjson.dumps(compact(orjson.loads(summary_json)))
+        return Response(body, media_type=COMPACT_MEDIA_TYPE, headers=headers)
+    return Response(summary_json, media_type="application/json", headers=headers)
+
+
+def stored_summary_response(payload: bytes, compact_mode: bool, if_none_match: str | None) -> Response:
+    """Serve a stored summary payload, or a 304 if the client's copy is current.
+
+    The ETag hashes the stored compressed payload, so revalidation neither
+    decompresses nor recomputes anything.
+    """
+    tag = http_cache.etag(payload, "compact" if compact_mode else "full")
+    if http_cache.matches(if_none_match, tag):
+        return http_cache.not_modified({"ETag": tag, "Vary": "Accept", "Cache-Control": "private, no-cache"})
+    response = summary_response(summaries.payload_json(payload), compact_mode)
+    response.headers["ETag"] = tag
+    return response
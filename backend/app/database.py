@@ -1,8 +1,12 @@
+import logging
 import os
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from dotenv import load_dotenv
 
+from .pooling import PoolSettings, engine_kwargs, install_sqlite_pragmas, pool_metrics
+
 # load at startup
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), "../.env"))
 
@@ -10,9 +14,13 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise RuntimeError("DATABASE_URL not set in .env")
 
-print("→ Loaded DATABASE_URL:", repr(DATABASE_URL))
+POOL_SETTINGS = PoolSettings.from_env()
 
-engine = create_engine(DATABASE_URL)
+engine = create_engine(DATABASE_URL, **engine_kwargs(DATABASE_URL, POOL_SETTINGS))
+install_sqlite_pragmas(engine, POOL_SETTINGS)
+logging.getLogger(__name__).info(
+    "database %s, pool %s", engine.url.render_as_string(hide_password=True), POOL_SETTINGS
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -22,4 +30,47 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# For dependencies that only sometimes need a session (get_current_user, on a
+# token-cache miss): the factory, with nothing opened and no threadpool hop
+async def get_session_factory() -> sessionmaker:
+    return SessionLocal
+
+# ─── Opt-in async stack (USE_ASYNC_DB=1) ──────────────────────────────────────
+# Same database through asyncpg / aiosqlite; main.py then mounts the async
+# typing handlers in front of the sync ones.
+USE_ASYNC_DB = os.getenv("USE_ASYNC_DB", "").lower() in ("1", "true", "yes")
+
+def async_url(url: str) -> str:
+    """Map a sync DATABASE_URL onto its async driver."""
+    scheme, _, rest = url.partition("://")
+    if scheme in ("postgresql", "postgresql+psycopg2", "postgres"):
+        return "postgresql+asyncpg://" + rest
+    if scheme == "sqlite":
+        return "sqlite+aiosqlite://" + rest
+    return url
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or async_url(DATABASE_URL)
+async_engine = None
+if USE_ASYNC_DB:
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL, **engine_kwargs(ASYNC_DATABASE_URL, POOL_SETTINGS, is_async=True)
+    )
+    install_sqlite_pragmas(async_engine, POOL_SETTINGS)
+# expire_on_commit=False: attribute refreshes can't lazy-load on the event loop
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_async_session_factory() -> async_sessionmaker:
+    return AsyncSessionLocal
+
+def get_pool_metrics() -> dict:
+    """Pool gauges for the sync engine and, when enabled, the async one."""
+    metrics = {"sync": pool_metrics(engine)}
+    if async_engine is not None:
+        metrics["async"] = pool_metrics(async_engine)
+    return metrics
@@ -1,24 +1,129 @@
-from fastapi import Depends, HTTPException
+from fastapi import Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
 
-from . import models, utils
-from .database import get_db
+from . import auth_cache, ingest, keystroke_codec, models, schemas, utils
+from .auth_cache import UserSnapshot
+from .database import get_async_session_factory, get_session_factory
+from .metrics import timed
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
-# dependency that turns a valid JWT into a User instance
-def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db),
-) -> models.User:
+@timed("verify_token")
+def _verify(token: str) -> tuple[int, float | None]:
     try:
-        user_id = utils.verify_access_token(token)
+        claims = utils.decode_access_token(token)
+        return int(claims["sub"]), claims.get("exp")
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
 
-    user = db.get(models.User, int(user_id))
-    if not user:
+def _user_query(user_id: int):
+    # two columns instead of a full ORM load
+    return select(models.User.id, models.User.email).where(models.User.id == user_id)
+
+def _snapshot(token: str, row, exp: float | None) -> UserSnapshot:
+    if not row:
         raise HTTPException(status_code=401, detail="User not found")
+    user = UserSnapshot(row.id, row.email)
+    auth_cache.tokens.put(token, user, exp)
+    return user
+
+def _load_user(session_factory: sessionmaker, token: str) -> UserSnapshot:
+    user_id, exp = _verify(token)
+    with session_factory() as db:
+        row = db.execute(_user_query(user_id)).first()
+    return _snapshot(token, row, exp)
+
+# dependency that turns a valid JWT into a UserSnapshot, through auth_cache;
+# a cache hit opens no session and doesn't leave the event loop
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    session_factory: sessionmaker = Depends(get_session_factory),
+) -> UserSnapshot:
+    user = auth_cache.tokens.get(token)
+    if user is not None:
+        return user
+    return await run_in_threadpool(_load_user, session_factory, token)
+
+# async twin of get_current_user for the USE_ASYNC_DB handlers
+async def get_current_user_async(
+    token: str = Depends(oauth2_scheme),
+    session_factory: async_sessionmaker = Depends(get_async_session_factory),
+) -> UserSnapshot:
+    user = auth_cache.tokens.get(token)
+    if user is not None:
+        return user
+
+    user_id, exp = _verify(token)
+    async with session_factory() as db:
+        row = (await db.execute(_user_query(user_id))).first()
+    return _snapshot(token, row, exp)
+
+_keystrokes_adapter = TypeAdapter(list[schemas.KeystrokeEventIn])
+_complete_adapter = TypeAdapter(schemas.SessionCompleteIn)
+
+def _validate_json(adapter: TypeAdapter, body: bytes):
+    # validate_json parses and validates in one pass (no dict round trip),
+    # reporting errors the way FastAPI's own body validation does
+    try:
+        return adapter.validate_json(body)
+    except ValidationError as exc:
+        raise RequestValidationError(
+            [{**err, "loc": ("body", *err["loc"])} for err in exc.errors(include_url=False)],
+            body=body,
+        )
+
+# request body for keystroke uploads: the JSON list by default, or the packed
+# columnar format when sent with keystroke_codec.KEYSTROKES_CONTENT_TYPE
+async def keystroke_rows(request: Request) -> list[tuple]:
+    body = await request.body()
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type == keystroke_codec.KEYSTROKES_CONTENT_TYPE:
+        try:
+            return keystroke_codec.decode(body)
+        except keystroke_codec.CodecError as exc:
+            raise HTTPException(status_code=422, detail=f"Invalid keystroke payload: {exc}")
+
+    return ingest.rows_from_events(_validate_json(_keystrokes_adapter, body))
+
+# request body for POST /sessions/{sid}/complete, on the same fast path
+async def complete_payload(request: Request) -> schemas.SessionCompleteIn:
+    return _validate_json(_complete_adapter, await request.body())
+
+KEYSTROKES_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {
+                "schema": {"type": "array", "items": schemas.KeystrokeEventIn.model_json_schema()},
+            },
+            keystroke_codec.KEYSTROKES_CONTENT_TYPE: {
+                "schema": {"type": "string", "format": "binary"},
+            },
+        },
+    },
+}
 
-    return user
\ No newline at end of file
+COMPLETE_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {
+                "schema": {
+                    "type": "object",
+                    "required": ["user_input"],
+                    "properties": {
+                        "keystrokes": KEYSTROKES_OPENAPI["requestBody"]["content"]["application/json"]["schema"],
+                        "user_input": {"type": "string"},
+                        "ended_at": {"type": "string", "format": "date-time"},
+                    },
+                },
+            },
+        },
+    },
+}
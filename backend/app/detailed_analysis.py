@@ -0,0 +1,223 @@
+import heapq
+import math
+import os
+import zlib
+from collections import Counter
+from datetime import datetime, timezone
+
+import orjson
+from sqlalchemy.orm import Session
+
+from . import analytics, archive, models
+from .metrics import timed
+
+# DetailedAnalysis for one session, in a single pass over its keystrokes.
+#
+# Events are read in down_ts order (streamed from keystroke_events, or
+# merged with the archive for compacted sessions) and folded into running
+# statistics as they go by: nothing per event is kept, so memory is bounded
+# by the alphabet (per-char) and its square (per-bigram), not the session
+# length.
+#
+#   * dwell per character and flight per bigram (prev_char -> char), as
+#     Welford mean / variance accumulators,
+#   * session-wide dwell, flight and key-to-key interval accumulators for the
+#     rhythm numbers (std and coefficient of variation),
+#   * a histogram of is_error / is_correction values.
+#
+# Only single characters enter the per-char and per-bigram tables; named
+# keys (Backspace, Shift, ...) still count towards rhythm and the histogram.
+#
+# difficulty_score: for a character, its mean dwell relative to the
+# session's plus ERROR_WEIGHT x its error rate (1.0 = average speed, no
+# errors); for a bigram, how many standard deviations its mean flight lies
+# above the session's. Only keys seen MIN_SAMPLES times are ranked, and the
+# top TOP_N come from a bounded heap.
+#
+# Ended sessions are immutable, so their analysis is stored in
+# session_analyses on first read (dropped with the stored summary when late
+# uploads arrive, see summaries.invalidate).
+
+ANALYSIS_VERSION = 1
+TOP_N = 10
+MIN_SAMPLES = int(os.getenv("ANALYSIS_MIN_SAMPLES", "3"))
+ERROR_WEIGHT = 2.0
+STREAM_CHUNK = 2000
+
+# improvement_areas thresholds
+SLOW_CHAR_SCORE = 1.3
+ERROR_RATE = 0.1
+SLOW_BIGRAM_SCORE = 1.0
+RHYTHM_CV = 0.5
+CORRECTION_RATE = 0.1
+
+
+class Running:
+    """Welford's online mean / variance."""
+    __slots__ = ("n", "mean", "m2")
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, x: float) -> None:
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / self.n) if self.n else 0.0
+
+    @property
+    def cv(self) -> float:
+        return self.std / self.mean if self.mean > 0 else 0.0
+
+
+class _CharStats:
+    __slots__ = ("dwell", "errors")
+
+    def __init__(self):
+        self.dwell = Running()
+        self.errors = 0
+
+
+def stream_rows(db: Session, session_id: int):
+    """(down_ts, up_ts, is_correction, is_error, key) rows in down_ts order, streamed when possible."""
+    query = analytics.keystroke_columns_query(session_id, with_keys=True)
+    record = db.get(models.KeystrokeArchive, session_id)
+    if record is None:
+        return db.execute(query.execution_options(yield_per=STREAM_CHUNK))
+    return archive.summary_rows(record, db.execute(query).all(), with_keys=True)
+
+
+@timed("detailed_analysis")
+def analyse(session_id: int, events) -> dict:
+    """DetailedAnalysis for (down_ts, up_ts, is_correction, is_error, key) events in down_ts order."""
+    chars: dict[str, _CharStats] = {}
+    bigrams: dict[str, Running] = {}
+    dwell, flight, interval = Running(), Running(), Running()
+    histogram = Counter()
+    corrections = 0
+    prev_key = prev_down = prev_up = None
+
+    for down, up, is_correction, is_error, key in events:
+        d = (up - down) * 1000
+        dwell.add(d)
+        single = len(key) == 1
+        if single:
+            stats = chars.get(key)
+            if stats is None:
+                stats = chars[key] = _CharStats()
+            stats.dwell.add(d)
+            if is_error:
+                stats.errors += 1
+        if is_error:
+            histogram[f"error:{is_error}"] += 1
+        if is_correction:
+            histogram[f"correction:{is_correction}"] += 1
+            corrections += 1
+        if prev_key is not None:
+            f = (down - prev_up) * 1000
+            flight.add(f)
+            interval.add((down - prev_down) * 1000)
+            if single and len(prev_key) == 1:
+                pair = prev_key + key
+                running = bigrams.get(pair)
+                if running is None:
+                    running = bigrams[pair] = Running()
+                running.add(f)
+        prev_key, prev_down, prev_up = key, down, up
+
+    slow_characters = heapq.nlargest(TOP_N, (
+        {
+            "char": char,
+            "avg_dwell_time": s.dwell.mean,
+            "dwell_count": s.dwell.n,
+            "error_count": s.errors,
+            "difficulty_score": (s.dwell.mean / dwell.mean if dwell.mean > 0 else 1.0)
+                                + ERROR_WEIGHT * s.errors / s.dwell.n,
+        }
+        for char, s in chars.items() if s.dwell.n >= MIN_SAMPLES
+    ), key=lambda c: c["difficulty_score"])
+
+    flight_std = flight.std
+    difficult_bigrams = heapq.nlargest(TOP_N, (
+        {
+            "bigram": pair,
+            "avg_flight_time": r.mean,
+            "count": r.n,
+            "difficulty_score": (r.mean - flight.mean) / flight_std if flight_std > 0 else 0.0,
+        }
+        for pair, r in bigrams.items() if r.n >= MIN_SAMPLES
+    ), key=lambda b: b["difficulty_score"])
+
+    rhythm = {
+        "keystrokes": float(dwell.n),
+        "mean_dwell_ms": dwell.mean,
+        "dwell_std_ms": dwell.std,
+        "dwell_cv": dwell.cv,
+        "mean_flight_ms": flight.mean,
+        "flight_std_ms": flight_std,
+        "flight_cv": flight.cv,
+        "mean_interval_ms": interval.mean,
+        "interval_std_ms": interval.std,
+        "interval_cv": interval.cv,
+        "correction_rate": corrections / dwell.n if dwell.n else 0.0,
+    }
+    return {
+        "session_id": session_id,
+        "slow_characters": slow_characters,
+        "difficult_bigrams": difficult_bigrams,
+        "common_errors": dict(histogram.most_common()),
+        "typing_rhythm": rhythm,
+        "improvement_areas": improvement_areas(slow_characters, difficult_bigrams, rhythm),
+    }
+
+
+def _quoted(keys) -> str:
+    return ", ".join(repr(k) for k in keys)
+
+
+def improvement_areas(slow_characters: list[dict], difficult_bigrams: list[dict], rhythm: dict) -> list[str]:
+    """Plain-language suggestions from the analysis, most specific first."""
+    areas = []
+    slow = [c["char"] for c in slow_characters if c["difficulty_score"] >= SLOW_CHAR_SCORE][:3]
+    if slow:
+        areas.append(f"Practise the characters you hesitate on: {_quoted(slow)}.")
+    error_prone = [c["char"] for c in slow_characters if c["error_count"] / c["dwell_count"] >= ERROR_RATE][:3]
+    if error_prone:
+        areas.append(f"Accuracy drops on {_quoted(error_prone)}; slow down on them until they are clean.")
+    pairs = [b["bigram"] for b in difficult_bigrams if b["difficulty_score"] >= SLOW_BIGRAM_SCORE][:3]
+    if pairs:
+        areas.append(f"Drill the transitions {_quoted(pairs)}.")
+    if rhythm["interval_cv"] > RHYTHM_CV:
+        areas.append(f"Aim for a steadier rhythm: the time between keystrokes varies by "
+                     f"{rhythm['interval_cv']:.0%} around its mean.")
+    if rhythm["correction_rate"] > CORRECTION_RATE:
+        areas.append(f"{rhythm['correction_rate']:.0%} of keystrokes were corrections: "
+                     f"favour accuracy over speed for a while.")
+    if not areas and rhythm["keystrokes"]:
+        areas.append("A consistent session: try a longer or harder passage.")
+    return areas
+
+
+def get_stored_json(db: Session, session_id: int, user_id: int) -> bytes | None:
+    """The stored analysis JSON for one of the user's sessions, if it is current."""
+    row = db.get(models.SessionAnalysisCache, session_id)
+    if not row or row.user_id != user_id or row.version != ANALYSIS_VERSION:
+        return None
+    return zlib.decompress(row.payload)
+
+
+def store(db: Session, session: models.Session, analysis: dict) -> None:
+    """Stage the analysis for `session`; the caller commits."""
+    row = db.get(models.SessionAnalysisCache, session.id)
+    if row is None:
+        row = models.SessionAnalysisCache(session_id=session.id, user_id=session.user_id)
+        db.add(row)
+    row.version = ANALYSIS_VERSION
+    row.payload = zlib.compress(orjson.dumps(analysis))
+    row.computed_at = datetime.now(timezone.utc)
@@ -0,0 +1,85 @@
+import base64
+from datetime import datetime
+
+from sqlalchemy import Select, and_, or_, select
+from sqlalchemy.orm import Session
+
+from . import models
+
+# A user's ended sessions, newest first.
+#
+# Pages are keyset-paginated on (started_at, id) so every page is an index
+# range scan on ix_sessions_user_id_started_at, however deep the client
+# pages. The cursor is opaque to clients: base64 of "<started_at>|<id>" of
+# the last row returned.
+
+_S = models.Session
+HISTORY_COLUMNS = (
+    _S.id, _S.started_at, _S.ended_at, _S.target_text, _S.words_per_minute,
+    _S.accuracy_percentage, _S.error_count, _S.correction_count,
+)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(started_at: datetime, session_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{started_at.isoformat()}|{session_id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        started_at, session_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(started_at), int(session_id)
+    except ValueError as exc:
+        raise InvalidCursor(cursor) from exc
+
+
+def _ended_sessions(user_id: int) -> Select:
+    return (
+        select(*HISTORY_COLUMNS)
+        .where(_S.user_id == user_id, _S.ended_at.is_not(None))
+        .order_by(_S.started_at.desc(), _S.id.desc())
+    )
+
+
+def _item(row) -> dict:
+    return dict(row._mapping)
+
+
+def page_query(user_id: int, cursor: str | None = None, since: datetime | None = None,
+               until: datetime | None = None, min_wpm: float | None = None) -> Select:
+    """History rows after `cursor`, newest first, with the optional filters applied."""
+    query = _ended_sessions(user_id)
+    if cursor:
+        started_at, session_id = decode_cursor(cursor)
+        query = query.where(or_(
+            _S.started_at < started_at,
+            and_(_S.started_at == started_at, _S.id < session_id),
+        ))
+    if since is not None:
+        query = query.where(_S.started_at >= since)
+    if until is not None:
+        query = query.where(_S.started_at < until)
+    if min_wpm is not None:
+        query = query.where(_S.words_per_minute >= min_wpm)
+    return query
+
+
+def page(db: Session, user_id: int, limit: int, cursor: str | None = None,
+         since: datetime | None = None, until: datetime | None = None,
+         min_wpm: float | None = None) -> dict:
+    """One page of history plus the cursor of the next page (None on the last)."""
+    rows = db.execute(page_query(user_id, cursor, since, until, min_wpm).limit(limit + 1)).all()
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "sessions": [_item(r) for r in rows],
+        "next_cursor": encode_cursor(rows[-1].started_at, rows[-1].id) if more else None,
+    }
+
+
+def offset_page(db: Session, user_id: int, limit: int, offset: int) -> list[dict]:
+    """LIMIT/OFFSET variant kept for the existing client; prefer page()."""
+    return [_item(r) for r in db.execute(_ended_sessions(user_id).limit(limit).offset(offset))]
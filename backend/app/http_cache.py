@@ -0,0 +1,180 @@
+import gzip
+import hashlib
+import os
+
+from fastapi import Response
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # optional: without it only gzip is offered
+    brotli = None
+
+# Conditional GET and response compression for the read endpoints.
+#
+#   * ConditionalGetMiddleware: single-chunk 200 GET responses get a strong
+#     ETag (a hash of the body); a matching If-None-Match turns the response
+#     into a bodyless 304. That saves the bytes, not the handler's work, so
+#     endpoints whose content is immutable check If-None-Match themselves
+#     from a cheap tag (the summary endpoint hashes the stored zlib payload
+#     and answers 304 without decompressing, let alone recomputing, the
+#     summary). Responses that already carry an ETag are such endpoints'
+#     and pass through untouched: no buffering, no hashing.
+#   * CompressionMiddleware: JSON / text bodies of at least
+#     COMPRESS_MIN_BYTES are compressed with the best coding the client
+#     accepts, brotli if it is installed, else gzip. The ETag is weakened
+#     (W/"...") on the way out, as the bytes differ from the ones it names;
+#     If-None-Match uses weak comparison, so revalidation still matches.
+#
+# Both only handle responses sent in one body message (everything but
+# StreamingResponse), which is every JSON endpoint here; streamed bodies
+# pass through untouched.
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+
+# headers a 304 keeps (RFC 9110 15.4.5)
+_NOT_MODIFIED_HEADERS = ("cache-control", "content-location", "date", "etag", "expires", "vary")
+
+
+def etag(data: bytes, variant: str = "") -> str:
+    """Strong, content-addressed entity tag for `data` (plus a representation variant)."""
+    digest = hashlib.blake2b(data, digest_size=12)
+    digest.update(variant.encode())
+    return f'"{digest.hexdigest()}"'
+
+
+def matches(if_none_match: str | None, tag: str) -> bool:
+    """Weak comparison of `tag` against an If-None-Match header value."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tag = tag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == tag for candidate in if_none_match.split(","))
+
+
+def not_modified(headers: dict[str, str]) -> Response:
+    """Bodyless 304 carrying the validator and caching headers of the full response."""
+    kept = {k: v for k, v in headers.items() if k.lower() in _NOT_MODIFIED_HEADERS}
+    return Response(status_code=304, headers=kept)
+
+
+def negotiate(accept_encoding: str | None) -> str | None:
+    """The content coding to use for an Accept-Encoding value, or None for identity."""
+    if not accept_encoding:
+        return None
+    weights = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[coding.strip().lower()] = q
+    offered = ("br", "gzip") if brotli is not None else ("gzip",)
+    best, best_q = None, 0.0
+    for coding in offered:
+        q = weights.get(coding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(coding: str, body: bytes) -> bytes:
+    if coding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def compressible(content_type: str | None) -> bool:
+    if not content_type:
+        return False
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    return media_type.startswith("text/") or media_type.endswith("json")
+
+
+class ConditionalGetMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            return await self.app(scope, receive, send)
+
+        if_none_match = Headers(scope=scope).get("if-none-match")
+        held = []
+
+        async def tagging_send(message):
+            if message["type"] == "http.response.start":
+                if "etag" in Headers(raw=message["headers"]):
+                    # the endpoint tagged it and checked If-None-Match itself
+                    return await send(message)
+                held.append(message)
+                return
+            if message["type"] != "http.response.body" or not held:
+                return await send(message)
+            start = held.pop()
+            if start["status"] != 200 or message.get("more_body", False):
+                await send(start)
+                return await send(message)
+            headers = MutableHeaders(raw=start["headers"])
+            tag = headers["ETag"] = etag(message.get("body", b""))
+            if matches(if_none_match, tag):
+                response = not_modified(dict(headers.items()))
+                await send({"type": "http.response.start", "status": 304, "headers": response.raw_headers})
+                return await send({"type": "http.response.body", "body": b""})
+            await send(start)
+            await send(message)
+
+        await self.app(scope, receive, tagging_send)
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = COMPRESS_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        coding = negotiate(Headers(scope=scope).get("accept-encoding"))
+        if coding is None:
+            return await self.app(scope, receive, send)
+
+        held = []
+
+        async def compressing_send(message):
+            if message["type"] == "http.response.start":
+                held.append(message)
+                return
+            if message["type"] != "http.response.body" or not held:
+                return await send(message)
+            start = held.pop()
+            headers = MutableHeaders(raw=start["headers"])
+            body = message.get("body", b"")
+            if (message.get("more_body", False) or len(body) < self.minimum_size
+                    or "content-encoding" in headers or not compressible(headers.get("content-type"))):
+                await send(start)
+                return await send(message)
+            body = compress(coding, body)
+            headers["Content-Encoding"] = coding
+            headers["Content-Length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            tag = headers.get("etag")
+            if tag and not tag.startswith("W/"):
+                headers["ETag"] = "W/" + tag
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, compressing_send)
+
+
+def install(app) -> None:
+    """Add conditional GET and compression to `app`; call before metrics.install."""
+    app.add_middleware(ConditionalGetMiddleware)
+    app.add_middleware(CompressionMiddleware)
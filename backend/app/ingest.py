@@ -0,0 +1,116 @@
+import io
+
+from sqlalchemy import event, insert
+from sqlalchemy.orm import Session
+
+from . import aggregation, char_stats, live, metrics, models, summaries
+
+# Keystroke ingestion straight into keystroke_events.
+#
+# Events travel as plain tuples in KEYSTROKE_COLUMNS order (minus
+# session_id) from the validated payload to the database: PostgreSQL via
+# psycopg2 gets a COPY FROM STDIN, every other backend a Core executemany
+# INSERT. No KeystrokeEvent objects are built on the way.
+#
+# Batches for open sessions are also fed to the in-memory live state, but
+# only once the caller's transaction commits: the events wait in
+# db.info[_LIVE_PENDING] and are dropped if it rolls back, so /live never
+# shows keystrokes that were not stored.
+
+KEYSTROKE_COLUMNS = (
+    "session_id", "key", "down_ts", "up_ts",
+    "target_char", "position_in_text", "is_correction", "is_error",
+)
+
+_table = models.KeystrokeEvent.__table__
+_LIVE_PENDING = "live_pending"
+
+
+def rows_from_events(events) -> list[tuple]:
+    """KeystrokeEventIn objects -> tuples in KEYSTROKE_COLUMNS[1:] order."""
+    return [
+        (e.key, e.down_ts, e.up_ts, e.target_char, e.position_in_text, e.is_correction, e.is_error)
+        for e in events
+    ]
+
+
+def _copy_field(value) -> str:
+    if value is None:
+        return "\\N"
+    if isinstance(value, float):
+        return repr(value)
+    return (str(value).replace("\\", "\\\\").replace("\t", "\\t")
+            .replace("\n", "\\n").replace("\r", "\\r"))
+
+
+def copy_payload(session_id: int, rows) -> io.StringIO:
+    """COPY ... FROM STDIN text-format payload for a batch."""
+    sid = str(session_id)
+    buf = io.StringIO()
+    buf.writelines(
+        sid + "\t" + "\t".join(map(_copy_field, row)) + "\n"
+        for row in rows
+    )
+    buf.seek(0)
+    return buf
+
+
+def insert_rows(db: Session, session_id: int, rows) -> None:
+    """Bulk insert keystroke rows using the fastest path the backend offers."""
+    if not rows:
+        return
+    conn = db.connection()
+    if conn.dialect.name == "postgresql" and conn.dialect.driver == "psycopg2":
+        cursor = conn.connection.dbapi_connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY {_table.name} ({', '.join(KEYSTROKE_COLUMNS)}) FROM STDIN",
+                copy_payload(session_id, rows),
+            )
+        finally:
+            cursor.close()
+    else:
+        names = KEYSTROKE_COLUMNS[1:]
+        conn.execute(
+            insert(_table),
+            [{"session_id": session_id, **dict(zip(names, row))} for row in rows],
+        )
+
+
+def store_rows(db: Session, session: models.Session, rows) -> int:
+    """Stage a batch of keystroke tuples for `session`; the caller commits."""
+    sid = session.id
+
+    # fold into per-char / bigram aggregates before the rows are inserted
+    events = [(r[0], r[1], r[2], r[6]) for r in rows]
+    aggregation.fold_keystroke_batch(db, sid, events)
+    if session.profiled:
+        # the session is already in its user's character totals; add the late batch too
+        char_stats.apply_batch(db, session.user_id, events)
+
+    insert_rows(db, sid, rows)
+    metrics.KEYSTROKES.inc(len(rows))
+    if session.ended_at:
+        summaries.invalidate(db, sid)
+    else:
+        db.info.setdefault(_LIVE_PENDING, []).append((sid, [(r[0], r[1], r[2]) for r in rows]))
+    return len(rows)
+
+
+@event.listens_for(Session, "after_commit")
+def _feed_committed(db: Session) -> None:
+    for sid, events in db.info.pop(_LIVE_PENDING, ()):
+        live.store.feed(sid, events)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_rolled_back(db: Session) -> None:
+    db.info.pop(_LIVE_PENDING, None)
+
+
+def store_keystrokes(db: Session, session: models.Session, events) -> int:
+    """Stage a batch of KeystrokeEventIn for `session`; the caller commits.
+
+    Shared by the JSON upload endpoint and the streaming socket.
+    """
+    return store_rows(db, session, rows_from_events(events))
@@ -0,0 +1,148 @@
+import struct
+
+import numpy as np
+
+# Packed columnar keystroke batches (Content-Type: KEYSTROKES_CONTENT_TYPE).
+#
+# Layout, all little-endian, N events and K distinct key strings:
+#
+#   header   16 bytes  b"KST1", uint32 N, uint32 K, uint32 flags
+#   down_ts  N float64
+#   up_ts    N float64
+#   position N int32    position_in_text, -1 for null
+#   key      N uint16   index into the key table
+#   target   N uint16   target_char index into the key table, 0xFFFF for null
+#   correction N uint8  index into CORRECTION_CODES
+#   error    N uint8    index into ERROR_CODES
+#   key table K x (uint8 byte length, UTF-8 bytes)
+#
+# Fixed-width columns come first so they decode as numpy views over the
+# request body without copying.
+#
+# With FLAG_SHUFFLED each fixed-width column is stored byte-transposed (all
+# first bytes, then all second bytes, ...). Neighbouring timestamps share
+# their high bytes, so a shuffled batch compresses ~3x better under zlib;
+# the keystroke archive uses it, uploads normally don't.
+
+KEYSTROKES_CONTENT_TYPE = "application/vnd.typing-coach.keystrokes"
+
+MAGIC = b"KST1"
+_HEADER = struct.Struct("<4sIII")
+FLAG_SHUFFLED = 1
+NULL_POSITION = -1
+NULL_INDEX = 0xFFFF
+
+CORRECTION_CODES = (None, "backspace", "delete")
+ERROR_CODES = (None, "substitution", "insertion", "deletion", "transposition")
+
+_COLUMNS = (
+    ("down_ts", "<f8"),
+    ("up_ts", "<f8"),
+    ("position", "<i4"),
+    ("key", "<u2"),
+    ("target", "<u2"),
+    ("correction", "u1"),
+    ("error", "u1"),
+)
+
+
+class CodecError(ValueError):
+    pass
+
+
+def _shuffle(column: np.ndarray) -> bytes:
+    return column.view(np.uint8).reshape(len(column), column.itemsize).T.tobytes()
+
+
+def encode(rows, shuffle: bool = False) -> bytes:
+    """Pack (key, down_ts, up_ts, target_char, position_in_text, is_correction, is_error) rows."""
+    rows = list(rows)
+    table: dict[str, int] = {}
+
+    def index(value):
+        if value is None:
+            return NULL_INDEX
+        return table.setdefault(value, len(table))
+
+    keys = [index(r[0]) for r in rows]
+    targets = [index(r[3]) for r in rows]
+    if len(table) >= NULL_INDEX:
+        raise CodecError("too many distinct keys")
+    columns = {
+        "down_ts": [r[1] for r in rows],
+        "up_ts": [r[2] for r in rows],
+        "position": [NULL_POSITION if r[4] is None else r[4] for r in rows],
+        "key": keys,
+        "target": targets,
+        "correction": [CORRECTION_CODES.index(r[5]) for r in rows],
+        "error": [ERROR_CODES.index(r[6]) for r in rows],
+    }
+    parts = [_HEADER.pack(MAGIC, len(rows), len(table), FLAG_SHUFFLED if shuffle else 0)]
+    for name, dtype in _COLUMNS:
+        column = np.asarray(columns[name], dtype=dtype)
+        parts.append(_shuffle(column) if shuffle else column.tobytes())
+    for value in table:
+        raw = value.encode("utf-8")
+        if len(raw) > 255:
+            raise CodecError("key longer than 255 bytes")
+        parts.append(bytes((len(raw),)) + raw)
+    return b"".join(parts)
+
+
+def decode(payload: bytes) -> list[tuple]:
+    """Unpack a batch into rows in ingest.KEYSTROKE_COLUMNS[1:] order."""
+    view = memoryview(payload)
+    if len(view) < _HEADER.size:
+        raise CodecError("payload shorter than header")
+    magic, n, k, flags = _HEADER.unpack_from(view)
+    if magic != MAGIC:
+        raise CodecError("bad magic")
+    if flags & ~FLAG_SHUFFLED:
+        raise CodecError("unknown flags")
+
+    offset = _HEADER.size
+    cols = {}
+    for name, dtype in _COLUMNS:
+        itemsize = np.dtype(dtype).itemsize
+        size = itemsize * n
+        if offset + size > len(view):
+            raise CodecError("payload truncated")
+        if flags & FLAG_SHUFFLED:
+            raw = np.frombuffer(view, dtype=np.uint8, count=size, offset=offset)
+            cols[name] = raw.reshape(itemsize, n).T.copy().view(dtype).reshape(n)
+        else:
+            cols[name] = np.frombuffer(view, dtype=dtype, count=n, offset=offset)
+        offset += size
+
+    table = []
+    for _ in range(k):
+        if offset >= len(view):
+            raise CodecError("key table truncated")
+        length = view[offset]
+        raw = view[offset + 1:offset + 1 + length]
+        if len(raw) != length:
+            raise CodecError("key table truncated")
+        table.append(bytes(raw).decode("utf-8"))
+        offset += 1 + length
+    if offset != len(view):
+        raise CodecError("trailing bytes after key table")
+
+    key, target = cols["key"], cols["target"]
+    target_set = target[target != NULL_INDEX]
+    if (n and int(key.max()) >= k) or (len(target_set) and int(target_set.max()) >= k):
+        raise CodecError("key index out of range")
+    if n and (int(cols["correction"].max()) >= len(CORRECTION_CODES)
+              or int(cols["error"].max()) >= len(ERROR_CODES)):
+        raise CodecError("unknown correction or error code")
+    if not (np.isfinite(cols["down_ts"]).all() and np.isfinite(cols["up_ts"]).all()):
+        raise CodecError("timestamps must be finite")
+
+    lookup = dict(enumerate(table))
+    lookup[NULL_INDEX] = None
+    keys = [table[i] for i in key.tolist()]
+    targets = [lookup[i] for i in target.tolist()]
+    positions = [None if p == NULL_POSITION else p for p in cols["position"].tolist()]
+    corrections = [CORRECTION_CODES[c] for c in cols["correction"].tolist()]
+    errors = [ERROR_CODES[e] for e in cols["error"].tolist()]
+    return list(zip(keys, cols["down_ts"].tolist(), cols["up_ts"].tolist(),
+                    targets, positions, corrections, errors))
@@ -0,0 +1,238 @@
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+# Live, per-keystroke session state for GET /typing/sessions/{sid}/live.
+#
+# Every uploaded or streamed keystroke is folded into its session's
+# LiveState in O(1):
+#   * alignment: a cursor into target_text plus a stack of per-character
+#     correct/incorrect flags, so Backspace undoes exactly what it deletes,
+#   * rolling accuracy over the last ACCURACY_WINDOW typed characters
+#     (ring buffer with a running sum),
+#   * WPM over the last WPM_WINDOW seconds (bounded deque of down_ts),
+#   * dwell and flight mean / std-dev (Welford).
+#
+# States live in this process only (one store per worker) and are dropped
+# after LIVE_IDLE_SECONDS without events or when LIVE_MAX_SESSIONS is
+# exceeded, least recently used first. A missing state is rebuilt from the
+# session's stored keystrokes on the next read. Like the aggregation,
+# batches are assumed to arrive in time order.
+#
+# A rebuild reads the keystrokes outside the lock, so batches committed
+# while it runs would reach neither the read nor a state: begin_rebuild()
+# first makes feed() queue them, and rebuild() replays the queued events
+# newer than the last one it read. Ended sessions are never cached: their
+# snapshot is built with build() and thrown away.
+
+WPM_WINDOW = 10.0        # seconds
+ACCURACY_WINDOW = 50     # characters
+MAX_WINDOW_KEYS = 512    # cap on keystrokes tracked inside the WPM window
+IDLE_SECONDS = float(os.getenv("LIVE_IDLE_SECONDS", "900"))
+MAX_SESSIONS = int(os.getenv("LIVE_MAX_SESSIONS", "10000"))
+
+# named keys that type a character
+_NAMED_KEYS = {"Enter": "\n", "Tab": "\t", "Space": " "}
+
+
+class Welford:
+    __slots__ = ("n", "mean", "m2")
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, x: float) -> None:
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else 0.0
+
+
+class LiveState:
+    __slots__ = (
+        "session_id", "user_id", "target", "cursor", "marks", "uncorrected",
+        "typed", "correct", "keystrokes", "ring", "ring_pos", "ring_len", "ring_sum",
+        "window", "dwell", "flight", "first_down", "last_down", "last_up", "touched",
+    )
+
+    def __init__(self, session_id: int, user_id: int, target: str):
+        self.session_id = session_id
+        self.user_id = user_id
+        self.target = target
+        self.cursor = 0                 # characters currently in the input
+        self.marks = bytearray()        # 1 = input[i] matched target[i]
+        self.uncorrected = 0            # mismatches still in the input
+        self.typed = 0                  # characters typed, including later-deleted ones
+        self.correct = 0
+        self.keystrokes = 0
+        self.ring = bytearray(ACCURACY_WINDOW)
+        self.ring_pos = 0
+        self.ring_len = 0
+        self.ring_sum = 0
+        self.window = deque(maxlen=MAX_WINDOW_KEYS)  # down_ts of typed characters
+        self.dwell = Welford()
+        self.flight = Welford()
+        self.first_down = None
+        self.last_down = None
+        self.last_up = None
+        self.touched = time.monotonic()
+
+    def add(self, key: str, down_ts: float, up_ts: float) -> None:
+        self.keystrokes += 1
+        self.dwell.add(up_ts - down_ts)
+        if self.last_up is not None:
+            self.flight.add(down_ts - self.last_up)
+        if self.first_down is None:
+            self.first_down = down_ts
+        self.last_down, self.last_up = down_ts, up_ts
+
+        char = _NAMED_KEYS.get(key, key)
+        if key == "Backspace":
+            if self.cursor:
+                self.cursor -= 1
+                if not self.marks.pop():
+                    self.uncorrected -= 1
+        elif len(char) == 1:
+            ok = self.cursor < len(self.target) and self.target[self.cursor] == char
+            self.marks.append(ok)
+            self.cursor += 1
+            self.uncorrected += not ok
+            self.typed += 1
+            self.correct += ok
+
+            self.ring_sum += ok - self.ring[self.ring_pos]
+            self.ring[self.ring_pos] = ok
+            self.ring_pos = (self.ring_pos + 1) % ACCURACY_WINDOW
+            self.ring_len = min(self.ring_len + 1, ACCURACY_WINDOW)
+
+            self.window.append(down_ts)
+        # modifiers and other named keys only count towards timing
+
+    def wpm(self) -> float:
+        if self.last_down is None:
+            return 0.0
+        window = self.window
+        while window and window[0] < self.last_down - WPM_WINDOW:
+            window.popleft()
+        span = min(WPM_WINDOW, self.last_up - self.first_down)
+        return (len(window) / 5) / (span / 60) if span > 0 else 0.0
+
+    def snapshot(self) -> dict:
+        return {
+            "session_id": self.session_id,
+            "keystrokes": self.keystrokes,
+            "position": self.cursor,
+            "target_length": len(self.target),
+            "progress": min(self.cursor / len(self.target), 1.0) if self.target else 1.0,
+            "next_char": self.target[self.cursor] if self.cursor < len(self.target) else None,
+            "uncorrected_errors": self.uncorrected,
+            "wpm": self.wpm(),
+            "accuracy": 100.0 * self.correct / self.typed if self.typed else 100.0,
+            "rolling_accuracy": 100.0 * self.ring_sum / self.ring_len if self.ring_len else 100.0,
+            "avg_dwell_ms": self.dwell.mean * 1000,
+            "dwell_std_ms": self.dwell.std * 1000,
+            "avg_flight_ms": self.flight.mean * 1000,
+            "flight_std_ms": self.flight.std * 1000,
+            "elapsed_secs": (self.last_up - self.first_down) if self.first_down is not None else 0.0,
+        }
+
+
+def build(session_id: int, user_id: int, target: str, events) -> LiveState:
+    """A state built from all of a session's (sorted) events."""
+    state = LiveState(session_id, user_id, target)
+    for key, down_ts, up_ts in events:
+        state.add(key, down_ts, up_ts)
+    return state
+
+
+class LiveStore:
+    """Session id -> LiveState, least recently used first."""
+
+    def __init__(self, max_sessions: int = MAX_SESSIONS, idle_seconds: float = IDLE_SECONDS):
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+        self._states: OrderedDict[int, LiveState] = OrderedDict()
+        self._building: dict[int, list] = {}  # session id -> batches fed during its rebuild
+        self._lock = threading.Lock()
+
+    def _evict(self, now: float) -> None:
+        states = self._states
+        while states:
+            oldest = next(iter(states.values()))
+            if len(states) <= self.max_sessions and now - oldest.touched < self.idle_seconds:
+                break
+            states.popitem(last=False)
+
+    def snapshot(self, session_id: int, user_id: int) -> dict | None:
+        """The session's live snapshot, or None if there is no state for this user."""
+        with self._lock:
+            self._evict(time.monotonic())
+            state = self._states.get(session_id)
+            if state is None or state.user_id != user_id:
+                return None
+            return state.snapshot()
+
+    def feed(self, session_id: int, events) -> bool:
+        """Fold (key, down_ts, up_ts) events into an existing state, in down_ts order.
+
+        Sessions without a state are skipped; their next read rebuilds it
+        from storage, so a state never misses earlier batches. Batches for a
+        session being rebuilt are queued for rebuild() to replay.
+        """
+        now = time.monotonic()
+        with self._lock:
+            state = self._states.get(session_id)
+            if state is None:
+                queued = self._building.get(session_id)
+                if queued is not None:
+                    queued.append(events)
+                return False
+            self._states.move_to_end(session_id)
+            for key, down_ts, up_ts in sorted(events, key=lambda e: e[1]):
+                state.add(key, down_ts, up_ts)
+            state.touched = now
+            self._evict(now)
+            return True
+
+    def begin_rebuild(self, session_id: int) -> None:
+        """Queue the session's fed batches until rebuild(); call before reading its keystrokes."""
+        with self._lock:
+            self._building.setdefault(session_id, [])
+
+    def rebuild(self, session_id: int, user_id: int, target: str, events) -> dict:
+        """Store a state built from all of the session's (sorted) events, plus the
+        batches queued since begin_rebuild() that the events don't include."""
+        state = build(session_id, user_id, target, events)
+        with self._lock:
+            queued = self._building.pop(session_id, ())
+            if session_id in self._states:
+                # a concurrent rebuild got there first and has been fed since
+                state = self._states[session_id]
+            else:
+                for batch in queued:
+                    for key, down_ts, up_ts in sorted(batch, key=lambda e: e[1]):
+                        if state.last_down is None or down_ts > state.last_down:
+                            state.add(key, down_ts, up_ts)
+                self._states[session_id] = state
+            self._states.move_to_end(session_id)
+            self._evict(time.monotonic())
+            return state.snapshot()
+
+    def drop(self, session_id: int) -> None:
+        with self._lock:
+            self._states.pop(session_id, None)
+            self._building.pop(session_id, None)
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+
+store = LiveStore()
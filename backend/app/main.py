@@ -1,24 +1,58 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
 from sqlalchemy.orm import Session
 
-from . import models, database, schemas, utils
-from .routers import auth, typing
+from . import models, database, http_cache, live, metrics, passwords, schemas, utils
+from .routers import auth, stream, typing, typing_async
+from .auth_cache import UserSnapshot
 from .dependencies import get_current_user
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # stop the bcrypt worker processes with the app (and on every reload)
+    passwords.hasher.shutdown()
+
+app = FastAPI(lifespan=lifespan)
 
 # 1) Mount sub-routers
 app.include_router(auth.router)
+if database.USE_ASYNC_DB:
+    # registered first so its routes win over the sync ones on the same paths
+    app.include_router(typing_async.router)
 app.include_router(typing.router)   
+app.include_router(stream.router)
 
 # a single, protected /users/{user_id} endpoint
 @app.get("/users/{user_id}", response_model=schemas.UserOut)
 def read_user(
     user_id: int,
-    current_user: models.User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
 ):
     # only allows users to fetch their own record
     if current_user.id != user_id:
         raise HTTPException(status_code=403, detail="Forbidden")
 
     return current_user
+
+# connection pool gauges: in-use / idle connections and checkout wait times
+# (both metrics endpoints need METRICS_TOKEN, see metrics.require_scrape_token)
+@app.get("/metrics/db-pool", dependencies=[Depends(metrics.require_scrape_token)])
+def db_pool_metrics():
+    return database.get_pool_metrics()
+
+# Prometheus scrape target: request / query / hot-function metrics plus the pool gauges
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False,
+         dependencies=[Depends(metrics.require_scrape_token)])
+def prometheus_metrics():
+    extra = metrics.pool_lines(database.get_pool_metrics())
+    extra += metrics.gauge_lines("live_sessions", "Sessions with in-memory live state.", [((), (), len(live.store))])
+    return PlainTextResponse(metrics.render(extra), media_type="text/plain; version=0.0.4")
+
+# ETags / 304s and gzip (or brotli) for the read endpoints
+http_cache.install(app)
+
+# last, so it sees every route (and the bytes actually sent)
+metrics.install(app)
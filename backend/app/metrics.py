@@ -0,0 +1,358 @@
+import asyncio
+import bisect
+import cProfile
+import contextvars
+import functools
+import hmac
+import logging
+import os
+import pstats
+import random
+import re
+import threading
+import time
+
+from fastapi import Header, HTTPException
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Request / query / hot-function instrumentation, served as Prometheus text.
+#
+#   * MetricsMiddleware (pure ASGI): per-route latency histogram, request and
+#     response body sizes, status counts, and the DB query count / time each
+#     request caused,
+#   * cursor hooks on every SQLAlchemy Engine: query count and latency,
+#     attributed to the current request through a contextvar (which
+#     run_in_threadpool copies, so sync handlers are covered),
+#   * timed(name): histogram around a hot function (alignment, accuracy,
+#     timing stats, summary (de)serialization, token verification),
+#   * KEYSTROKES counter, bumped on ingest; rate() it for events/sec.
+#
+# METRICS_ENABLED=0 installs none of it: timed() hands back the original
+# function and no middleware or hooks are registered, so the disabled cost
+# is zero. The registry is hand-rolled to avoid a dependency for a few
+# counters and histograms.
+#
+# /metrics and /metrics/db-pool expose per-route latency, query counts and
+# pool occupancy, so they are not public: they answer 404 unless
+# METRICS_TOKEN is set, and then only to `Authorization: Bearer
+# <METRICS_TOKEN>` (Prometheus: `authorization: {credentials: ...}` in the
+# scrape config). Everything else can't tell they exist.
+#
+# PROFILE_SAMPLE_RATE > 0 runs that fraction of requests' endpoint functions
+# under cProfile and dumps the ones slower than PROFILE_SLOW_MS to
+# PROFILE_DIR as .prof files (open with pstats or snakeviz).
+
+ENABLED = os.getenv("METRICS_ENABLED", "1").lower() not in ("0", "false", "no")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", "500"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+SCRAPE_TOKEN = os.getenv("METRICS_TOKEN") or None
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FUNCTION_BUCKETS = (1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, 0.01, 0.05, 0.1, 0.5, 1.0)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+log = logging.getLogger(__name__)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        self.name, self.help, self.labelnames = name, help, labelnames
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, labels: tuple = ()) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, labels: tuple = ()) -> float:
+        return self._values.get(labels, 0.0)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, labelnames
+        self.buckets = tuple(buckets)
+        self._series: dict[tuple, list] = {}  # labels -> [per-bucket counts + overflow, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, labels: tuple = ()) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, labels: tuple = ()) -> int:
+        series = self._series.get(labels)
+        return series[2] if series else 0
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.labelnames + ("le",)
+        with self._lock:
+            for labels, (counts, total, n) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, c in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += c
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    lines.append(f"{self.name}_bucket{_labels(names, labels + (le,))} {cumulative}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {total:g}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {n}")
+        return lines
+
+
+REQUESTS = Counter("http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"))
+REQUEST_SECONDS = Histogram("http_request_duration_seconds", "HTTP request latency.", ("method", "route"))
+REQUEST_BYTES = Histogram("http_request_size_bytes", "HTTP request body size.", ("method", "route"), SIZE_BUCKETS)
+RESPONSE_BYTES = Histogram("http_response_size_bytes", "HTTP response body size.", ("method", "route"), SIZE_BUCKETS)
+REQUEST_QUERIES = Histogram("http_request_db_queries", "Database queries per HTTP request.",
+                            ("method", "route"), COUNT_BUCKETS)
+REQUEST_DB_SECONDS = Histogram("http_request_db_seconds", "Database time per HTTP request.", ("method", "route"))
+QUERY_SECONDS = Histogram("db_query_duration_seconds", "Database cursor execution time.", (), FUNCTION_BUCKETS)
+FUNCTION_SECONDS = Histogram("app_function_duration_seconds", "Time spent in instrumented hot functions.",
+                             ("function",), FUNCTION_BUCKETS)
+KEYSTROKES = Counter("keystrokes_ingested_total", "Keystroke events stored.")
+PROFILES = Counter("request_profiles_captured_total", "Slow sampled requests dumped as cProfile files.")
+
+METRICS = (REQUESTS, REQUEST_SECONDS, REQUEST_BYTES, RESPONSE_BYTES, REQUEST_QUERIES, REQUEST_DB_SECONDS,
+           QUERY_SECONDS, FUNCTION_SECONDS, KEYSTROKES, PROFILES)
+
+
+def gauge_lines(name: str, help: str, samples: list[tuple[tuple, tuple, float]]) -> list[str]:
+    """Prometheus lines for a gauge computed at scrape time: [(labelnames, labels, value)]."""
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} gauge"]
+    lines += [f"{name}{_labels(names, labels)} {value:g}" for names, labels, value in samples]
+    return lines
+
+
+def pool_lines(pools: dict) -> list[str]:
+    """Gauges for database.get_pool_metrics() output."""
+    gauges = {
+        "db_pool_size": ("Configured pool size.", "size"),
+        "db_pool_connections_in_use": ("Connections checked out.", "in_use"),
+        "db_pool_connections_idle": ("Connections idle in the pool.", "idle"),
+        "db_pool_overflow": ("Connections open beyond the pool size.", "overflow"),
+        "db_pool_checkouts": ("Connection checkouts since start.", "checkouts"),
+        "db_pool_checkout_wait_seconds_total": ("Total time spent waiting for a connection.",
+                                                "checkout_wait_seconds_total"),
+        "db_pool_checkout_wait_seconds_max": ("Longest wait for a connection.", "checkout_wait_seconds_max"),
+    }
+    lines = []
+    for name, (help, key) in gauges.items():
+        samples = [(("engine",), (engine,), stats[key]) for engine, stats in pools.items() if key in stats]
+        if samples:
+            lines += gauge_lines(name, help, samples)
+    return lines
+
+
+def render(extra: list[str] = ()) -> str:
+    lines = []
+    for metric in METRICS:
+        lines += metric.render()
+    lines += extra
+    return "\n".join(lines) + "\n"
+
+
+# ─── per-request context ─────────────────────────────────────────────────────
+
+class RequestStats:
+    __slots__ = ("queries", "db_seconds", "profiles")
+
+    def __init__(self, profile: bool = False):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.profiles: list[cProfile.Profile] | None = [] if profile else None
+
+
+_request: contextvars.ContextVar[RequestStats | None] = contextvars.ContextVar("metrics_request", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["metrics_query_start"].pop()
+    QUERY_SECONDS.observe(elapsed)
+    stats = _request.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+
+
+def instrument_engines() -> None:
+    """Time cursor executions on every Engine (the async engines' sync cores included)."""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def timed(name: str):
+    """Decorator: observe the wrapped function's run time as app_function_duration_seconds{function=name}."""
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+        labels = (name,)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                FUNCTION_SECONDS.observe(time.perf_counter() - start, labels)
+        return wrapper
+    return decorate
+
+
+# ─── sampled profiling ───────────────────────────────────────────────────────
+
+def _profiled(fn):
+    # Sync endpoints run on a threadpool thread, async ones on the event loop
+    # (where the profile also sees whatever else the loop ran meanwhile); each
+    # call gets its own Profile, merged when the request finishes.
+    if asyncio.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            stats = _request.get()
+            if stats is None or stats.profiles is None:
+                return await fn(*args, **kwargs)
+            profile = cProfile.Profile()
+            stats.profiles.append(profile)
+            profile.enable()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                profile.disable()
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        stats = _request.get()
+        if stats is None or stats.profiles is None:
+            return fn(*args, **kwargs)
+        profile = cProfile.Profile()
+        stats.profiles.append(profile)
+        profile.enable()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profile.disable()
+    return wrapper
+
+
+def profile_endpoints(app) -> None:
+    """Wrap every API route's endpoint for sampled profiling.
+
+    FastAPI reads dependant.call on each request, so swapping it after the
+    routes are built is enough; the wrapper keeps the sync/async flavour.
+    """
+    for route in app.routes:
+        if isinstance(route, APIRoute):
+            route.dependant.call = _profiled(route.dependant.call)
+
+
+def _dump_profile(stats: RequestStats, method: str, route: str, elapsed: float, profile_dir: str) -> None:
+    os.makedirs(profile_dir, exist_ok=True)
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "root"
+    path = os.path.join(profile_dir, f"{int(time.time() * 1000)}_{method}_{slug}.prof")
+    pstats.Stats(*stats.profiles).dump_stats(path)
+    PROFILES.inc()
+    log.warning("slow request %s %s took %.1f ms, profile written to %s", method, route, elapsed * 1000, path)
+
+
+# ─── ASGI middleware ─────────────────────────────────────────────────────────
+
+class MetricsMiddleware:
+    def __init__(self, app, sample_rate: float = PROFILE_SAMPLE_RATE, slow_ms: float = PROFILE_SLOW_MS,
+                 profile_dir: str = PROFILE_DIR):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.slow_seconds = slow_ms / 1000
+        self.profile_dir = profile_dir
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = RequestStats(profile=self.sample_rate > 0 and random.random() < self.sample_rate)
+        token = _request.set(stats)
+        sizes = [0, 0]
+        status = [500]
+
+        async def counting_receive():
+            message = await receive()
+            if message["type"] == "http.request":
+                sizes[0] += len(message.get("body", b""))
+            return message
+
+        async def counting_send(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            elif message["type"] == "http.response.body":
+                sizes[1] += len(message.get("body", b""))
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            elapsed = time.perf_counter() - start
+            _request.reset(token)
+            # the route template, not the raw path, keeps label cardinality bounded
+            route = getattr(scope.get("route"), "path", "unmatched")
+            labels = (scope["method"], route)
+            REQUESTS.inc(labels=labels + (str(status[0]),))
+            REQUEST_SECONDS.observe(elapsed, labels)
+            REQUEST_BYTES.observe(sizes[0], labels)
+            RESPONSE_BYTES.observe(sizes[1], labels)
+            REQUEST_QUERIES.observe(stats.queries, labels)
+            REQUEST_DB_SECONDS.observe(stats.db_seconds, labels)
+            if stats.profiles and elapsed >= self.slow_seconds:
+                _dump_profile(stats, scope["method"], route, elapsed, self.profile_dir)
+
+
+def require_scrape_token(authorization: str | None = Header(None)) -> None:
+    """Dependency for the metrics endpoints: 404 without METRICS_TOKEN, 401 on a wrong bearer token."""
+    if SCRAPE_TOKEN is None:
+        raise HTTPException(404, "Not Found")
+    scheme, _, credentials = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(credentials.encode(), SCRAPE_TOKEN.encode()):
+        raise HTTPException(401, "Invalid metrics token", headers={"WWW-Authenticate": "Bearer"})
+
+
+def install(app) -> None:
+    """Add the middleware, query hooks and (if sampling) endpoint profiling to `app`.
+
+    Call after every router is included.
+    """
+    if not ENABLED:
+        return
+    instrument_engines()
+    app.add_middleware(MetricsMiddleware)
+    if PROFILE_SAMPLE_RATE > 0:
+        profile_endpoints(app)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Float, Text
+from sqlalchemy import Column, Integer, String, ForeignKey, Date, DateTime, Float, Text, LargeBinary, Boolean, Index, func
 from sqlalchemy.orm import relationship
 from .database import Base
 from datetime import datetime, timezone
@@ -25,6 +25,15 @@ class Session(Base):
     correction_count = Column(Integer, default=0)  # Number of backspaces/corrections
     words_per_minute = Column(Float, nullable=True)
     characters_per_minute = Column(Float, nullable=True)
+    duration_secs = Column(Float, nullable=True)  # first to last keystroke, from the summary
+    profiled = Column(Boolean, default=False, nullable=False)  # already folded into the user's UserTypingProfile
+    rolled_up = Column(Boolean, default=False, nullable=False)  # already counted in session_rollups / user_rollups
+    keystrokes_purged = Column(Boolean, default=False, nullable=False)  # archive dropped by retention; never re-analysed
+
+    __table_args__ = (
+        # a user's session history, newest first
+        Index("ix_sessions_user_id_started_at", "user_id", "started_at"),
+    )
 
 class KeystrokeEvent(Base):
     __tablename__ = "keystroke_events"
@@ -38,8 +47,17 @@ class KeystrokeEvent(Base):
     position_in_text = Column(Integer, nullable=True)  # Position in target text
     is_correction = Column(String, nullable=True)  # 'backspace', 'delete', etc.
     is_error = Column(String, nullable=True)  # 'substitution', 'insertion', 'deletion', 'transposition'
+    # server clock; down_ts/up_ts are the client's, so partitioning and archiving go by this
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
     session    = relationship("Session", back_populates="events")
 
+    __table_args__ = (
+        # summaries and the aggregation neighbour lookups scan one session in down_ts order;
+        # on PostgreSQL the INCLUDE columns make the summary scan index-only
+        Index("ix_keystroke_events_session_id_down_ts", "session_id", "down_ts",
+              postgresql_include=["up_ts", "is_correction", "is_error"]),
+    )
+
 class TypingAnalytics(Base):
     __tablename__ = "typing_analytics"
     id = Column(Integer, primary_key=True, index=True)
@@ -57,15 +75,87 @@ class TypingAnalytics(Base):
 class UserTypingProfile(Base):
     __tablename__ = "user_typing_profiles"
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     # Overall statistics
     avg_wpm = Column(Float, default=0.0)
     avg_accuracy = Column(Float, default=0.0)
     total_sessions = Column(Integer, default=0)
+    recent_wpm = Column(Float, default=0.0)  # exponentially weighted, see profiles.RECENT_ALPHA
+    recent_accuracy = Column(Float, default=0.0)
     # Problem areas (JSON strings)
-    slow_characters = Column(Text, nullable=True)  # JSON: {"char": avg_dwell_time}
-    error_prone_characters = Column(Text, nullable=True)  # JSON: {"char": error_rate}
-    difficult_bigrams = Column(Text, nullable=True)  # JSON: {"bigram": avg_flight_time}
+    slow_characters = Column(Text, nullable=True)  # JSON: {"char": [avg_dwell_ms, weight]}
+    error_prone_characters = Column(Text, nullable=True)  # JSON: {"char": [error_rate, weight]}
+    difficult_bigrams = Column(Text, nullable=True)  # JSON: {"bigram": [avg_flight_ms, weight]}
     common_errors = Column(Text, nullable=True)  # JSON: {"error_type": count}
     updated_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
     user = relationship("User")
+
+class SessionSummaryCache(Base):
+    __tablename__ = "session_summaries"
+    session_id = Column(Integer, ForeignKey("sessions.id"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)  # lets reads authorize without loading the session
+    version = Column(Integer, nullable=False)  # summaries.SUMMARY_VERSION at compute time
+    payload = Column(LargeBinary, nullable=False)  # zlib-compressed JSON SessionSummary
+    computed_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+class SessionAnalysisCache(Base):
+    __tablename__ = "session_analyses"
+    session_id = Column(Integer, ForeignKey("sessions.id"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    version = Column(Integer, nullable=False)  # detailed_analysis.ANALYSIS_VERSION at compute time
+    payload = Column(LargeBinary, nullable=False)  # zlib-compressed JSON DetailedAnalysis
+    computed_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+class KeystrokeArchive(Base):
+    __tablename__ = "keystroke_archives"
+    session_id = Column(Integer, ForeignKey("sessions.id"), primary_key=True)
+    event_count = Column(Integer, nullable=False)
+    payload = Column(LargeBinary, nullable=False)  # zlib-compressed keystroke_codec batch, see archive.pack
+    archived_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+class SessionRollup(Base):
+    """Per-user totals for one day or week of ended sessions, see rollups.py."""
+    __tablename__ = "session_rollups"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    # 'd' = day, 'w' = ISO week starting Monday, 'c' = running totals through that day
+    period = Column(String(1), primary_key=True)
+    period_start = Column(Date, primary_key=True)
+    sessions = Column(Integer, nullable=False, default=0)
+    wpm_sum = Column(Float, nullable=False, default=0.0)
+    accuracy_sum = Column(Float, nullable=False, default=0.0)
+    best_wpm = Column(Float, nullable=False, default=0.0)
+    practice_secs = Column(Float, nullable=False, default=0.0)
+    error_sum = Column(Integer, nullable=False, default=0)
+    correction_sum = Column(Integer, nullable=False, default=0)
+    wpm_hist = Column(Text, nullable=True)  # JSON {bucket: sessions}, buckets of rollups.WPM_BUCKET wpm
+
+class UserRollup(Base):
+    """Per-user all-time totals; the leaderboard reads these through its indexes."""
+    __tablename__ = "user_rollups"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    sessions = Column(Integer, nullable=False, default=0)
+    wpm_sum = Column(Float, nullable=False, default=0.0)
+    accuracy_sum = Column(Float, nullable=False, default=0.0)
+    avg_wpm = Column(Float, nullable=False, default=0.0)
+    avg_accuracy = Column(Float, nullable=False, default=0.0)
+    best_wpm = Column(Float, nullable=False, default=0.0)
+    practice_secs = Column(Float, nullable=False, default=0.0)
+
+    __table_args__ = (
+        Index("ix_user_rollups_best_wpm", "best_wpm"),
+        Index("ix_user_rollups_avg_wpm", "avg_wpm"),
+    )
+
+class UserCharStat(Base):
+    """Per-user, per-character totals over profiled sessions, see char_stats.py."""
+    __tablename__ = "user_char_stats"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    char = Column(String, primary_key=True)
+    total_typed = Column(Integer, nullable=False, default=0)
+    error_count = Column(Integer, nullable=False, default=0)
+    dwell_sum = Column(Float, nullable=False, default=0.0)  # seconds
+    difficulty = Column(Float, nullable=False, default=0.0)  # char_stats.difficulty(error_count, total_typed)
+
+    __table_args__ = (
+        Index("ix_user_char_stats_user_difficulty", "user_id", "difficulty"),
+    )
@@ -0,0 +1,76 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from fastapi.concurrency import run_in_threadpool
+
+from . import utils
+
+# bcrypt off the request threads.
+#
+# Signup and login hash/verify passwords in a dedicated process pool, so a
+# login storm burns worker processes instead of the threadpool that serves
+# the typing endpoints. At most PASSWORD_QUEUE_SIZE jobs may be queued or
+# running; past that, submit() raises PoolBusy and the handlers answer 503
+# right away instead of piling up.
+#
+#   PASSWORD_WORKERS     worker processes; 0 hashes on the request threadpool (cpu count)
+#   PASSWORD_QUEUE_SIZE  jobs in flight before rejecting (4 x workers)
+#   BCRYPT_ROUNDS        cost factor for new hashes; older hashes are
+#                        upgraded on the next successful login (12)
+
+
+class PoolBusy(Exception):
+    pass
+
+
+class PasswordHasher:
+    def __init__(self, workers: int, queue_size: int, rounds: int = utils.BCRYPT_ROUNDS):
+        self.workers = workers
+        self.rounds = rounds
+        self._slots = threading.BoundedSemaphore(queue_size)
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "PasswordHasher":
+        workers = int(os.getenv("PASSWORD_WORKERS", str(os.cpu_count() or 1)))
+        queue_size = int(os.getenv("PASSWORD_QUEUE_SIZE", str(max(workers, 1) * 4)))
+        return cls(workers, queue_size)
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: the server process has threads, which fork doesn't mix with
+                self._executor = ProcessPoolExecutor(
+                    self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    async def submit(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise PoolBusy()
+        try:
+            if self.workers <= 0:
+                return await run_in_threadpool(fn, *args)
+            return await asyncio.wrap_future(self._pool().submit(fn, *args))
+        finally:
+            self._slots.release()
+
+    async def hash(self, password: str) -> str:
+        return await self.submit(utils.hash_password, password, self.rounds)
+
+    async def verify(self, password: str, hashed: str) -> tuple[bool, str | None]:
+        """(matches, replacement hash when the stored cost differs from `rounds`)."""
+        return await self.submit(utils.verify_and_rehash, password, hashed, self.rounds)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+hasher = PasswordHasher.from_env()
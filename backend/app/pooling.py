@@ -0,0 +1,171 @@
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+# Engine and connection-pool tuning, driven by environment variables:
+#
+#   DB_POOL_SIZE               persistent connections per process      (5)
+#   DB_MAX_OVERFLOW            extra connections under burst load      (10)
+#   DB_POOL_TIMEOUT            seconds to wait for a free connection   (30)
+#   DB_POOL_RECYCLE            reconnect after this many seconds, -1 off (1800)
+#   DB_POOL_PRE_PING           test connections on checkout            (1)
+#   DB_STATEMENT_TIMEOUT_MS    PostgreSQL statement_timeout, 0 off     (0)
+#   SQLITE_JOURNAL_MODE        PRAGMA journal_mode                     (WAL)
+#   SQLITE_SYNCHRONOUS         PRAGMA synchronous                      (NORMAL)
+#   SQLITE_BUSY_TIMEOUT_MS     PRAGMA busy_timeout                     (5000)
+#
+# The sync engine uses TimedQueuePool, which records how long each checkout
+# waited for a connection; pool_metrics() reports that together with the
+# pool's in-use and idle counts.
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value in (None, ""):
+        return default
+    return value.lower() in ("1", "true", "yes", "on")
+
+
+@dataclass(frozen=True)
+class PoolSettings:
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_timeout: int = 30
+    pool_recycle: int = 1800
+    pre_ping: bool = True
+    statement_timeout_ms: int = 0
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_busy_timeout_ms: int = 5000
+
+    @classmethod
+    def from_env(cls) -> "PoolSettings":
+        return cls(
+            pool_size=_env_int("DB_POOL_SIZE", cls.pool_size),
+            max_overflow=_env_int("DB_MAX_OVERFLOW", cls.max_overflow),
+            pool_timeout=_env_int("DB_POOL_TIMEOUT", cls.pool_timeout),
+            pool_recycle=_env_int("DB_POOL_RECYCLE", cls.pool_recycle),
+            pre_ping=_env_bool("DB_POOL_PRE_PING", cls.pre_ping),
+            statement_timeout_ms=_env_int("DB_STATEMENT_TIMEOUT_MS", cls.statement_timeout_ms),
+            sqlite_journal_mode=os.getenv("SQLITE_JOURNAL_MODE") or cls.sqlite_journal_mode,
+            sqlite_synchronous=os.getenv("SQLITE_SYNCHRONOUS") or cls.sqlite_synchronous,
+            sqlite_busy_timeout_ms=_env_int("SQLITE_BUSY_TIMEOUT_MS", cls.sqlite_busy_timeout_ms),
+        )
+
+
+class WaitStats:
+    """Checkout wait times for one pool; shared across pool recreation."""
+
+    __slots__ = ("lock", "count", "total", "max")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        with self.lock:
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long callers wait for a connection."""
+
+    def __init__(self, *args, **kw):
+        super().__init__(*args, **kw)
+        self.wait_stats = WaitStats()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self.wait_stats.record(time.perf_counter() - start)
+
+    def recreate(self):
+        # engine.dispose() swaps in a fresh pool; keep the running totals
+        new = super().recreate()
+        new.wait_stats = self.wait_stats
+        return new
+
+
+def _is_memory_sqlite(url) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def engine_kwargs(url: str, settings: PoolSettings, is_async: bool = False) -> dict:
+    """create_engine()/create_async_engine() keyword arguments for `url`."""
+    url = make_url(url)
+    backend, driver = url.get_backend_name(), url.get_driver_name()
+    if _is_memory_sqlite(url):
+        # a single in-process database; SQLAlchemy's default pool is right
+        return {}
+
+    kw = {
+        "pool_size": settings.pool_size,
+        "max_overflow": settings.max_overflow,
+        "pool_timeout": settings.pool_timeout,
+        "pool_recycle": settings.pool_recycle,
+        "pool_pre_ping": settings.pre_ping,
+    }
+    if not is_async:
+        kw["poolclass"] = TimedQueuePool
+
+    if backend == "postgresql" and settings.statement_timeout_ms:
+        timeout = str(settings.statement_timeout_ms)
+        if driver == "asyncpg":
+            kw["connect_args"] = {"server_settings": {"statement_timeout": timeout}}
+        else:
+            kw["connect_args"] = {"options": f"-c statement_timeout={timeout}"}
+    return kw
+
+
+def install_sqlite_pragmas(engine, settings: PoolSettings) -> None:
+    """Apply journal/synchronous/busy_timeout pragmas on every new SQLite connection."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if sync_engine.dialect.name != "sqlite" or _is_memory_sqlite(sync_engine.url):
+        return
+
+    @event.listens_for(sync_engine, "connect")
+    def _set_pragmas(dbapi_connection, _record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA journal_mode={settings.sqlite_journal_mode}")
+        cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+        cursor.close()
+
+
+def pool_metrics(engine) -> dict:
+    """In-use / idle connection counts and checkout wait totals for `engine`."""
+    pool = getattr(engine, "sync_engine", engine).pool
+    metrics = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        metrics.update(
+            size=pool.size(),
+            in_use=pool.checkedout(),
+            idle=pool.checkedin(),
+            overflow=max(pool.overflow(), 0),
+        )
+    stats = getattr(pool, "wait_stats", None)
+    if stats is not None:
+        with stats.lock:
+            metrics.update(
+                checkouts=stats.count,
+                checkout_wait_seconds_total=stats.total,
+                checkout_wait_seconds_max=stats.max,
+            )
+    return metrics
@@ -0,0 +1,148 @@
+import json
+from datetime import datetime, timezone
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from . import char_stats, models
+
+# Incremental UserTypingProfile maintenance.
+#
+# Every completed session is folded into its user's profile once, with work
+# bounded by the size of the per-character maps rather than the user's
+# history:
+#   * avg_wpm / avg_accuracy are plain running means over total_sessions,
+#   * recent_wpm / recent_accuracy are exponentially weighted (RECENT_ALPHA),
+#   * the per-character / per-bigram maps store {key: [mean, weight]}. Means
+#     merge by weight, weights decay by MAP_DECAY per session so old habits
+#     fade, and only the MAP_SIZE heaviest keys are kept, so a map never
+#     grows past a fixed size.
+
+RECENT_ALPHA = 0.2
+MAP_DECAY = 0.9
+MAP_SIZE = 64
+
+
+def _load(text: str | None) -> dict:
+    return json.loads(text) if text else {}
+
+
+def merge_weighted(current: dict, observed: dict, decay: float = MAP_DECAY, size: int = MAP_SIZE) -> dict:
+    """Merge {key: (mean, weight)} observations into a decayed, bounded map."""
+    merged = {key: [mean, weight * decay] for key, (mean, weight) in current.items()}
+    for key, (mean, weight) in observed.items():
+        if weight <= 0:
+            continue
+        if key in merged:
+            old_mean, old_weight = merged[key]
+            total = old_weight + weight
+            merged[key] = [(old_mean * old_weight + mean * weight) / total, total]
+        else:
+            merged[key] = [mean, weight]
+    if len(merged) > size:
+        keep = sorted(merged, key=lambda k: merged[k][1], reverse=True)[:size]
+        merged = {k: merged[k] for k in keep}
+    return merged
+
+
+def session_observations(db: Session, session_id: int) -> tuple[dict, dict, dict]:
+    """Per-char dwell, per-char error rate and per-bigram flight for one session.
+
+    Reads the session's typing_analytics rows, i.e. O(distinct chars).
+    Times are returned in milliseconds.
+    """
+    T = models.TypingAnalytics
+    dwell, error_rate, flight = {}, {}, {}
+    rows = db.execute(
+        select(T.char, T.prev_char, T.avg_dwell_time, T.dwell_count, T.error_count, T.flight_time)
+        .where(T.session_id == session_id)
+    )
+    for char, prev_char, avg_dwell, count, errors, avg_flight in rows:
+        if not count:
+            continue
+        if prev_char is None:
+            dwell[char] = (avg_dwell * 1000, count)
+            error_rate[char] = ((errors or 0) / count, count)
+        elif avg_flight is not None:
+            flight[prev_char + char] = (avg_flight * 1000, count)
+    return dwell, error_rate, flight
+
+
+def get_profile(db: Session, user_id: int) -> models.UserTypingProfile | None:
+    return db.execute(
+        select(models.UserTypingProfile).where(models.UserTypingProfile.user_id == user_id)
+    ).scalars().first()
+
+
+def total_sessions(db: Session, user_id: int) -> int:
+    """Number of sessions folded into the user's profile."""
+    P = models.UserTypingProfile
+    return db.execute(select(P.total_sessions).where(P.user_id == user_id)).scalar() or 0
+
+
+def apply_session(db: Session, sess: models.Session, summary: dict) -> None:
+    """Fold one ended session into its user's profile, at most once per session.
+
+    Stages changes only; the caller commits.
+    """
+    if sess.profiled:
+        return
+
+    profile = get_profile(db, sess.user_id)
+    if profile is None:
+        profile = models.UserTypingProfile(
+            user_id=sess.user_id, avg_wpm=0.0, avg_accuracy=0.0, total_sessions=0
+        )
+        db.add(profile)
+
+    wpm = summary["wpm"] or 0.0
+    accuracy = summary["accuracy_percentage"] or 0.0
+    n = (profile.total_sessions or 0) + 1
+    profile.total_sessions = n
+    profile.avg_wpm = (profile.avg_wpm or 0.0) + (wpm - (profile.avg_wpm or 0.0)) / n
+    profile.avg_accuracy = (profile.avg_accuracy or 0.0) + (accuracy - (profile.avg_accuracy or 0.0)) / n
+    if n == 1:
+        profile.recent_wpm, profile.recent_accuracy = wpm, accuracy
+    else:
+        profile.recent_wpm = RECENT_ALPHA * wpm + (1 - RECENT_ALPHA) * (profile.recent_wpm or 0.0)
+        profile.recent_accuracy = RECENT_ALPHA * accuracy + (1 - RECENT_ALPHA) * (profile.recent_accuracy or 0.0)
+
+    dwell, error_rate, flight = session_observations(db, sess.id)
+    profile.slow_characters = json.dumps(merge_weighted(_load(profile.slow_characters), dwell))
+    profile.error_prone_characters = json.dumps(merge_weighted(_load(profile.error_prone_characters), error_rate))
+    profile.difficult_bigrams = json.dumps(merge_weighted(_load(profile.difficult_bigrams), flight))
+    char_stats.apply_session(db, sess)
+
+    details = summary.get("error_details") or {}
+    common_errors = _load(profile.common_errors)
+    for kind in ("substitutions", "insertions", "deletions", "transpositions"):
+        count = len(details.get(kind) or [])
+        if count:
+            common_errors[kind] = common_errors.get(kind, 0) + count
+    profile.common_errors = json.dumps(common_errors)
+
+    profile.updated_at = datetime.now(timezone.utc)
+    sess.profiled = True
+
+
+def _means(text: str | None) -> dict[str, float]:
+    entries = _load(text)
+    return {k: mean for k, (mean, _) in sorted(entries.items(), key=lambda kv: kv[1][0], reverse=True)}
+
+
+def profile_out(profile: models.UserTypingProfile | None, user_id: int) -> dict:
+    if profile is None:
+        return {"user_id": user_id}
+    return {
+        "user_id": user_id,
+        "avg_wpm": profile.avg_wpm or 0.0,
+        "avg_accuracy": profile.avg_accuracy or 0.0,
+        "recent_wpm": profile.recent_wpm or 0.0,
+        "recent_accuracy": profile.recent_accuracy or 0.0,
+        "total_sessions": profile.total_sessions or 0,
+        "slow_characters": _means(profile.slow_characters),
+        "error_prone_characters": _means(profile.error_prone_characters),
+        "difficult_bigrams": _means(profile.difficult_bigrams),
+        "common_errors": _load(profile.common_errors),
+        "updated_at": profile.updated_at,
+    }
@@ -0,0 +1,227 @@
+import argparse
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from . import analytics, archive, models, summaries
+from .routers.typing import compute_summary
+
+# Re-analysis backfill for ended sessions.
+#
+# After a change to calculate_accuracy / analyze_errors / the timing stats,
+# the metrics stored on `sessions` and the cached summaries are stale. This
+# job recomputes them without going through the API:
+#
+#   * sessions are read in keyset order (id > last_id, CHUNK_SIZE at a time),
+#     with their keystrokes (hot rows + archive) fetched per chunk in one query,
+#   * each chunk is analysed in a worker process; at most 2 x workers chunks
+#     are read ahead, so memory stays bounded whatever the table size,
+#   * results are written back in order with executemany UPDATEs, one commit
+#     per chunk, and the last written id goes to the checkpoint file so an
+#     interrupted run resumes where it stopped.
+#
+# Sessions with no keystrokes left (keystrokes_purged by archive retention,
+# or no hot rows and no archive at all) are skipped and counted: recomputing
+# them from empty columns would overwrite their WPM, CPM and duration with
+# zeros.
+#
+# User profiles are left alone: they are running averages that were already
+# folded in when the sessions ended. The trend / leaderboard rollups are
+# exact sums, so refresh them afterwards with `python -m app.rollups`.
+#
+# Run with:  python -m app.reanalysis [--checkpoint reanalysis.json]
+
+CHUNK_SIZE = int(os.getenv("REANALYSIS_CHUNK_SIZE", "200"))
+
+_S = models.Session
+_E = models.KeystrokeEvent
+_A = models.KeystrokeArchive
+_C = models.SessionSummaryCache
+
+log = logging.getLogger(__name__)
+
+
+def load_checkpoint(path: str | None) -> int:
+    """Last session id written by a previous run, or 0."""
+    if not path or not os.path.exists(path):
+        return 0
+    with open(path) as f:
+        return int(json.load(f)["last_id"])
+
+
+def save_checkpoint(path: str | None, last_id: int, sessions: int) -> None:
+    if not path:
+        return
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump({"last_id": last_id, "sessions": sessions}, f)
+    os.replace(tmp, path)
+
+
+def read_chunk(db: Session, after_id: int, limit: int) -> list[tuple]:
+    """The next `limit` ended sessions after `after_id` as
+    (id, target_text, user_input, rows, archive_payload) tuples.
+
+    Purged sessions come back with no rows and no payload, like any other
+    session whose keystrokes are gone.
+    """
+    sessions = db.execute(
+        select(_S.id, _S.target_text, _S.user_input, _S.keystrokes_purged)
+        .where(_S.id > after_id, _S.ended_at.is_not(None))
+        .order_by(_S.id)
+        .limit(limit)
+    ).all()
+    if not sessions:
+        return []
+    ids = [s.id for s in sessions if not s.keystrokes_purged]
+
+    rows = db.execute(
+        select(_E.session_id, *analytics.SUMMARY_COLUMNS)
+        .where(_E.session_id.in_(ids))
+        .order_by(_E.session_id, _E.down_ts)
+    ).all()
+    by_session = {
+        sid: [tuple(r)[1:] for r in group]
+        for sid, group in itertools.groupby(rows, key=lambda r: r[0])
+    }
+    archives = dict(db.execute(select(_A.session_id, _A.payload).where(_A.session_id.in_(ids))).all())
+
+    return [
+        (s.id, s.target_text, s.user_input or "", by_session.get(s.id, []), archives.get(s.id))
+        for s in sessions
+    ]
+
+
+def analyse_chunk(chunk: list[tuple]) -> list[tuple[int, dict, bytes]]:
+    """Worker side: (session_id, summary metrics, encoded summary) per session."""
+    results = []
+    for sid, target_text, user_input, rows, payload in chunk:
+        if payload is not None:
+            rows = archive.summary_rows(_A(payload=payload), rows)
+        summary = compute_summary(sid, target_text, user_input, analytics.columns_from_rows(rows))
+        results.append((sid, summary, summaries.encode(summary)))
+    return results
+
+
+def write_results(db: Session, results: list[tuple[int, dict, bytes]]) -> None:
+    """Bulk-update the sessions rows and any cached summaries; the caller commits."""
+    db.execute(update(_S), [
+        {
+            "id": sid,
+            "accuracy_percentage": s["accuracy_percentage"],
+            "error_count": s["error_count"],
+            "correction_count": s["correction_count"],
+            "words_per_minute": s["wpm"],
+            "characters_per_minute": s["cpm"],
+            "duration_secs": s["duration_secs"],
+        }
+        for sid, s, _ in results
+    ])
+    cached = set(db.execute(
+        select(_C.session_id).where(_C.session_id.in_([sid for sid, _, _ in results]))
+    ).scalars())
+    if cached:
+        db.execute(update(_C), [
+            {"session_id": sid, "version": summaries.SUMMARY_VERSION, "payload": payload}
+            for sid, _, payload in results if sid in cached
+        ])
+
+
+def run(db: Session, workers: int = 0, chunk_size: int = CHUNK_SIZE,
+        checkpoint: str | None = None, limit: int | None = None, progress=None) -> dict:
+    """Re-analyse every ended session after the checkpoint; returns a report.
+
+    workers=0 analyses in this process. `limit` caps the number of sessions
+    for this run (the checkpoint still advances, so runs can be sliced).
+    """
+    last_id = start_id = load_checkpoint(checkpoint)
+    done = 0
+    started = time.perf_counter()
+    executor = (
+        ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+        if workers > 0 else None
+    )
+    # (last session id of the chunk, analysis or its future)
+    pending: deque[tuple[int, Future | list]] = deque()
+    cursor = last_id
+    remaining = limit
+    skipped = 0
+
+    def drain_one():
+        nonlocal last_id, done
+        chunk_last, head = pending.popleft()
+        results = head.result() if isinstance(head, Future) else head
+        if results:
+            write_results(db, results)
+            db.commit()
+        last_id = chunk_last
+        done += len(results)
+        save_checkpoint(checkpoint, last_id, done)
+        if progress:
+            progress(done, time.perf_counter() - started)
+
+    try:
+        while remaining is None or remaining > 0:
+            size = chunk_size if remaining is None else min(chunk_size, remaining)
+            chunk = read_chunk(db, cursor, size)
+            # keep read transactions short; writes happen on their own
+            db.rollback()
+            if not chunk:
+                break
+            cursor = chunk[-1][0]
+            if remaining is not None:
+                remaining -= len(chunk)
+            work = [c for c in chunk if c[3] or c[4] is not None]
+            skipped += len(chunk) - len(work)
+            pending.append((cursor, executor.submit(analyse_chunk, work) if executor else analyse_chunk(work)))
+            if len(pending) >= max(workers, 1) * 2:
+                drain_one()
+        while pending:
+            drain_one()
+    finally:
+        if executor:
+            executor.shutdown(cancel_futures=True)
+
+    if skipped:
+        log.warning("skipped %d ended sessions with no keystrokes left", skipped)
+    elapsed = time.perf_counter() - started
+    return {
+        "resumed_after_id": start_id,
+        "last_id": last_id,
+        "sessions": done,
+        "skipped_no_keystrokes": skipped,
+        "elapsed_secs": round(elapsed, 3),
+        "sessions_per_sec": round(done / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recompute stored metrics and summaries of ended sessions.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="analysis processes; 0 analyses in this process")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--checkpoint", help="JSON file holding the last written session id; resumes from it")
+    parser.add_argument("--limit", type=int, help="stop after this many sessions")
+    args = parser.parse_args(argv)
+
+    def progress(done, elapsed):
+        print(f"{done} sessions, {done / elapsed:.1f} sessions/sec", flush=True)
+
+    from .database import SessionLocal
+    with SessionLocal() as db:
+        report = run(db, workers=args.workers, chunk_size=args.chunk_size,
+                     checkpoint=args.checkpoint, limit=args.limit, progress=progress)
+    for key, value in report.items():
+        print(f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
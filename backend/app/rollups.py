@@ -0,0 +1,386 @@
+import argparse
+import json
+import os
+from datetime import date, datetime, time, timedelta, timezone
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from . import history, models
+
+# Materialized per-user aggregates behind the trend, progress and leaderboard
+# endpoints.
+#
+#   session_rollups  (user_id, period, period_start) -> sessions, sums, best,
+#                    error / correction totals and a WPM histogram
+#                    for every day ('d') and week ('w', Monday start) a user
+#                    ended sessions in, plus a running-total row ('c') per
+#                    such day holding everything up to and including it,
+#   user_rollups     user_id -> all-time totals, with avg_wpm / best_wpm
+#                    indexed for the leaderboard.
+#
+# The running totals make any day window two primary key lookups: totals for
+# [since, until] are the 'c' row at or before `until` minus the one before
+# `since` (progress() does three, to split the window in halves). Sessions
+# end "now", so updating them only ever touches the latest row; one that
+# ends on an earlier day (a client-supplied end time) also bumps the later
+# rows. best_wpm of a 'c' row is the best so far and does not subtract.
+#
+# Percentiles come from the histogram: WPM_BUCKET-wide buckets, reported at
+# their midpoints, so they are exact to within half a bucket.
+#
+# apply_session() folds a session in once (guarded by sessions.rolled_up) at
+# the same point as the profile update, so reads never touch `sessions`.
+# rebuild() recomputes everything from the sessions rows: run it after
+# app.reanalysis rewrote stored metrics, or to backfill:
+#
+#   python -m app.rollups [--user ID]
+
+PERIODS = {"day": "d", "week": "w"}
+RUNNING = "c"
+WPM_BUCKET = float(os.getenv("ROLLUP_WPM_BUCKET", "5"))
+TREND_THRESHOLD = float(os.getenv("PROGRESS_TREND_THRESHOLD", "0.05"))
+RECENT_SESSIONS = 10
+
+_R = models.SessionRollup
+_U = models.UserRollup
+_S = models.Session
+
+
+def period_start(day: date, period: str) -> date:
+    return day - timedelta(days=day.weekday()) if period == "w" else day
+
+
+def _add(row, wpm: float, accuracy: float, secs: float) -> None:
+    row.sessions = (row.sessions or 0) + 1
+    row.wpm_sum = (row.wpm_sum or 0.0) + wpm
+    row.accuracy_sum = (row.accuracy_sum or 0.0) + accuracy
+    row.best_wpm = max(row.best_wpm or 0.0, wpm)
+    row.practice_secs = (row.practice_secs or 0.0) + secs
+
+
+def _add_detail(row, wpm: float, errors: int, corrections: int) -> None:
+    row.error_sum = (row.error_sum or 0) + errors
+    row.correction_sum = (row.correction_sum or 0) + corrections
+    hist = json.loads(row.wpm_hist) if row.wpm_hist else {}
+    bucket = str(int(wpm // WPM_BUCKET))
+    hist[bucket] = hist.get(bucket, 0) + 1
+    row.wpm_hist = json.dumps(hist)
+
+
+_ROLLUP_VALUES = ("sessions", "wpm_sum", "accuracy_sum", "best_wpm", "practice_secs",
+                  "error_sum", "correction_sum", "wpm_hist")
+
+
+def _running_rows(db: Session, user_id: int, day: date) -> list:
+    """The running-total rows a session ended on `day` counts in.
+
+    That day's row, started from the previous day's totals if it is new,
+    and any later ones.
+    """
+    rows = list(db.execute(
+        select(_R)
+        .where(_R.user_id == user_id, _R.period == RUNNING, _R.period_start >= day)
+        .order_by(_R.period_start)
+    ).scalars())
+    if not rows or rows[0].period_start != day:
+        prev = db.execute(
+            select(_R)
+            .where(_R.user_id == user_id, _R.period == RUNNING, _R.period_start < day)
+            .order_by(_R.period_start.desc())
+            .limit(1)
+        ).scalars().first()
+        row = _R(user_id=user_id, period=RUNNING, period_start=day,
+                 **({k: getattr(prev, k) for k in _ROLLUP_VALUES} if prev else {}))
+        db.add(row)
+        rows.insert(0, row)
+    return rows
+
+
+def apply_session(db: Session, sess: models.Session, summary: dict) -> None:
+    """Count one ended session in its user's rollups, at most once per session.
+
+    Stages changes only; the caller commits.
+    """
+    if sess.rolled_up or sess.ended_at is None:
+        return
+    wpm = summary["wpm"] or 0.0
+    accuracy = summary["accuracy_percentage"] or 0.0
+    secs = summary["duration_secs"] or 0.0
+    errors = summary.get("error_count") or 0
+    corrections = summary.get("correction_count") or 0
+
+    day = sess.ended_at.date()
+    rows = []
+    for period in PERIODS.values():
+        key = (sess.user_id, period, period_start(day, period))
+        row = db.get(_R, key)
+        if row is None:
+            row = _R(user_id=key[0], period=key[1], period_start=key[2])
+            db.add(row)
+        rows.append(row)
+    rows += _running_rows(db, sess.user_id, day)
+    for row in rows:
+        _add(row, wpm, accuracy, secs)
+        _add_detail(row, wpm, errors, corrections)
+
+    totals = db.get(_U, sess.user_id)
+    if totals is None:
+        totals = _U(user_id=sess.user_id)
+        db.add(totals)
+    _add(totals, wpm, accuracy, secs)
+    totals.avg_wpm = totals.wpm_sum / totals.sessions
+    totals.avg_accuracy = totals.accuracy_sum / totals.sessions
+    sess.rolled_up = True
+
+
+def _empty() -> dict:
+    return {"sessions": 0, "wpm_sum": 0.0, "accuracy_sum": 0.0, "best_wpm": 0.0, "practice_secs": 0.0}
+
+
+def _empty_detail() -> dict:
+    return {**_empty(), "error_sum": 0, "correction_sum": 0, "wpm_hist": {}}
+
+
+def _accumulate(values: dict, wpm: float, accuracy: float, secs: float) -> None:
+    values["sessions"] += 1
+    values["wpm_sum"] += wpm
+    values["accuracy_sum"] += accuracy
+    values["best_wpm"] = max(values["best_wpm"], wpm)
+    values["practice_secs"] += secs
+
+
+def _accumulate_detail(values: dict, wpm: float, errors: int, corrections: int) -> None:
+    values["error_sum"] += errors
+    values["correction_sum"] += corrections
+    bucket = str(int(wpm // WPM_BUCKET))
+    values["wpm_hist"][bucket] = values["wpm_hist"].get(bucket, 0) + 1
+
+
+def _merge(running: dict, values: dict) -> dict:
+    merged = {k: running[k] + values[k] for k in ("sessions", "wpm_sum", "accuracy_sum", "practice_secs",
+                                                  "error_sum", "correction_sum")}
+    merged["best_wpm"] = max(running["best_wpm"], values["best_wpm"])
+    merged["wpm_hist"] = dict(running["wpm_hist"])
+    for bucket, count in values["wpm_hist"].items():
+        merged["wpm_hist"][bucket] = merged["wpm_hist"].get(bucket, 0) + count
+    return merged
+
+
+def _flush(db: Session, user_id: int, buckets: dict, totals: dict) -> None:
+    if not totals["sessions"]:
+        return
+    rows = [
+        {"user_id": user_id, "period": period, "period_start": start, **values}
+        for (period, start), values in buckets.items()
+    ]
+    running = _empty_detail()
+    for (period, start) in sorted(k for k in buckets if k[0] == "d"):
+        running = _merge(running, buckets[(period, start)])
+        rows.append({"user_id": user_id, "period": RUNNING, "period_start": start, **running})
+    db.execute(insert(_R), [{**row, "wpm_hist": json.dumps(row["wpm_hist"])} for row in rows])
+    n = totals["sessions"]
+    db.execute(insert(_U), [{
+        "user_id": user_id, **totals,
+        "avg_wpm": totals["wpm_sum"] / n, "avg_accuracy": totals["accuracy_sum"] / n,
+    }])
+
+
+def rebuild(db: Session, user_id: int | None = None) -> int:
+    """Recompute the rollups of one user (or everyone) from `sessions`; commits.
+
+    Streams the analysed sessions in user order, so memory is bounded by one
+    user's number of active days. Returns the number of sessions counted.
+    """
+    analysed = (_S.ended_at.is_not(None), _S.words_per_minute.is_not(None))
+    if user_id is not None:
+        analysed += (_S.user_id == user_id,)
+        db.execute(delete(_R).where(_R.user_id == user_id))
+        db.execute(delete(_U).where(_U.user_id == user_id))
+    else:
+        db.execute(delete(_R))
+        db.execute(delete(_U))
+
+    rows = db.execute(
+        select(_S.user_id, _S.ended_at, _S.words_per_minute, _S.accuracy_percentage, _S.duration_secs,
+               _S.error_count, _S.correction_count)
+        .where(*analysed)
+        .order_by(_S.user_id)
+        .execution_options(yield_per=1000)
+    )
+    counted = 0
+    current, buckets, totals = None, {}, {}
+    for uid, ended_at, wpm, accuracy, secs, errors, corrections in rows:
+        if uid != current:
+            if current is not None:
+                _flush(db, current, buckets, totals)
+            current, buckets, totals = uid, {}, _empty()
+        values = (wpm, accuracy or 0.0, secs or 0.0)
+        for period in PERIODS.values():
+            bucket = buckets.setdefault((period, period_start(ended_at.date(), period)), _empty_detail())
+            _accumulate(bucket, *values)
+            _accumulate_detail(bucket, wpm, errors or 0, corrections or 0)
+        _accumulate(totals, *values)
+        counted += 1
+    if current is not None:
+        _flush(db, current, buckets, totals)
+
+    db.execute(update(_S).where(*analysed).values(rolled_up=True))
+    db.commit()
+    return counted
+
+
+# ─── reads ───────────────────────────────────────────────────────────────────
+
+def _averages(row) -> dict:
+    n = row.sessions or 0
+    return {
+        "sessions": n,
+        "avg_wpm": row.wpm_sum / n if n else 0.0,
+        "avg_accuracy": row.accuracy_sum / n if n else 0.0,
+        "best_wpm": row.best_wpm or 0.0,
+        "practice_secs": row.practice_secs or 0.0,
+    }
+
+
+def trend(db: Session, user_id: int, period: str, since: date) -> list[dict]:
+    """One point per day/week with sessions, oldest first: a primary key range scan."""
+    rows = db.execute(
+        select(_R)
+        .where(_R.user_id == user_id, _R.period == PERIODS[period], _R.period_start >= since)
+        .order_by(_R.period_start)
+    ).scalars()
+    return [{"period_start": r.period_start, **_averages(r)} for r in rows]
+
+
+def running_totals(db: Session, user_id: int, through: date) -> dict:
+    """Totals of every session the user ended up to and including `through`: one row seek."""
+    row = db.execute(
+        select(*(getattr(_R, k) for k in _ROLLUP_VALUES))
+        .where(_R.user_id == user_id, _R.period == RUNNING, _R.period_start <= through)
+        .order_by(_R.period_start.desc())
+        .limit(1)
+    ).first()
+    if row is None:
+        return _empty_detail()
+    return {**{k: v or 0 for k, v in row._mapping.items()},
+            "wpm_hist": json.loads(row.wpm_hist) if row.wpm_hist else {}}
+
+
+def _between(later: dict, earlier: dict) -> dict:
+    """Totals of the sessions counted in `later` but not `earlier`."""
+    hist = {b: n - earlier["wpm_hist"].get(b, 0) for b, n in later["wpm_hist"].items()}
+    return {
+        **{k: later[k] - earlier[k] for k in ("sessions", "wpm_sum", "accuracy_sum", "practice_secs",
+                                              "error_sum", "correction_sum")},
+        "wpm_hist": {b: n for b, n in hist.items() if n > 0},
+    }
+
+
+def wpm_percentile(hist: dict, q: float) -> float:
+    """The q-quantile (0..1) of a WPM histogram, as its bucket's midpoint."""
+    total = sum(hist.values())
+    if not total:
+        return 0.0
+    seen = 0
+    for bucket in sorted(hist, key=int):
+        seen += hist[bucket]
+        if seen >= q * total:
+            return (int(bucket) + 0.5) * WPM_BUCKET
+    return 0.0
+
+
+def _avg_wpm(totals: dict) -> float:
+    return totals["wpm_sum"] / totals["sessions"] if totals["sessions"] else 0.0
+
+
+def improvement_trend(first: dict, second: dict) -> str:
+    """Compare the average WPM of two consecutive windows."""
+    if not first["sessions"] or not second["sessions"]:
+        return "insufficient_data"
+    before, after = _avg_wpm(first), _avg_wpm(second)
+    if before <= 0:
+        return "improving" if after > 0 else "stable"
+    change = (after - before) / before
+    if change > TREND_THRESHOLD:
+        return "improving"
+    if change < -TREND_THRESHOLD:
+        return "declining"
+    return "stable"
+
+
+def progress(db: Session, user_id: int, days: int, today: date | None = None) -> dict:
+    """Totals, percentiles and trend for the last `days` days (today included).
+
+    Three running-total lookups and one bounded history page, so the cost
+    does not depend on `days` or on how many sessions the user has.
+    """
+    today = today or datetime.now(timezone.utc).date()
+    since = today - timedelta(days=days - 1)
+    middle = since + timedelta(days=days // 2)
+    before, at_middle, now = (running_totals(db, user_id, d)
+                              for d in (since - timedelta(days=1), middle - timedelta(days=1), today))
+    window = _between(now, before)
+    n = window["sessions"]
+    recent = history.page(db, user_id, RECENT_SESSIONS,
+                          since=datetime.combine(since, time.min, tzinfo=timezone.utc))["sessions"]
+    return {
+        "days": days,
+        "sessions_analyzed": n,
+        "avg_wpm": _avg_wpm(window),
+        "avg_accuracy": window["accuracy_sum"] / n if n else 0.0,
+        "total_practice_time": window["practice_secs"],
+        "total_errors": window["error_sum"],
+        "total_corrections": window["correction_sum"],
+        "wpm_percentiles": {f"p{q}": wpm_percentile(window["wpm_hist"], q / 100) for q in (10, 50, 90)},
+        "improvement_trend": improvement_trend(_between(at_middle, before), _between(now, at_middle)),
+        "recent_sessions": recent,
+    }
+
+
+def user_totals(db: Session, user_id: int) -> models.UserRollup | None:
+    return db.get(_U, user_id)
+
+
+def leaderboard(db: Session, metric: str, limit: int, min_sessions: int = 1) -> list[dict]:
+    """Top users by `metric` ('best_wpm' or 'avg_wpm'), read in index order."""
+    column = getattr(_U, metric)
+    rows = db.execute(
+        select(_U)
+        .where(_U.sessions >= min_sessions)
+        .order_by(column.desc(), _U.user_id)
+        .limit(limit)
+    ).scalars()
+    return [
+        {"rank": rank, "user_id": r.user_id, "sessions": r.sessions, "avg_wpm": r.avg_wpm,
+         "avg_accuracy": r.avg_accuracy, "best_wpm": r.best_wpm}
+        for rank, r in enumerate(rows, start=1)
+    ]
+
+
+def rank_of(db: Session, user_id: int, metric: str, min_sessions: int = 1) -> int | None:
+    """The user's leaderboard position (ties share a rank), or None if unranked."""
+    mine = db.get(_U, user_id)
+    if mine is None or mine.sessions < min_sessions:
+        return None
+    column = getattr(_U, metric)
+    ahead = db.execute(
+        select(func.count()).select_from(_U)
+        .where(column > getattr(mine, metric), _U.sessions >= min_sessions)
+    ).scalar()
+    return ahead + 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild the session trend and leaderboard rollups.")
+    parser.add_argument("--user", type=int, help="only rebuild this user's rollups")
+    args = parser.parse_args(argv)
+
+    from .database import SessionLocal
+    with SessionLocal() as db:
+        counted = rebuild(db, args.user)
+    print(f"sessions_counted: {counted}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,60 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
 from fastapi.security import OAuth2PasswordRequestForm
 
-from .. import models, schemas, utils, database
+from .. import models, schemas, utils, database, passwords
 
 router = APIRouter(
     prefix="/auth",
     tags=["auth"],
 )
 
+# The handlers are async so that waiting on the bcrypt pool doesn't hold a
+# threadpool thread; their (short) database work runs in the threadpool.
+
+async def _password_job(coro):
+    try:
+        return await coro
+    except passwords.PoolBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many sign-ins in progress, retry shortly",
+            headers={"Retry-After": "1"},
+        )
+
+def _user_by_email(db: Session, email: str):
+    row = db.query(models.User.id, models.User.password_hash).filter(models.User.email == email).first()
+    # end the transaction so the connection goes back to the pool while bcrypt runs
+    db.rollback()
+    return row
+
+def _create_user(db: Session, email: str, password_hash: str) -> models.User:
+    new_user = models.User(
+        email=email,
+        password_hash=password_hash
+    )
+    db.add(new_user)
+    db.commit()
+    db.refresh(new_user)   # load the generated id
+    return new_user
+
+def _update_hash(db: Session, user_id: int, password_hash: str) -> None:
+    db.query(models.User).filter(models.User.id == user_id).update({"password_hash": password_hash})
+    db.commit()
+
 @router.post(
     "/signup",
     response_model=schemas.UserOut,
     status_code=status.HTTP_201_CREATED,
 )
-def signup(
+async def signup(
     user_in: schemas.UserCreate,
     db: Session = Depends(database.get_db)
 ):
     # 1) Check if the email is already registered
-    existing = db.query(models.User).filter(models.User.email == user_in.email).first()
+    existing = await run_in_threadpool(_user_by_email, db, user_in.email)
     if existing:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -28,16 +62,10 @@ def signup(
         )
 
     # 2) Hash the password
-    hashed_pw = utils.hash_password(user_in.password)
+    hashed_pw = await _password_job(passwords.hasher.hash(user_in.password))
 
     # 3) Create & persist the new user
-    new_user = models.User(
-        email=user_in.email,
-        password_hash=hashed_pw
-    )
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)   # load the generated id
+    new_user = await run_in_threadpool(_create_user, db, user_in.email, hashed_pw)
 
     # 4) Return the newly created user (Pydantic will serialize id & email)
     return new_user
@@ -46,16 +74,23 @@ def signup(
     "/login", 
     response_model=schemas.Token
 )
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(database.get_db)
 ):
-    user = db.query(models.User).filter(models.User.email == form_data.username).first()
-    if not user or not utils.verify_password(form_data.password, user.password_hash):
+    user = await run_in_threadpool(_user_by_email, db, form_data.username)
+    valid, new_hash = False, None
+    if user:
+        valid, new_hash = await _password_job(passwords.hasher.verify(form_data.password, user.password_hash))
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials"
         )
-    
+
+    # the cost factor changed since this hash was made; store the upgraded one
+    if new_hash:
+        await run_in_threadpool(_update_hash, db, user.id, new_hash)
+
     token = utils.create_access_token(str(user.id))
     return schemas.Token(access_token=token, token_type="bearer")
\ No newline at end of file
@@ -0,0 +1,158 @@
+import asyncio
+import time
+
+import anyio
+from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect, status
+from fastapi.concurrency import run_in_threadpool
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy.orm import Session
+
+from .. import ingest, models, schemas, utils
+from ..database import get_db
+
+# Live keystroke ingestion over a WebSocket.
+#
+# Browsers can't set headers on a WebSocket, so the JWT comes in the
+# `token` query param. Clients send {"seq": n, "events": [...]} messages
+# with increasing seq, starting from 0 or above (negative seqs are answered
+# with an error frame); the server validates each message in one pass,
+# buffers the events and writes them through the same path as the JSON
+# upload once FLUSH_SIZE events are buffered or FLUSH_INTERVAL seconds
+# have passed since the oldest one. Every message is answered with
+#   {"type": "ack", "seq": n, "persisted_seq": m, "persisted": total}
+# where persisted_seq is the last seq whose events are committed (-1 until
+# the first write). A
+# {"type": "flush"} message forces a write, and whatever is still buffered
+# is written when the handler exits, however it exits. A failed write keeps
+# the events buffered (and persisted_seq where it was) for that last try.
+
+FLUSH_SIZE = 500
+FLUSH_INTERVAL = 1.0  # seconds
+
+router = APIRouter(
+    prefix="/typing",
+    tags=["typing"],
+)
+
+_events_adapter = TypeAdapter(list[schemas.KeystrokeEventIn])
+
+
+class _Buffer:
+    __slots__ = ("events", "first_at", "seq", "persisted", "persisted_seq")
+
+    def __init__(self):
+        self.events = []
+        self.first_at = None
+        self.seq = -1            # highest seq received
+        self.persisted = 0       # events committed over this connection
+        self.persisted_seq = -1  # highest seq whose events are committed
+
+    def add(self, seq: int, events: list) -> None:
+        if events and not self.events:
+            self.first_at = time.monotonic()
+        self.events.extend(events)
+        self.seq = seq
+
+    def due(self) -> bool:
+        return len(self.events) >= FLUSH_SIZE
+
+
+def _authorize(db: Session, token: str, sid: int) -> models.Session | None:
+    try:
+        user_id = int(utils.verify_access_token(token))
+    except Exception:
+        return None
+    session = db.get(models.Session, sid)
+    if not session or session.user_id != user_id:
+        return None
+    return session
+
+
+def _write(db: Session, session: models.Session, events: list) -> None:
+    try:
+        ingest.store_keystrokes(db, session, events)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+
+@router.websocket("/sessions/{sid}/stream")
+async def stream_keystrokes(
+    websocket: WebSocket,
+    sid: int,
+    token: str,
+    db: Session = Depends(get_db),
+):
+    session = await run_in_threadpool(_authorize, db, token, sid)
+    if session is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await websocket.accept()
+
+    buffer = _Buffer()
+
+    async def flush():
+        if buffer.events:
+            events = buffer.events
+            await run_in_threadpool(_write, db, session, events)
+            buffer.events = []
+            buffer.persisted += len(events)
+        buffer.persisted_seq = buffer.seq
+
+    async def ack(kind: str, seq: int | None = None):
+        await websocket.send_json({
+            "type": kind,
+            "seq": seq,
+            "persisted_seq": buffer.persisted_seq,
+            "persisted": buffer.persisted,
+        })
+
+    try:
+        while True:
+            timeout = None
+            if buffer.events:
+                timeout = max(0.0, buffer.first_at + FLUSH_INTERVAL - time.monotonic())
+            try:
+                message = await asyncio.wait_for(websocket.receive_json(), timeout)
+            except asyncio.TimeoutError:
+                await flush()
+                await ack("flushed")
+                continue
+            except (ValueError, KeyError):
+                # not JSON, or a binary frame
+                await websocket.send_json({"type": "error", "seq": None, "detail": "expected a JSON text frame"})
+                continue
+
+            if not isinstance(message, dict):
+                await websocket.send_json({"type": "error", "seq": None, "detail": "expected a JSON object"})
+                continue
+            if message.get("type") == "flush":
+                await flush()
+                await ack("ack", buffer.seq)
+                continue
+
+            seq = message.get("seq")
+            if not isinstance(seq, int) or isinstance(seq, bool) or seq < 0:
+                await websocket.send_json({"type": "error", "seq": seq, "detail": "seq must be a non-negative integer"})
+                continue
+            if seq <= buffer.seq:
+                # resent after a missed ack; already buffered
+                await ack("ack", seq)
+                continue
+            try:
+                events = _events_adapter.validate_python(message.get("events") or [])
+            except ValidationError as exc:
+                await websocket.send_json({"type": "error", "seq": seq, "detail": exc.errors(include_url=False, include_context=False)})
+                continue
+
+            buffer.add(seq, events)
+            if buffer.due():
+                await flush()
+            await ack("ack", seq)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        # don't lose the tail of the session, whatever ended the loop
+        with anyio.CancelScope(shield=True):
+            await flush()
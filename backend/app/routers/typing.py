@@ -1,12 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Literal
+import orjson
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from app.database import get_db
-from ..dependencies import get_current_user
-from app import models, schemas
-from datetime import datetime, timezone
-import difflib
-from collections import defaultdict
+from ..dependencies import COMPLETE_OPENAPI, KEYSTROKES_OPENAPI, complete_payload, get_current_user, keystroke_rows
+from app import models, schemas, analytics, char_stats, compact_summary, detailed_analysis, history, ingest, live, profiles, rollups, summaries
+from app.auth_cache import UserSnapshot
+from app.alignment import analyze_errors
+from app.metrics import timed
+from datetime import datetime, timedelta, timezone
 
+@timed("calculate_accuracy")
 def calculate_accuracy(target_text: str, user_input: str) -> float:
     """Calculate typing accuracy as percentage of correct characters."""
     if not target_text:
@@ -30,96 +34,95 @@ def calculate_accuracy(target_text: str, user_input: str) -> float:
     accuracy = (correct_chars / total_chars) * 100 if total_chars > 0 else 100.0
     return min(100.0, accuracy)
 
-def analyze_errors(target_text: str, user_input: str) -> dict:
-    """Analyze typing errors in detail."""
-    if not target_text:
-        return {
-            'total_errors': 0,
-            'substitutions': [],
-            'insertions': [],
-            'deletions': [],
-            'error_positions': [],
-            'problematic_characters': {},
-            'accuracy_by_position': []
-        }
-    
-    # Use difflib to find differences
-    matcher = difflib.SequenceMatcher(None, target_text, user_input)
-    opcodes = matcher.get_opcodes()
-    
-    substitutions = []
-    insertions = []
-    deletions = []
-    error_positions = []
-    problematic_chars = defaultdict(int)
-    
-    total_errors = 0
-    
-    for tag, i1, i2, j1, j2 in opcodes:
-        if tag == 'replace':  # Substitution
-            for i, j in zip(range(i1, i2), range(j1, j2)):
-                target_char = target_text[i] if i < len(target_text) else ''
-                user_char = user_input[j] if j < len(user_input) else ''
-                substitutions.append({
-                    'position': i,
-                    'expected': target_char,
-                    'actual': user_char
-                })
-                problematic_chars[target_char] += 1
-                error_positions.append(i)
-                total_errors += 1
-                
-        elif tag == 'delete':  # Missing characters (deletions)
-            for i in range(i1, i2):
-                deletions.append({
-                    'position': i,
-                    'expected': target_text[i],
-                    'actual': ''
-                })
-                problematic_chars[target_text[i]] += 1
-                error_positions.append(i)
-                total_errors += 1
-                
-        elif tag == 'insert':  # Extra characters (insertions)
-            for j in range(j1, j2):
-                insertions.append({
-                    'position': i1,  # Position in target where extra char was inserted
-                    'expected': '',
-                    'actual': user_input[j]
-                })
-                error_positions.append(i1)
-                total_errors += 1
-    
-    # Calculate accuracy by position (for identifying problem areas)
-    accuracy_by_position = []
-    for i, char in enumerate(target_text):
-        if i < len(user_input):
-            accuracy_by_position.append(1 if target_text[i] == user_input[i] else 0)
-        else:
-            accuracy_by_position.append(0)  # Missing character
-    
-    return {
-        'total_errors': total_errors,
-        'substitutions': substitutions,
-        'insertions': insertions,
-        'deletions': deletions,
-        'error_positions': error_positions,
-        'problematic_characters': dict(problematic_chars),
-        'accuracy_by_position': accuracy_by_position,
-        'error_rate': (total_errors / len(target_text)) * 100 if target_text else 0
-    }
-
 router = APIRouter(
     prefix="/typing",
     tags=["typing"],
     dependencies=[Depends(get_current_user)],
 )
 
+@router.get("/sessions", response_model=schemas.SessionPage)
+def list_sessions(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    min_wpm: float | None = None,
+    db: Session = Depends(get_db),
+    user: UserSnapshot = Depends(get_current_user),
+):
+    # keyset pagination: every page is one index range scan, however deep
+    try:
+        return history.page(db, user.id, limit, cursor, since, until, min_wpm)
+    except history.InvalidCursor:
+        raise HTTPException(400, "Invalid cursor")
+
+@router.get("/sessions/history", response_model=schemas.SessionHistoryOut)
+def session_history(
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+    user: UserSnapshot = Depends(get_current_user),
+):
+    totals = rollups.user_totals(db, user.id)
+    return {
+        "sessions": history.offset_page(db, user.id, limit, offset),
+        "total_count": totals.sessions if totals else 0,
+        "offset": offset,
+        "limit": limit,
+    }
+
+@router.get("/trends", response_model=schemas.TrendOut)
+def session_trends(
+    period: Literal["day", "week"] = "day",
+    days: int = Query(90, ge=1, le=3660),
+    db: Session = Depends(get_db),
+    user: UserSnapshot = Depends(get_current_user),
+):
+    # one rollup row per period, so the cost follows `days`, not the session count
+    since = rollups.period_start(datetime.now(timezone.utc).date() - timedelta(days=days - 1),
+                                 rollups.PERIODS[period])
+    return {"period": period, "points": rollups.trend(db, user.id, period, since)}
+
+@router.get("/leaderboard", response_model=schemas.LeaderboardOut)
+def leaderboard(
+    metric: Literal["best_wpm", "avg_wpm"] = "best_wpm",
+    limit: int = Query(10, ge=1, le=100),
+    min_sessions: int = Query(1, ge=1),
+    db: Session = Depends(get_db),
+    user: UserSnapshot = Depends(get_current_user),
+):
+    return {
+        "metric": metric,
+        "entries": rollups.leaderboard(db, metric, limit, min_sessions),
+        "your_rank": rollups.rank_of(db, user.id, metric, min_sessions),
+    }
+
+@router.get("/analytics/progress", response_model=schemas.ProgressOut)
+def progress_analytics(
+    days: int = Query(30, ge=1, le=3660),
+    db: Session = Depends(get_db),
+    user: UserSnapshot = Depends(get_current_user),
+):
+    # running-total rollup rows: the same few lookups for a 30-day or a 10-year window
+    return rollups.progress(db, user.id, days)
+
+@router.get("/analytics/character-problems", response_model=schemas.CharacterProblemsOut)
+def character_problems(
+    limit: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_db),
+    user: UserSnapshot = Depends(get_current_user),
+):
+    # two small indexed reads over pre-aggregated per-user rows, whatever the history size
+    return {
+        "problematic_characters": char_stats.character_problems(db, user.id, limit),
+        "total_sessions_analyzed": profiles.total_sessions(db, user.id),
+    }
+
 @router.post("/sessions/start", response_model=schemas.SessionStartOut)
 def start_session(
     payload: schemas.SessionStartIn,
     db: Session = Depends(get_db),
-    user: models.User = Depends(get_current_user)
+    user: UserSnapshot = Depends(get_current_user)
 ):
     # create a new Session row tied to the current_user
     session = models.Session(user_id=user.id, target_text = payload.prompt)
@@ -132,139 +135,261 @@ def start_session(
     # return these fields to the client
     return {"session_id": session.id, "started_at": session.started_at, "prompt": session.target_text}
 
-@router.post("/sessions/{sid}/keystrokes", response_model=schemas.KeystrokesUploadOut)
+@router.post(
+    "/sessions/{sid}/keystrokes",
+    response_model=schemas.KeystrokesUploadOut,
+    openapi_extra=KEYSTROKES_OPENAPI,
+)
 def upload_keystrokes(
     sid: int,
-    events: list[schemas.KeystrokeEventIn],
+    rows: list[tuple] = Depends(keystroke_rows),
     db: Session = Depends(get_db),
-    user: models.User = Depends(get_current_user),
+    user: UserSnapshot = Depends(get_current_user),
 ):
     session = db.get(models.Session, sid)
     if not session or session.user_id != user.id:
         raise HTTPException(404, "Session not found")
 
-    objs = [
-        models.KeystrokeEvent(
-            session_id=sid, 
-            key=e.key, 
-            down_ts=e.down_ts, 
-            up_ts=e.up_ts,
-            target_char=e.target_char,
-            position_in_text=e.position_in_text,
-            is_correction=e.is_correction,
-            is_error=e.is_error
-        )
-        for e in events
-    ]
-    db.bulk_save_objects(objs)
+    count = ingest.store_rows(db, session, rows)
     db.commit()
-    return {"count": len(objs)}
+    return {"count": count}
 
 @router.post("/sessions/{sid}/input")
 def upload_user_input(
     sid: int,
     payload: dict,
     db: Session = Depends(get_db),
-    user: models.User = Depends(get_current_user),
+    user: UserSnapshot = Depends(get_current_user),
 ):
     session = db.get(models.Session, sid)
     if not session or session.user_id != user.id:
         raise HTTPException(404, "Session not found")
 
     session.user_input = payload.get("user_input")
+    if session.ended_at:
+        summaries.invalidate(db, sid)
     db.commit()
     return {"message": "User input saved"}
 
+@router.get("/sessions/{sid}/live", response_model=schemas.LiveSnapshot)
+def live_snapshot(
+    sid: int,
+    db: Session = Depends(get_db),
+    user: UserSnapshot = Depends(get_current_user),
+):
+    # served from memory; the state carries the owner, so no query needed
+    snapshot = live.store.snapshot(sid, user.id)
+    if snapshot is not None:
+        return snapshot
+
+    session = db.get(models.Session, sid)
+    if not session or session.user_id != user.id:
+        raise HTTPException(404, "Session not found")
+    if session.ended_at is not None:
+        # /end dropped its state; don't cache a new one nothing would drop
+        cols = analytics.load_keystroke_columns(db, sid, with_keys=True)
+        events = zip(cols.key.tolist(), cols.down_ts.tolist(), cols.up_ts.tolist())
+        return live.build(sid, user.id, session.target_text, events).snapshot()
+
+    # batches committed while the columns are read are queued, then replayed
+    live.store.begin_rebuild(sid)
+    try:
+        cols = analytics.load_keystroke_columns(db, sid, with_keys=True)
+    except BaseException:
+        live.store.drop(sid)
+        raise
+    events = zip(cols.key.tolist(), cols.down_ts.tolist(), cols.up_ts.tolist())
+    return live.store.rebuild(sid, user.id, session.target_text, events)
+
 @router.post("/sessions/{sid}/end")
 def end_session(
     sid: int,
     db: Session = Depends(get_db),
-    user: models.User = Depends(get_current_user),
+    user: UserSnapshot = Depends(get_current_user),
 ):
     session = db.get(models.Session, sid)
     if not session or session.user_id != user.id:
         raise HTTPException(404, "Session not found")
 
     session.ended_at = datetime.now(timezone.utc)
+    # compute the summary once here; GET /summary then just reads it back
+    finish_session(db, session)
     db.commit()
+    live.store.drop(sid)
     return {"ended_at": session.ended_at}
 
-@router.get("/sessions/{sid}/summary", response_model=schemas.SessionSummary)
-def summarize_session(
+@router.post("/sessions/{sid}/complete", response_model=schemas.SessionSummary, openapi_extra=COMPLETE_OPENAPI)
+def complete_session(
     sid: int,
+    payload: schemas.SessionCompleteIn = Depends(complete_payload),
     db: Session = Depends(get_db),
-    user: models.User = Depends(get_current_user),
+    user: UserSnapshot = Depends(get_current_user),
 ):
-    # 1) Fetch & authorize
-    sess = db.get(models.Session, sid)
-    if not sess or sess.user_id != user.id or not sess.ended_at:
-        raise HTTPException(404, "Completed session not found")
+    """Keystrokes upload, /input, /end and /summary in one request and one transaction."""
+    session = db.get(models.Session, sid)
+    if not session or session.user_id != user.id:
+        raise HTTPException(404, "Session not found")
 
-    # 2) Load events sorted by timestamp
-    events = (
-        db.query(models.KeystrokeEvent)
-          .filter_by(session_id=sid)
-          .order_by(models.KeystrokeEvent.down_ts)
-          .all()
-    )
-
-    # 3) Analyze errors and compute comprehensive metrics
-    target_text = sess.target_text
-    user_input = sess.user_input or ""
-    
+    if session.ended_at:
+        # a retry of a completed request: its batch is already stored, so
+        # answer with the summary instead of storing it twice
+        stored = summaries.get_stored_payload(db, sid, user.id)
+        if stored is not None:
+            return compact_summary.stored_summary_response(stored, False, None)
+        if session.keystrokes_purged:
+            return compact_summary.stored_summary_response(purged_summary(db, session), False, None)
+        stored = finish_session(db, session)
+        db.commit()
+        return compact_summary.stored_summary_response(stored, False, None)
+
+    # ended first, so the batch isn't fed to live state that is dropped below
+    session.ended_at = completed_at(payload.ended_at, session.started_at)
+    ingest.store_rows(db, session, ingest.rows_from_events(payload.keystrokes))
+    session.user_input = payload.user_input
+    stored = finish_session(db, session)
+    db.commit()
+    live.store.drop(sid)
+    return compact_summary.stored_summary_response(stored, False, None)
+
+def compute_summary(sid: int, target_text: str, user_input: str, cols: analytics.KeystrokeColumns) -> dict:
+    """The CPU-bound part of a summary: no database access."""
     # Error analysis using string comparison
     accuracy_percentage = calculate_accuracy(target_text, user_input)
     error_analysis = analyze_errors(target_text, user_input)
     
-    # Count keystrokes by type
-    correction_count = len([e for e in events if e.is_correction])
-    error_events = [e for e in events if e.is_error]
-    
-    # Basic timing metrics
-    count = len(events)
-    
-    if count == 0:
-        duration = 0
-        wpm = 0
-        avg_dwell = 0
-        avg_flight = 0
-    else:
-        first_down = events[0].down_ts
-        last_up = events[-1].up_ts
-        duration = last_up - first_down
-        
-        # Calculate WPM based on characters typed (more accurate)
-        chars_typed = len(user_input)
-        wpm = (chars_typed / 5) / (duration / 60) if duration > 0 else 0
-
-        dwells = [(e.up_ts - e.down_ts)*1000 for e in events]
-        flights = [
-            (events[i].down_ts - events[i-1].up_ts)*1000
-            for i in range(1, count)
-        ]
-        avg_dwell = sum(dwells) / len(dwells) if dwells else 0
-        avg_flight = sum(flights)/ len(flights) if flights else 0
-
-    # Update session with computed metrics
-    sess.accuracy_percentage = accuracy_percentage
-    sess.error_count = error_analysis['total_errors']
-    sess.correction_count = correction_count
-    sess.words_per_minute = wpm
-    sess.characters_per_minute = chars_typed / (duration / 60) if duration > 0 else 0
-    db.commit()
-    
-    # 4) Return the enhanced summary
+    # Timing metrics and keystroke counts in one vectorized pass
+    stats = analytics.keystroke_stats(cols)
+    chars_typed = len(user_input)
+    wpm = stats.wpm(chars_typed)
+    cpm = stats.cpm(chars_typed)
+
     return {
         "session_id": sid,
-        "duration_secs": duration,
-        "keystroke_count": count,
+        "duration_secs": stats.duration_secs,
+        "keystroke_count": stats.count,
         "wpm": wpm,
-        "avg_dwell_ms": avg_dwell,
-        "avg_flight_ms": avg_flight,
+        "cpm": cpm,
+        "avg_dwell_ms": stats.avg_dwell_ms,
+        "avg_flight_ms": stats.avg_flight_ms,
+        "dwell_percentiles_ms": stats.dwell_percentiles_ms,
+        "flight_percentiles_ms": stats.flight_percentiles_ms,
         "accuracy_percentage": accuracy_percentage,
         "error_count": error_analysis['total_errors'],
-        "correction_count": correction_count,
+        "correction_count": stats.correction_count,
         "error_details": error_analysis,
         "user_input": user_input,
         "target_text": target_text,
     }
+
+def _aware(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+def completed_at(requested: datetime | None, started_at: datetime | None) -> datetime:
+    """End time for a completed session: the client's, if given, clamped to [started_at, now]."""
+    now = datetime.now(timezone.utc)
+    if requested is None:
+        return now
+    ended = min(_aware(requested), now)
+    if started_at is not None:
+        ended = max(ended, _aware(started_at))
+    return ended
+
+def apply_summary_metrics(sess: models.Session, summary: dict) -> None:
+    """Copy the headline metrics onto the sessions row."""
+    sess.accuracy_percentage = summary["accuracy_percentage"]
+    sess.error_count = summary["error_count"]
+    sess.correction_count = summary["correction_count"]
+    sess.words_per_minute = summary["wpm"]
+    sess.characters_per_minute = summary["cpm"]
+    sess.duration_secs = summary["duration_secs"]
+
+def build_summary(db: Session, sess: models.Session) -> dict:
+    """Run the full analysis for an ended session and stage its metrics on the row."""
+    # Load the keystroke columns sorted by timestamp
+    cols = analytics.load_keystroke_columns(db, sess.id)
+    summary = compute_summary(sess.id, sess.target_text, sess.user_input or "", cols)
+    apply_summary_metrics(sess, summary)
+    return summary
+
+def purged_summary(db: Session, sess: models.Session) -> bytes:
+    """The last stored summary of a session whose keystrokes retention dropped, of any version."""
+    stored = summaries.get_stored_payload(db, sess.id, sess.user_id, any_version=True)
+    if stored is None:
+        raise HTTPException(410, "Keystrokes for this session have been purged")
+    return stored
+
+def finish_session(db: Session, sess: models.Session) -> bytes:
+    """Analyse an ended session and stage its summary, profile and rollup updates; the caller commits.
+
+    Returns the stored summary payload, so the response is served (and tagged)
+    exactly as later reads of it are.
+    """
+    summary = build_summary(db, sess)
+    payload = summaries.store(db, sess, summary)
+    profiles.apply_session(db, sess, summary)
+    rollups.apply_session(db, sess, summary)
+    return payload
+
+@router.get("/sessions/{sid}/summary", response_model=schemas.SessionSummary)
+def summarize_session(
+    sid: int,
+    format: Literal["full", "compact"] = "full",
+    accept: str | None = Header(None),
+    if_none_match: str | None = Header(None),
+    db: Session = Depends(get_db),
+    user: UserSnapshot = Depends(get_current_user),
+):
+    """The session's summary; `format=compact` (or Accept: compact_summary.COMPACT_MEDIA_TYPE)
+    returns run-length / bitset per-position data instead."""
+    compact = compact_summary.wants_compact(format, accept)
+
+    # 1) Ended sessions are immutable, so a stored summary is a one-row read,
+    #    served as the stored JSON without a pydantic round trip (or as a 304)
+    stored = summaries.get_stored_payload(db, sid, user.id)
+    if stored is not None:
+        return compact_summary.stored_summary_response(stored, compact, if_none_match)
+
+    # 2) Fetch & authorize
+    sess = db.get(models.Session, sid)
+    if not sess or sess.user_id != user.id or not sess.ended_at:
+        raise HTTPException(404, "Completed session not found")
+
+    # 3) Purged keystrokes can't be re-analysed: keep serving what was stored
+    if sess.keystrokes_purged:
+        return compact_summary.stored_summary_response(purged_summary(db, sess), compact, if_none_match)
+
+    # 4) First read (or stale version): compute once and keep it
+    stored = finish_session(db, sess)
+    db.commit()
+    return compact_summary.stored_summary_response(stored, compact, if_none_match)
+
+@router.get("/sessions/{sid}/analysis", response_model=schemas.DetailedAnalysis)
+def analyse_session(
+    sid: int,
+    db: Session = Depends(get_db),
+    user: UserSnapshot = Depends(get_current_user),
+):
+    # ended sessions: stored on first read, like the summary
+    stored = detailed_analysis.get_stored_json(db, sid, user.id)
+    if stored is not None:
+        return Response(stored, media_type="application/json")
+
+    sess = db.get(models.Session, sid)
+    if not sess or sess.user_id != user.id:
+        raise HTTPException(404, "Session not found")
+    if sess.keystrokes_purged:
+        raise HTTPException(410, "Keystrokes for this session have been purged")
+
+    analysis = detailed_analysis.analyse(sid, detailed_analysis.stream_rows(db, sid))
+    if sess.ended_at:
+        detailed_analysis.store(db, sess, analysis)
+        db.commit()
+    return Response(orjson.dumps(analysis), media_type="application/json")
+
+@router.get("/profile", response_model=schemas.TypingProfileOut)
+def get_typing_profile(
+    db: Session = Depends(get_db),
+    user: UserSnapshot = Depends(get_current_user),
+):
+    # maintained incrementally as sessions end, so this is a single row read
+    return profiles.profile_out(profiles.get_profile(db, user.id), user.id)
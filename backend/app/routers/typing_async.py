@@ -0,0 +1,151 @@
+from datetime import datetime, timezone
+
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import analytics, archive, compact_summary, ingest, live, models, profiles, rollups, schemas, summaries
+from app.auth_cache import UserSnapshot
+from app.database import get_async_db
+from ..dependencies import COMPLETE_OPENAPI, KEYSTROKES_OPENAPI, complete_payload, get_current_user_async, keystroke_rows
+from .typing import apply_summary_metrics, completed_at, compute_summary, purged_summary
+
+# Async versions of the hot typing handlers, mounted ahead of the sync
+# router when USE_ASYNC_DB is set so they take over these paths. Database
+# I/O awaits on the async engine; the analysis itself runs in the
+# threadpool so a long passage doesn't stall the event loop. Helpers that
+# are shared with the sync stack run through AsyncSession.run_sync.
+
+router = APIRouter(
+    prefix="/typing",
+    tags=["typing"],
+    dependencies=[Depends(get_current_user_async)],
+)
+
+
+async def _owned_session(db: AsyncSession, sid: int, user: UserSnapshot) -> models.Session:
+    session = await db.get(models.Session, sid)
+    if not session or session.user_id != user.id:
+        raise HTTPException(404, "Session not found")
+    return session
+
+
+async def _build_and_store_summary(db: AsyncSession, sess: models.Session) -> bytes:
+    """Async finish_session: returns the stored summary payload."""
+    rows = (await db.execute(analytics.keystroke_columns_query(sess.id))).all()
+    rows = archive.summary_rows(await db.get(models.KeystrokeArchive, sess.id), rows)
+    summary = await run_in_threadpool(
+        lambda: compute_summary(sess.id, sess.target_text, sess.user_input or "",
+                                analytics.columns_from_rows(rows))
+    )
+
+    def persist(sync_db):
+        apply_summary_metrics(sess, summary)
+        payload = summaries.store(sync_db, sess, summary)
+        profiles.apply_session(sync_db, sess, summary)
+        rollups.apply_session(sync_db, sess, summary)
+        return payload
+
+    return await db.run_sync(persist)
+
+
+@router.post("/sessions/start", response_model=schemas.SessionStartOut)
+async def start_session(
+    payload: schemas.SessionStartIn,
+    db: AsyncSession = Depends(get_async_db),
+    user: UserSnapshot = Depends(get_current_user_async),
+):
+    session = models.Session(user_id=user.id, target_text=payload.prompt)
+    db.add(session)
+    await db.commit()
+    await db.refresh(session)
+    return {"session_id": session.id, "started_at": session.started_at, "prompt": session.target_text}
+
+
+@router.post(
+    "/sessions/{sid}/keystrokes",
+    response_model=schemas.KeystrokesUploadOut,
+    openapi_extra=KEYSTROKES_OPENAPI,
+)
+async def upload_keystrokes(
+    sid: int,
+    rows: list[tuple] = Depends(keystroke_rows),
+    db: AsyncSession = Depends(get_async_db),
+    user: UserSnapshot = Depends(get_current_user_async),
+):
+    session = await _owned_session(db, sid, user)
+    count = await db.run_sync(lambda sync_db: ingest.store_rows(sync_db, session, rows))
+    await db.commit()
+    return {"count": count}
+
+
+@router.post("/sessions/{sid}/end")
+async def end_session(
+    sid: int,
+    db: AsyncSession = Depends(get_async_db),
+    user: UserSnapshot = Depends(get_current_user_async),
+):
+    session = await _owned_session(db, sid, user)
+    session.ended_at = datetime.now(timezone.utc)
+    await _build_and_store_summary(db, session)
+    await db.commit()
+    live.store.drop(sid)
+    return {"ended_at": session.ended_at}
+
+
+@router.post("/sessions/{sid}/complete", response_model=schemas.SessionSummary, openapi_extra=COMPLETE_OPENAPI)
+async def complete_session(
+    sid: int,
+    payload: schemas.SessionCompleteIn = Depends(complete_payload),
+    db: AsyncSession = Depends(get_async_db),
+    user: UserSnapshot = Depends(get_current_user_async),
+):
+    session = await _owned_session(db, sid, user)
+    if session.ended_at:
+        # a retry of a completed request: answer without storing the batch again
+        stored = await db.run_sync(lambda sync_db: summaries.get_stored_payload(sync_db, sid, user.id))
+        if stored is not None:
+            return compact_summary.stored_summary_response(stored, False, None)
+        if session.keystrokes_purged:
+            stored = await db.run_sync(lambda sync_db: purged_summary(sync_db, session))
+            return compact_summary.stored_summary_response(stored, False, None)
+        stored = await _build_and_store_summary(db, session)
+        await db.commit()
+        return compact_summary.stored_summary_response(stored, False, None)
+
+    session.ended_at = completed_at(payload.ended_at, session.started_at)
+    rows = ingest.rows_from_events(payload.keystrokes)
+    await db.run_sync(lambda sync_db: ingest.store_rows(sync_db, session, rows))
+    session.user_input = payload.user_input
+    stored = await _build_and_store_summary(db, session)
+    await db.commit()
+    live.store.drop(sid)
+    return compact_summary.stored_summary_response(stored, False, None)
+
+
+@router.get("/sessions/{sid}/summary", response_model=schemas.SessionSummary)
+async def summarize_session(
+    sid: int,
+    format: Literal["full", "compact"] = "full",
+    accept: str | None = Header(None),
+    if_none_match: str | None = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+    user: UserSnapshot = Depends(get_current_user_async),
+):
+    compact = compact_summary.wants_compact(format, accept)
+    stored = await db.run_sync(lambda sync_db: summaries.get_stored_payload(sync_db, sid, user.id))
+    if stored is not None:
+        return compact_summary.stored_summary_response(stored, compact, if_none_match)
+
+    sess = await db.get(models.Session, sid)
+    if not sess or sess.user_id != user.id or not sess.ended_at:
+        raise HTTPException(404, "Completed session not found")
+    if sess.keystrokes_purged:
+        stored = await db.run_sync(lambda sync_db: purged_summary(sync_db, sess))
+        return compact_summary.stored_summary_response(stored, compact, if_none_match)
+
+    stored = await _build_and_store_summary(db, sess)
+    await db.commit()
+    return compact_summary.stored_summary_response(stored, compact, if_none_match)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, ConfigDict, EmailStr
-from datetime import datetime
+from datetime import date, datetime
 
 class UserCreate(BaseModel):
     email: EmailStr
@@ -37,6 +37,28 @@ class KeystrokeEventIn(BaseModel):
 class KeystrokesUploadOut(BaseModel):
     count: int
 
+class SessionCompleteIn(BaseModel):
+    keystrokes: list[KeystrokeEventIn] = []
+    user_input: str
+    ended_at: datetime | None = None  # client clock; capped at the server's now
+
+class LiveSnapshot(BaseModel):
+    session_id: int
+    keystrokes: int
+    position: int  # characters currently typed
+    target_length: int
+    progress: float  # 0..1
+    next_char: str | None = None
+    uncorrected_errors: int
+    wpm: float  # over the last live.WPM_WINDOW seconds
+    accuracy: float  # % of typed characters that were right when typed
+    rolling_accuracy: float  # same, over the last live.ACCURACY_WINDOW characters
+    avg_dwell_ms: float
+    dwell_std_ms: float
+    avg_flight_ms: float
+    flight_std_ms: float
+    elapsed_secs: float
+
 class ErrorDetail(BaseModel):
     position: int
     expected: str
@@ -47,6 +69,7 @@ class ErrorAnalysis(BaseModel):
     substitutions: list[ErrorDetail]
     insertions: list[ErrorDetail]
     deletions: list[ErrorDetail]
+    transpositions: list[ErrorDetail] = []
     error_positions: list[int]
     problematic_characters: dict[str, int]
     accuracy_by_position: list[int]
@@ -57,8 +80,11 @@ class SessionSummary(BaseModel):
     duration_secs: float
     keystroke_count: int
     wpm: float
+    cpm: float = 0.0
     avg_dwell_ms: float
     avg_flight_ms: float
+    dwell_percentiles_ms: dict[str, float] = {}
+    flight_percentiles_ms: dict[str, float] = {}
     accuracy_percentage: float | None = None
     error_count: int = 0
     correction_count: int = 0
@@ -80,6 +106,16 @@ class BigramAnalysis(BaseModel):
     count: int
     difficulty_score: float
 
+class CharacterProblem(BaseModel):
+    character: str
+    error_count: int
+    total_typed: int
+    error_rate: float  # % of presses that were errors
+
+class CharacterProblemsOut(BaseModel):
+    problematic_characters: list[CharacterProblem]  # hardest first, see char_stats.difficulty
+    total_sessions_analyzed: int
+
 class DetailedAnalysis(BaseModel):
     session_id: int
     slow_characters: list[CharacterAnalysis]
@@ -87,3 +123,73 @@ class DetailedAnalysis(BaseModel):
     common_errors: dict[str, int]
     typing_rhythm: dict[str, float]  # Metrics about typing consistency
     improvement_areas: list[str]  # AI-generated suggestions
+
+class TypingProfileOut(BaseModel):
+    user_id: int
+    avg_wpm: float = 0.0
+    avg_accuracy: float = 0.0
+    recent_wpm: float = 0.0
+    recent_accuracy: float = 0.0
+    total_sessions: int = 0
+    slow_characters: dict[str, float] = {}  # char -> avg dwell ms, slowest first
+    error_prone_characters: dict[str, float] = {}  # char -> error rate
+    difficult_bigrams: dict[str, float] = {}  # bigram -> avg flight ms
+    common_errors: dict[str, int] = {}
+    updated_at: datetime | None = None
+
+class SessionHistoryItem(BaseModel):
+    id: int
+    started_at: datetime
+    ended_at: datetime
+    target_text: str
+    words_per_minute: float | None = None
+    accuracy_percentage: float | None = None
+    error_count: int = 0
+    correction_count: int = 0
+
+class SessionPage(BaseModel):
+    sessions: list[SessionHistoryItem]
+    next_cursor: str | None = None  # pass as ?cursor= for the next page; None on the last page
+
+class SessionHistoryOut(BaseModel):
+    sessions: list[SessionHistoryItem]
+    total_count: int
+    offset: int
+    limit: int
+
+class TrendPoint(BaseModel):
+    period_start: date
+    sessions: int
+    avg_wpm: float
+    avg_accuracy: float
+    best_wpm: float
+    practice_secs: float
+
+class TrendOut(BaseModel):
+    period: str  # "day" or "week"
+    points: list[TrendPoint]  # oldest first, periods without sessions omitted
+
+class ProgressOut(BaseModel):
+    days: int
+    sessions_analyzed: int
+    avg_wpm: float
+    avg_accuracy: float
+    total_practice_time: float  # seconds
+    total_errors: int
+    total_corrections: int
+    wpm_percentiles: dict[str, float]  # p10 / p50 / p90, see rollups.WPM_BUCKET
+    improvement_trend: str  # "improving", "declining", "stable" or "insufficient_data"
+    recent_sessions: list[SessionHistoryItem]  # newest first, at most rollups.RECENT_SESSIONS
+
+class LeaderboardEntry(BaseModel):
+    rank: int
+    user_id: int
+    sessions: int
+    avg_wpm: float
+    avg_accuracy: float
+    best_wpm: float
+
+class LeaderboardOut(BaseModel):
+    metric: str
+    entries: list[LeaderboardEntry]
+    your_rank: int | None = None
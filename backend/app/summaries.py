@@ -0,0 +1,69 @@
+import zlib
+from datetime import datetime, timezone
+
+import orjson
+from sqlalchemy.orm import Session
+
+from . import models
+from .metrics import timed
+
+# Bump whenever the summary computation or its shape changes; stored
+# summaries with another version are recomputed on their next read.
+SUMMARY_VERSION = 1
+
+
+def dumps(summary: dict) -> bytes:
+    """Summary JSON, as stored and as served."""
+    return orjson.dumps(summary, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+@timed("summary_encode")
+def encode(summary: dict) -> bytes:
+    return zlib.compress(dumps(summary))
+
+
+@timed("summary_decode")
+def decode(payload: bytes) -> dict:
+    return orjson.loads(zlib.decompress(payload))
+
+
+def payload_json(payload: bytes) -> bytes:
+    """JSON bytes of a stored (compressed) payload."""
+    return zlib.decompress(payload)
+
+
+def get_stored_payload(db: Session, session_id: int, user_id: int, any_version: bool = False) -> bytes | None:
+    """The stored, compressed summary for one of the user's sessions, if it is current.
+
+    Lets the summary endpoint tag and serve it without parsing or re-serializing it.
+    `any_version` also accepts one from an older SUMMARY_VERSION (purged sessions
+    can't be recomputed).
+    """
+    row = db.get(models.SessionSummaryCache, session_id)
+    if not row or row.user_id != user_id or (row.version != SUMMARY_VERSION and not any_version):
+        return None
+    return row.payload
+
+
+def get_stored(db: Session, session_id: int, user_id: int) -> dict | None:
+    """Return the stored summary for one of the user's sessions, if it is current."""
+    payload = get_stored_payload(db, session_id, user_id)
+    return decode(payload) if payload is not None else None
+
+
+def store(db: Session, session: models.Session, summary: dict) -> bytes:
+    """Stage the summary for `session` and return its encoded payload; the caller commits."""
+    row = db.get(models.SessionSummaryCache, session.id)
+    if row is None:
+        row = models.SessionSummaryCache(session_id=session.id, user_id=session.user_id)
+        db.add(row)
+    row.version = SUMMARY_VERSION
+    row.payload = encode(summary)
+    row.computed_at = datetime.now(timezone.utc)
+    return row.payload
+
+
+def invalidate(db: Session, session_id: int) -> None:
+    """Drop a stored summary (and detailed analysis) after its session's keystrokes or input changed."""
+    db.query(models.SessionSummaryCache).filter_by(session_id=session_id).delete()
+    db.query(models.SessionAnalysisCache).filter_by(session_id=session_id).delete()
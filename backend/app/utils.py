@@ -7,17 +7,33 @@ SECRET_KEY = os.getenv("JWT_SECRET_KEY", "dev-secret")
 ALGORITHM  = "HS256"
 EXPIRY_MIN = 60
 
-def hash_password(plain_password: str) -> str:
-    salt    = bcrypt.gensalt()
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+# hash_password / verify_password are CPU-bound; request handlers go
+# through app.passwords, which runs them in a worker process pool.
+def hash_password(plain_password: str, rounds: int = BCRYPT_ROUNDS) -> str:
+    salt    = bcrypt.gensalt(rounds)
     hashed  = bcrypt.hashpw(plain_password.encode("utf-8"), salt)
     return hashed.decode("utf-8")
 
+def hash_rounds(hashed_password: str) -> int:
+    """Cost factor of a bcrypt hash ("$2b$12$..." -> 12)."""
+    return int(hashed_password.split("$")[2])
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(
         plain_password.encode("utf-8"),
         hashed_password.encode("utf-8")
     )
 
+def verify_and_rehash(plain_password: str, hashed_password: str, rounds: int) -> tuple[bool, str | None]:
+    """Check a password; on success also return a new hash if its cost isn't `rounds`."""
+    if not verify_password(plain_password, hashed_password):
+        return False, None
+    if hash_rounds(hashed_password) == rounds:
+        return True, None
+    return True, hash_password(plain_password, rounds)
+
 def create_access_token(user_id: str) -> str:
     payload = {
         "sub": user_id,
@@ -25,6 +41,9 @@ def create_access_token(user_id: str) -> str:
     }
     return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
 
+def decode_access_token(token: str) -> dict:
+    """Verify signature and expiry; returns the claims."""
+    return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+
 def verify_access_token(token: str) -> str:
-    data = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-    return data.get("sub") 
+    return decode_access_token(token).get("sub")
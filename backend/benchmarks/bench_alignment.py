@@ -0,0 +1,56 @@
+"""Banded alignment vs the old difflib path for analyze_errors.
+
+Run from backend/:  python -m benchmarks.bench_alignment
+"""
+import random
+import timeit
+
+from app.alignment import analyze_errors, analyze_errors_difflib
+
+WORDS = (
+    "the quick brown fox jumps over lazy dog typing coach practice keyboard "
+    "accuracy rhythm finger home row shift letter"
+).split()
+
+
+def make_pair(length: int, error_rate: float, seed: int = 0) -> tuple[str, str]:
+    rng = random.Random(seed)
+    target = " ".join(rng.choice(WORDS) for _ in range(length // 4))[:length]
+    typed = []
+    i = 0
+    while i < len(target):
+        r = rng.random()
+        if r < error_rate / 4:
+            typed.append(rng.choice("asdfjkl;"))          # substitution
+        elif r < error_rate / 2:
+            typed.append(rng.choice("asdfjkl;"))          # insertion
+            typed.append(target[i])
+        elif r < 3 * error_rate / 4:
+            pass                                          # deletion
+        elif r < error_rate and i + 1 < len(target):
+            typed.append(target[i + 1])                   # transposition
+            typed.append(target[i])
+            i += 1
+        else:
+            typed.append(target[i])
+        i += 1
+    return target, "".join(typed)
+
+
+def main():
+    print(f"{'chars':>7} {'err%':>5} {'banded ms':>10} {'difflib ms':>11} {'banded errs':>12} {'difflib errs':>13}")
+    for length in (500, 2000, 5000, 20000):
+        for rate in (0.02, 0.08):
+            target, typed = make_pair(length, rate)
+            runs = 5
+            fast = min(timeit.repeat(lambda: analyze_errors(target, typed), number=1, repeat=runs))
+            ref = min(timeit.repeat(lambda: analyze_errors_difflib(target, typed), number=1, repeat=runs))
+            print(
+                f"{length:>7} {rate * 100:>5.0f} {fast * 1000:>10.2f} {ref * 1000:>11.2f} "
+                f"{analyze_errors(target, typed)['total_errors']:>12} "
+                f"{analyze_errors_difflib(target, typed)['total_errors']:>13}"
+            )
+
+
+if __name__ == "__main__":
+    main()
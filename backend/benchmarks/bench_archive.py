@@ -0,0 +1,96 @@
+"""Keystroke storage footprint and summary read time, hot rows vs archive.
+
+Fills a SQLite file with SESSIONS ended sessions of EVENTS keystrokes,
+measures the file size (VACUUMed) and the summary column load time, then
+compacts everything into keystroke_archives and measures again.
+
+Run from backend/:  python -m benchmarks.bench_archive [sessions] [events]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.orm import sessionmaker
+
+from app import archive, ingest, models
+from app.analytics import load_keystroke_columns
+from app.database import Base
+
+TEXT = "the quick brown fox jumps over the lazy dog "
+
+
+def make_rows(rng: random.Random, n: int) -> list[tuple]:
+    t = 1.75e9 + rng.uniform(0, 1e6)
+    rows = []
+    for i in range(n):
+        t = round(t + rng.uniform(0.05, 0.25), 4)
+        ch = TEXT[i % len(TEXT)]
+        typed = ch if rng.random() > 0.05 else "x"
+        rows.append((typed, t, round(t + rng.uniform(0.06, 0.12), 4), ch, i,
+                     None, None if typed == ch else "substitution"))
+    return rows
+
+
+def vacuumed_size(engine, path: str) -> int:
+    with engine.connect() as conn:
+        conn.execute(text("VACUUM"))
+    return os.path.getsize(path)
+
+
+def time_reads(Session, sessions: int) -> float:
+    with Session() as db:
+        start = time.perf_counter()
+        for sid in range(1, sessions + 1):
+            load_keystroke_columns(db, sid)
+        return (time.perf_counter() - start) / sessions
+
+
+def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    events = int(sys.argv[2]) if len(sys.argv) > 2 else 1500
+    rng = random.Random(0)
+    ended = datetime.now(timezone.utc) - timedelta(days=2)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        engine = create_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        with Session() as db:
+            db.execute(insert(models.User), [{"id": 1, "email": "bench@example.com", "password_hash": "x"}])
+            db.execute(insert(models.Session), [
+                {"id": s, "user_id": 1, "target_text": TEXT, "ended_at": ended, "profiled": False}
+                for s in range(1, sessions + 1)
+            ])
+            for s in range(1, sessions + 1):
+                ingest.insert_rows(db, s, make_rows(rng, events))
+            db.commit()
+
+        total = sessions * events
+        hot_size = vacuumed_size(engine, path)
+        hot_read = time_reads(Session, sessions)
+
+        with Session() as db:
+            start = time.perf_counter()
+            compacted, moved = archive.compact(db, datetime.now(timezone.utc))
+            compact_secs = time.perf_counter() - start
+        archived_size = vacuumed_size(engine, path)
+        archived_read = time_reads(Session, sessions)
+
+        print(f"{total:,} events in {sessions:,} sessions; compacted {moved:,} events "
+              f"in {compact_secs:.2f}s ({moved / compact_secs:,.0f} ev/s)")
+        print(f"{'layout':>8} {'bytes/event':>12} {'summary load ms':>16}")
+        print(f"{'hot':>8} {hot_size / total:>12.1f} {hot_read * 1000:>16.2f}")
+        print(f"{'archive':>8} {archived_size / total:>12.1f} {archived_read * 1000:>16.2f}")
+        print(f"storage reduction {hot_size / archived_size:.1f}x")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
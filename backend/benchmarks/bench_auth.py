@@ -0,0 +1,97 @@
+"""Request latency with and without the verified-token cache.
+
+Sends REQUESTS small keystroke batches with one bearer token, first with
+auth_cache disabled (every request decodes the JWT and looks up the user),
+then enabled. The upload's own insert dominates its latency, so the same
+is repeated on an endpoint that only authenticates (like /users/{id}),
+where the cached path opens no database session at all.
+
+Run from backend/:  python -m benchmarks.bench_auth [requests]
+"""
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import numpy as np
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import auth_cache, models, utils
+from app.auth_cache import UserSnapshot
+from app.database import Base, get_db, get_session_factory
+from app.dependencies import get_current_user
+from app.routers import typing
+
+BATCH = [{"key": "a", "down_ts": i * 0.1, "up_ts": i * 0.1 + 0.05} for i in range(20)]
+
+
+def timed_uploads(client: TestClient, headers: dict, sid: int, n: int) -> np.ndarray:
+    latencies = []
+    for _ in range(n):
+        start = time.perf_counter()
+        r = client.post(f"/typing/sessions/{sid}/keystrokes", json=BATCH, headers=headers)
+        latencies.append(time.perf_counter() - start)
+        r.raise_for_status()
+    return np.asarray(latencies) * 1000
+
+
+def timed_reads(client: TestClient, headers: dict, sid: int, n: int) -> np.ndarray:
+    # sid unused: same signature as timed_uploads
+    latencies = []
+    for _ in range(n):
+        start = time.perf_counter()
+        r = client.get("/me", headers=headers)
+        latencies.append(time.perf_counter() - start)
+        r.raise_for_status()
+    return np.asarray(latencies) * 1000
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        with Session() as db:
+            db.add(models.User(id=1, email="bench@example.com", password_hash="x"))
+            db.add_all([models.Session(id=1, user_id=1, target_text="a"),
+                        models.Session(id=2, user_id=1, target_text="a")])
+            db.commit()
+
+        def override_get_db():
+            with Session() as db:
+                yield db
+
+        app = FastAPI()
+        app.include_router(typing.router)
+        app.dependency_overrides[get_db] = override_get_db
+        app.dependency_overrides[get_session_factory] = lambda: Session
+
+        @app.get("/me")
+        def me(user: UserSnapshot = Depends(get_current_user)):
+            return {"id": user.id}
+
+        client = TestClient(app)
+        headers = {"Authorization": f"Bearer {utils.create_access_token('1')}"}
+
+        print(f"{'request':>9} {'auth cache':>10} {'requests':>9} {'mean ms':>8} {'p50 ms':>7} {'p99 ms':>7}")
+        ttl = auth_cache.tokens.ttl
+        for request, timed_requests in (("upload", timed_uploads), ("auth only", timed_reads)):
+            for label, sid, cache_ttl in (("off", 1, 0), ("on", 2, ttl or 60)):
+                auth_cache.tokens.clear()
+                auth_cache.tokens.ttl = cache_ttl
+                timed_requests(client, headers, sid, 20)  # warm up
+                ms = timed_requests(client, headers, sid, n)
+                print(f"{request:>9} {label:>10} {n:>9} {ms.mean():>8.3f} {np.percentile(ms, 50):>7.3f} "
+                      f"{np.percentile(ms, 99):>7.3f}")
+        auth_cache.tokens.ttl = ttl
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Character-problems reads: user_char_stats vs aggregating typing_analytics.
+
+For one user with a growing number of sessions (CHARS per-character rows
+each), times the top-10 problem characters computed straight from
+typing_analytics (GROUP BY over every session's rows, then a sort) against
+the same answer read from user_char_stats.
+
+Run from backend/:  python -m benchmarks.bench_char_stats [sessions ...]
+"""
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from app import char_stats, models
+from app.database import Base
+
+CHARS = "abcdefghijklmnopqrstuvwxyz .,"
+T = models.TypingAnalytics
+S = models.Session
+
+
+def seed(Session, sessions: int):
+    rng = random.Random(sessions)
+    with Session() as db:
+        db.execute(insert(models.User), [{"id": 1, "email": "1@example.com", "password_hash": "x"}])
+        db.execute(insert(S), [
+            {"id": sid, "user_id": 1, "target_text": "x", "profiled": True} for sid in range(1, sessions + 1)
+        ])
+        rows = []
+        for sid in range(1, sessions + 1):
+            for char in CHARS:
+                count = rng.randint(1, 40)
+                rows.append({"session_id": sid, "char": char, "prev_char": None, "dwell_count": count,
+                             "error_count": rng.randint(0, count // 8), "avg_dwell_time": rng.uniform(0.05, 0.2)})
+            if len(rows) >= 20000:
+                db.execute(insert(T), rows)
+                rows = []
+        if rows:
+            db.execute(insert(T), rows)
+        db.commit()
+        char_stats.rebuild(db)
+
+
+def timed(fn, reps=20) -> float:
+    start = time.perf_counter()
+    for _ in range(reps):
+        fn()
+    return (time.perf_counter() - start) / reps * 1000
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [10, 100, 1000, 10000]
+    print(f"{'sessions':>9} {'scan ms':>10} {'user_char_stats ms':>19}")
+    for n in sizes:
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        seed(Session, n)
+        with Session() as db:
+            typed, errors = func.sum(T.dwell_count), func.sum(T.error_count)
+            scan = timed(lambda: db.execute(
+                select(T.char, errors, typed)
+                .join(S, S.id == T.session_id)
+                .where(S.user_id == 1, T.prev_char.is_(None))
+                .group_by(T.char)
+                .having(errors > 0)
+                .order_by((errors * 1.0 / (typed + char_stats.DIFFICULTY_PRIOR)).desc())
+                .limit(10)
+            ).all(), reps=5)
+            stats = timed(lambda: char_stats.character_problems(db, 1, 10))
+        print(f"{n:>9} {scan:>10.2f} {stats:>19.3f}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""DetailedAnalysis: one streaming pass vs the stored result.
+
+For sessions of growing length, times detailed_analysis.analyse() over the
+streamed keystroke_events rows (µs per event, and the peak Python memory
+the pass allocates) against reading the analysis back from session_analyses
+once the session has ended.
+
+Run from backend/:  python -m benchmarks.bench_detailed_analysis [events ...]
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app import detailed_analysis, models
+from app.database import Base
+from benchmarks.typist import Typist, passage
+
+
+def seed(Session, length: int):
+    events, _ = Typist(seed=length, error_rate=0.05).type(passage(length, seed=length))
+    with Session() as db:
+        db.execute(insert(models.User), [{"id": 1, "email": "1@example.com", "password_hash": "x"}])
+        db.execute(insert(models.Session), [{"id": 1, "user_id": 1, "target_text": "x"}])
+        db.execute(insert(models.KeystrokeEvent), [
+            {"session_id": 1, "key": e["key"], "down_ts": e["down_ts"], "up_ts": e["up_ts"],
+             "is_correction": e["is_correction"], "is_error": e["is_error"]} for e in events
+        ])
+        db.commit()
+    return len(events)
+
+
+def timed(fn, reps=5) -> float:
+    start = time.perf_counter()
+    for _ in range(reps):
+        fn()
+    return (time.perf_counter() - start) / reps * 1000
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [1000, 5000, 20000]
+    print(f"{'events':>7} {'analyse ms':>11} {'µs/event':>9} {'peak KiB':>9} {'stored ms':>10}")
+    for length in sizes:
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        n = seed(Session, length)
+        with Session() as db:
+            run = lambda: detailed_analysis.analyse(1, detailed_analysis.stream_rows(db, 1))
+            analysed = timed(run)
+            tracemalloc.start()
+            analysis = run()
+            peak = tracemalloc.get_traced_memory()[1] / 1024
+            tracemalloc.stop()
+            detailed_analysis.store(db, db.get(models.Session, 1), analysis)
+            db.commit()
+            stored = timed(lambda: detailed_analysis.get_stored_json(db, 1, 1), reps=50)
+        print(f"{n:>7} {analysed:>11.2f} {analysed * 1000 / n:>9.2f} {peak:>9.0f} {stored:>10.3f}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Repeated summary loads: full body vs gzip vs If-None-Match revalidation.
+
+Drives GET /typing/sessions/{sid}/summary for an ended 5k-character session
+through the typing router with the http_cache middlewares, and reports
+latency and bytes on the wire per load.
+
+Run from backend/:  python -m benchmarks.bench_http_cache
+"""
+import os
+import tempfile
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from fastapi.testclient import TestClient
+
+from app import http_cache, utils
+from benchmarks.suite import build_app, measure, typed_session
+
+LENGTH = 5000
+
+
+def main():
+    auth = {"Authorization": f"Bearer {utils.create_access_token('1')}"}
+    with tempfile.TemporaryDirectory() as tmp:
+        engine, _, app = build_app(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        http_cache.install(app)
+        with TestClient(app) as http:
+            text, events, user_input = typed_session(LENGTH)
+            sid = http.post("/typing/sessions/start", json={"prompt": text}, headers=auth).json()["session_id"]
+            http.post(f"/typing/sessions/{sid}/keystrokes", json=events, headers=auth)
+            http.post(f"/typing/sessions/{sid}/input", json={"user_input": user_input}, headers=auth)
+            http.post(f"/typing/sessions/{sid}/end", headers=auth)
+            url = f"/typing/sessions/{sid}/summary"
+            tag = http.get(url, headers=auth).headers["etag"]
+
+            cases = {
+                "identity": {"Accept-Encoding": "identity"},
+                "gzip": {"Accept-Encoding": "gzip"},
+                "If-None-Match (304)": {"Accept-Encoding": "gzip", "If-None-Match": tag},
+            }
+            if http_cache.brotli is not None:
+                cases["br"] = {"Accept-Encoding": "br"}
+            print(f"{LENGTH}-char session summary")
+            print(f"{'load':<22} {'median us':>10} {'p95 us':>10} {'wire bytes':>11}")
+            for name, headers in cases.items():
+                headers = {**auth, **headers}
+                r = measure(lambda: http.get(url, headers=headers), min_time=1.0)
+                wire = int(http.get(url, headers=headers).headers.get("content-length", 0))
+                print(f"{name:<22} {r['median_us']:>10.1f} {r['p95_us']:>10.1f} {wire:>11}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Summary-scan and history-query latency with and without the hot-query indexes.
+
+Fills a SQLite file with SESSIONS sessions of EVENTS keystrokes each
+(interleaved in time, as concurrent users produce them), then times the
+summary column scan and a user's history page before and after creating
+ix_keystroke_events_session_id_down_ts and ix_sessions_user_id_started_at.
+
+Run from backend/:  python -m benchmarks.bench_indexes [sessions] [events]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from app import analytics, models
+from app.database import Base
+
+USERS = 100
+QUERIES = 200
+
+_INDEXES = [
+    index
+    for table in (models.KeystrokeEvent.__table__, models.Session.__table__)
+    for index in table.indexes
+    if index.name in ("ix_keystroke_events_session_id_down_ts", "ix_sessions_user_id_started_at")
+]
+
+
+def populate(engine, sessions: int, events: int):
+    rng = random.Random(0)
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [
+            {"id": u + 1, "email": f"u{u}@example.com", "password_hash": "x"} for u in range(USERS)
+        ])
+        conn.execute(insert(models.Session), [
+            {"id": s + 1, "user_id": s % USERS + 1, "target_text": "x", "profiled": False,
+             "started_at": start + timedelta(minutes=s)}
+            for s in range(sessions)
+        ])
+        # round-robin across sessions so each session's rows are scattered through the table
+        batch = []
+        for i in range(events):
+            for s in range(sessions):
+                t = i * 0.15 + rng.random() * 0.01
+                batch.append({"session_id": s + 1, "key": "a", "down_ts": t, "up_ts": t + 0.08})
+            if len(batch) >= 50_000:
+                conn.execute(insert(models.KeystrokeEvent), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(models.KeystrokeEvent), batch)
+
+
+def time_queries(Session, sessions: int) -> tuple[float, float]:
+    rng = random.Random(1)
+    S = models.Session
+    with Session() as db:
+        start = time.perf_counter()
+        for _ in range(QUERIES):
+            db.execute(analytics.keystroke_columns_query(rng.randint(1, sessions))).all()
+        summary = (time.perf_counter() - start) / QUERIES
+
+        start = time.perf_counter()
+        for _ in range(QUERIES):
+            db.execute(
+                select(S.id, S.started_at)
+                .where(S.user_id == rng.randint(1, USERS))
+                .order_by(S.started_at.desc())
+                .limit(20)
+            ).all()
+        history = (time.perf_counter() - start) / QUERIES
+    return summary, history
+
+
+def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    events = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        for index in _INDEXES:
+            index.drop(engine)
+        populate(engine, sessions, events)
+        Session = sessionmaker(bind=engine)
+        print(f"{sessions * events:,} keystroke rows, {sessions:,} sessions")
+        print(f"{'indexes':>8} {'summary ms':>11} {'history ms':>11}")
+
+        summary, history = time_queries(Session, sessions)
+        print(f"{'without':>8} {summary * 1000:>11.3f} {history * 1000:>11.3f}")
+        for index in _INDEXES:
+            index.create(engine)
+        summary_ix, history_ix = time_queries(Session, sessions)
+        print(f"{'with':>8} {summary_ix * 1000:>11.3f} {history_ix * 1000:>11.3f}")
+        print(f"{'speedup':>8} {summary / summary_ix:>10.1f}x {history / history_ix:>10.1f}x")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Keystroke upload payloads: JSON list vs packed columnar format.
+
+Run from backend/:  python -m benchmarks.bench_keystroke_codec
+Reports bytes on the wire and the server-side decode time from request
+body to insert-ready rows.
+"""
+import gzip
+import json
+import os
+import random
+import timeit
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from app import ingest, keystroke_codec
+from app.dependencies import _keystrokes_adapter
+
+
+def make_rows(n: int) -> list[tuple]:
+    rng = random.Random(n)
+    t = 0.0
+    rows = []
+    for i in range(n):
+        t += rng.uniform(0.03, 0.25)
+        key = rng.choice("asdfjkl; ")
+        rows.append((
+            key, t, t + rng.uniform(0.05, 0.12), key, i,
+            "backspace" if i % 37 == 0 else None,
+            "substitution" if i % 23 == 0 else None,
+        ))
+    return rows
+
+
+def to_json(rows) -> bytes:
+    names = ingest.KEYSTROKE_COLUMNS[1:]
+    return json.dumps([dict(zip(names, r)) for r in rows]).encode()
+
+
+def decode_json(body: bytes):
+    return ingest.rows_from_events(_keystrokes_adapter.validate_json(body))
+
+
+def best_ms(fn, repeat=5) -> float:
+    return min(timeit.repeat(fn, number=1, repeat=repeat)) * 1000
+
+
+def main():
+    print(f"{'events':>8} {'json B':>10} {'json gz B':>10} {'packed B':>10} {'packed gz B':>11} "
+          f"{'json ms':>8} {'packed ms':>9}")
+    for n in (1_000, 10_000, 100_000):
+        rows = make_rows(n)
+        body_json = to_json(rows)
+        body_packed = keystroke_codec.encode(rows)
+        assert keystroke_codec.decode(body_packed) == decode_json(body_json)
+        print(
+            f"{n:>8} {len(body_json):>10,} {len(gzip.compress(body_json)):>10,} "
+            f"{len(body_packed):>10,} {len(gzip.compress(body_packed)):>11,} "
+            f"{best_ms(lambda: decode_json(body_json)):>8.1f} "
+            f"{best_ms(lambda: keystroke_codec.decode(body_packed)):>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
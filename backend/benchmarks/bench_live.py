@@ -0,0 +1,62 @@
+"""Live coaching state: per-keystroke update cost vs recomputing from scratch.
+
+For sessions of increasing length, compares folding one more keystroke into
+a LiveState (and taking a snapshot) against rerunning the post-hoc analysis
+(alignment + timing stats) over every keystroke so far, which is what a
+mid-session summary would cost without incremental state.
+
+Run from backend/:  python -m benchmarks.bench_live
+"""
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from app import analytics, live
+from app.alignment import analyze_errors
+
+TEXT = "the quick brown fox jumps over the lazy dog "
+
+
+def make_events(n: int):
+    rng = random.Random(n)
+    target = (TEXT * (n // len(TEXT) + 1))[:n]
+    events, t = [], 0.0
+    for ch in target:
+        t += rng.uniform(0.05, 0.25)
+        events.append((ch if rng.random() > 0.05 else "#", t, t + rng.uniform(0.05, 0.12)))
+    return target, events
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [500, 2000, 10000]
+    print(f"{'keys':>7} {'update+snapshot us':>19} {'rescan ms':>10} {'speedup':>9}")
+    for n in sizes:
+        target, events = make_events(n)
+        state = live.LiveState(1, 1, target)
+        for event in events[:-1]:
+            state.add(*event)
+
+        reps = 2000
+        start = time.perf_counter()
+        for _ in range(reps):
+            state.add(*events[-1])
+            state.snapshot()
+        incremental = (time.perf_counter() - start) / reps
+
+        typed = "".join(ch for ch, _, _ in events)
+        rows = [(down, up, None, None) for _, down, up in events]
+        reps = 5
+        start = time.perf_counter()
+        for _ in range(reps):
+            analyze_errors(target, typed)
+            analytics.keystroke_stats(analytics.columns_from_rows(rows))
+        rescan = (time.perf_counter() - start) / reps
+
+        print(f"{n:>7} {incremental * 1e6:>19.2f} {rescan * 1000:>10.2f} {rescan / incremental:>8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Instrumentation overhead: timed() wrappers, cursor hooks and the middleware.
+
+Disabled (METRICS_ENABLED=0) timed() returns the function itself and nothing
+else is installed, so the "off" columns are the uninstrumented baseline.
+
+Run from backend/:  python -m benchmarks.bench_metrics
+"""
+import asyncio
+import os
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from fastapi import FastAPI
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
+
+from app import metrics
+
+
+def per_call(fn, reps: int) -> float:
+    start = time.perf_counter()
+    for _ in range(reps):
+        fn()
+    return (time.perf_counter() - start) / reps
+
+
+async def asgi_per_request(app, reps: int) -> float:
+    scope = {"type": "http", "method": "GET", "path": "/ping", "raw_path": b"/ping", "query_string": b"",
+             "headers": [], "root_path": "", "scheme": "http", "server": ("bench", 80),
+             "client": ("bench", 1), "http_version": "1.1"}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    for _ in range(200):
+        await app(dict(scope), receive, send)
+    start = time.perf_counter()
+    for _ in range(reps):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - start) / reps
+
+
+def noop():
+    return None
+
+
+def main():
+    reps = 500_000
+    plain = per_call(noop, reps)
+    wrapped = per_call(metrics.timed("bench_noop")(noop), reps)
+    print(f"{'timed() wrapper':<24} off {plain * 1e9:>8.0f} ns   on {wrapped * 1e9:>8.0f} ns   "
+          f"(+{(wrapped - plain) * 1e9:.0f} ns)")
+
+    engine = create_engine("sqlite://")
+    with engine.connect() as conn:
+        query = lambda: conn.execute(text("select 1")).scalar()
+        off = per_call(query, 20_000)
+        metrics.instrument_engines()
+        on = per_call(query, 20_000)
+        event.remove(Engine, "before_cursor_execute", metrics._before_cursor_execute)
+        event.remove(Engine, "after_cursor_execute", metrics._after_cursor_execute)
+    print(f"{'cursor hooks / query':<24} off {off * 1e6:>8.2f} us   on {on * 1e6:>8.2f} us   "
+          f"(+{(on - off) * 1e6:.2f} us)")
+
+    # straight ASGI calls: TestClient's own jitter is larger than the middleware
+    results = []
+    for instrumented in (False, True):
+        app = FastAPI()
+
+        @app.get("/ping")
+        def ping():
+            return {"ok": True}
+
+        if instrumented:
+            app.add_middleware(metrics.MetricsMiddleware, sample_rate=0)
+        results.append(asyncio.run(asgi_per_request(app, 3000)))
+    off, on = results
+    print(f"{'middleware / request':<24} off {off * 1e6:>8.1f} us   on {on * 1e6:>8.1f} us   "
+          f"(+{(on - off) * 1e6:.1f} us)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Concurrent DB throughput: default create_engine() vs the tuned pool.
+
+Worker threads each commit small keystroke batches and read the session
+back, the mix the upload and summary handlers produce. Reports ops/sec,
+failed operations (e.g. "database is locked") and, for the tuned engine,
+the pool's checkout wait.
+
+Run from backend/:  python -m benchmarks.bench_pool [threads]
+Set BENCH_POSTGRES_URL to run against PostgreSQL instead of a temporary
+SQLite file.
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app import ingest, models
+from app.database import Base
+from app.pooling import PoolSettings, engine_kwargs, install_sqlite_pragmas, pool_metrics
+
+OPS_PER_THREAD = 200
+BATCH = 20
+
+
+def rows(seed: int) -> list[tuple]:
+    return [("a", seed + i * 0.1, seed + i * 0.1 + 0.05, "a", i, None, None) for i in range(BATCH)]
+
+
+def worker(Session, sid: int, errors: list):
+    for op in range(OPS_PER_THREAD):
+        try:
+            with Session() as db:
+                ingest.insert_rows(db, sid, rows(op * BATCH))
+                db.commit()
+                db.execute(
+                    select(func.count()).where(models.KeystrokeEvent.session_id == sid)
+                ).scalar()
+        except OperationalError:
+            errors.append(op)
+
+
+def run(engine, label: str, threads: int):
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        db.add(models.User(id=1, email="bench@example.com", password_hash="x"))
+        db.add_all(models.Session(id=i + 1, user_id=1, target_text="x") for i in range(threads))
+        db.commit()
+
+    errors: list = []
+    pool = [threading.Thread(target=worker, args=(Session, i + 1, errors)) for i in range(threads)]
+    start = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    ops = threads * OPS_PER_THREAD - len(errors)
+    metrics = pool_metrics(engine)
+    wait = metrics.get("checkout_wait_seconds_max")
+    print(f"{label:>8} {threads:>8} {ops / elapsed:>10,.0f} {len(errors):>7} "
+          f"{'-' if wait is None else f'{wait * 1000:.1f}':>12}")
+    Base.metadata.drop_all(engine)
+    engine.dispose()
+
+
+def main():
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    settings = PoolSettings.from_env()
+    print(f"{'engine':>8} {'threads':>8} {'ops/s':>10} {'errors':>7} {'max wait ms':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        url = os.getenv("BENCH_POSTGRES_URL") or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        run(create_engine(url), "default", threads)
+
+        if url.startswith("sqlite"):
+            url = f"sqlite:///{os.path.join(tmp, 'bench-tuned.db')}"
+        tuned = create_engine(url, **engine_kwargs(url, settings))
+        install_sqlite_pragmas(tuned, settings)
+        run(tuned, "tuned", threads)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Progress analytics: running-total rollups vs aggregating `sessions`.
+
+One user with PER_DAY ended sessions a day for three years. For 30, 90 and
+365-day windows, times the progress numbers computed straight from the
+window's `sessions` rows (sums plus every WPM for the percentiles) against
+rollups.progress(), which reads three running-total rows and one page of
+history whatever the window.
+
+Run from backend/:  python -m benchmarks.bench_progress
+"""
+import os
+import random
+import time
+from datetime import date, datetime, time as dtime, timedelta, timezone
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import numpy as np
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from app import models, rollups
+from app.database import Base
+
+PER_DAY = 5
+DAYS = 3 * 365
+TODAY = date(2025, 9, 1)
+S = models.Session
+
+
+def seed(Session):
+    rng = random.Random(1)
+    with Session() as db:
+        db.execute(insert(models.User), [{"id": 1, "email": "1@example.com", "password_hash": "x"}])
+        rows = []
+        for day in range(DAYS):
+            for i in range(PER_DAY):
+                ended = datetime.combine(TODAY - timedelta(days=day), dtime(8 + i), tzinfo=timezone.utc)
+                rows.append({"user_id": 1, "target_text": "x", "started_at": ended, "ended_at": ended,
+                             "words_per_minute": rng.uniform(20, 120), "accuracy_percentage": rng.uniform(80, 100),
+                             "duration_secs": rng.uniform(10, 120), "error_count": rng.randint(0, 20),
+                             "correction_count": rng.randint(0, 10)})
+        db.execute(insert(S), rows)
+        db.commit()
+        rollups.rebuild(db)
+
+
+def scan(db, days: int) -> dict:
+    since = datetime.combine(TODAY - timedelta(days=days - 1), dtime.min, tzinfo=timezone.utc)
+    in_window = (S.user_id == 1, S.started_at >= since, S.ended_at.is_not(None))
+    n, wpm, accuracy, secs, errors, corrections = db.execute(
+        select(func.count(), func.avg(S.words_per_minute), func.avg(S.accuracy_percentage),
+               func.sum(S.duration_secs), func.sum(S.error_count), func.sum(S.correction_count))
+        .where(*in_window)
+    ).one()
+    speeds = np.array(db.execute(select(S.words_per_minute).where(*in_window)).scalars().all())
+    return {"sessions": n, "avg_wpm": wpm, "p50": float(np.percentile(speeds, 50)) if n else 0.0}
+
+
+def timed(fn, reps=20) -> float:
+    start = time.perf_counter()
+    for _ in range(reps):
+        fn()
+    return (time.perf_counter() - start) / reps * 1000
+
+
+def main():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    seed(Session)
+    print(f"{DAYS * PER_DAY} sessions over {DAYS} days")
+    print(f"{'window':>7} {'scan ms':>9} {'rollups ms':>11}")
+    with Session() as db:
+        for days in (30, 90, 365):
+            scanned = timed(lambda: scan(db, days))
+            rolled = timed(lambda: rollups.progress(db, 1, days, today=TODAY))
+            print(f"{days:>6}d {scanned:>9.2f} {rolled:>11.2f}")
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Re-analysis backfill throughput: per-session recompute vs app.reanalysis.
+
+Seeds SESSIONS ended sessions of KEYS keystrokes each in a temporary SQLite
+file, then compares recomputing them one by one (what GETting every summary
+amounts to) with the chunked backfill, in-process and on a process pool.
+
+Run from backend/:  python -m benchmarks.bench_reanalysis [sessions] [keys]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from app import ingest, models, reanalysis
+from app.database import Base
+from app.routers.typing import build_summary
+
+TEXT = "the quick brown fox jumps over the lazy dog "
+
+
+def seed(Session, sessions: int, keys: int):
+    rng = random.Random(0)
+    target = (TEXT * (keys // len(TEXT) + 1))[:keys]
+    with Session() as db:
+        db.execute(insert(models.User), [{"id": 1, "email": "a@example.com", "password_hash": "x"}])
+        db.execute(insert(models.Session), [
+            {"id": sid, "user_id": 1, "target_text": target, "user_input": target,
+             "ended_at": datetime(2025, 1, 1, tzinfo=timezone.utc)}
+            for sid in range(1, sessions + 1)
+        ])
+        for sid in range(1, sessions + 1):
+            t, rows = sid * 1000.0, []
+            for i, ch in enumerate(target):
+                t += rng.uniform(0.05, 0.25)
+                rows.append((ch, t, t + 0.08, ch, i, None, "substitution" if rng.random() < 0.05 else None))
+            ingest.insert_rows(db, sid, rows)
+        db.commit()
+
+
+def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    keys = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    workers = os.cpu_count() or 1
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        seed(Session, sessions, keys)
+        print(f"{sessions} sessions x {keys} keystrokes, {workers} worker process(es)")
+        print(f"{'mode':>14} {'seconds':>8} {'sessions/s':>11}")
+
+        with Session() as db:
+            start = time.perf_counter()
+            for sid in db.execute(select(models.Session.id)).scalars().all():
+                build_summary(db, db.get(models.Session, sid))
+                db.commit()
+            elapsed = time.perf_counter() - start
+        print(f"{'per-session':>14} {elapsed:>8.2f} {sessions / elapsed:>11.1f}")
+
+        for label, n in (("chunked", 0), (f"chunked x{workers}", workers)):
+            with Session() as db:
+                report = reanalysis.run(db, workers=n)
+            print(f"{label:>14} {report['elapsed_secs']:>8.2f} {report['sessions_per_sec']:>11.1f}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
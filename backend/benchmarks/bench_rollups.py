@@ -0,0 +1,83 @@
+"""Trend and leaderboard reads: rollup tables vs aggregating `sessions`.
+
+For growing session tables, times a per-user weekly trend and a top-10
+leaderboard computed straight from `sessions` (GROUP BY over every row)
+against the same answers read from session_rollups / user_rollups.
+
+Run from backend/:  python -m benchmarks.bench_rollups [sessions ...]
+"""
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from app import models, rollups
+from app.database import Base
+
+USERS = 500
+S = models.Session
+
+
+def seed(Session, sessions: int):
+    rng = random.Random(sessions)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    with Session() as db:
+        db.execute(insert(models.User), [
+            {"id": u, "email": f"{u}@example.com", "password_hash": "x"} for u in range(1, USERS + 1)
+        ])
+        rows = []
+        for sid in range(1, sessions + 1):
+            ended = start + timedelta(minutes=rng.randrange(600 * 24 * 60))
+            rows.append({"id": sid, "user_id": rng.randint(1, USERS), "target_text": "x",
+                         "started_at": ended, "ended_at": ended, "words_per_minute": rng.uniform(20, 120),
+                         "accuracy_percentage": rng.uniform(80, 100), "duration_secs": rng.uniform(10, 120)})
+            if len(rows) == 10000:
+                db.execute(insert(S), rows)
+                rows = []
+        if rows:
+            db.execute(insert(S), rows)
+        db.commit()
+        rollups.rebuild(db)
+
+
+def timed(fn, reps=20) -> float:
+    start = time.perf_counter()
+    for _ in range(reps):
+        fn()
+    return (time.perf_counter() - start) / reps * 1000
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [10000, 100000, 400000]
+    print(f"{'sessions':>9} {'trend scan ms':>14} {'trend rollup ms':>16} {'board scan ms':>14} {'board rollup ms':>16}")
+    for n in sizes:
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        seed(Session, n)
+        with Session() as db:
+            since = date(2024, 1, 1)
+            week = func.strftime("%Y-%W", S.ended_at)
+            trend_scan = timed(lambda: db.execute(
+                select(week, func.count(), func.avg(S.words_per_minute))
+                .where(S.user_id == 7, S.ended_at.is_not(None)).group_by(week)
+            ).all())
+            trend_rollup = timed(lambda: rollups.trend(db, 7, "week", since))
+            board_scan = timed(lambda: db.execute(
+                select(S.user_id, func.max(S.words_per_minute).label("best"))
+                .where(S.ended_at.is_not(None)).group_by(S.user_id)
+                .order_by(func.max(S.words_per_minute).desc()).limit(10)
+            ).all(), reps=5)
+            board_rollup = timed(lambda: rollups.leaderboard(db, "best_wpm", 10))
+        print(f"{n:>9} {trend_scan:>14.2f} {trend_rollup:>16.2f} {board_scan:>14.2f} {board_rollup:>16.2f}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Summary response serialization on 5k-character passages.
+
+Compares what GET /typing/sessions/{sid}/summary used to do (validate the
+dict against SessionSummary, then dump it) with the orjson fast path (dump
+the trusted dict as is), serving the stored bytes, and the compact form.
+
+Run from backend/:  python -m benchmarks.bench_summary_response
+"""
+import os
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from fastapi.encoders import jsonable_encoder
+
+from app import analytics, compact_summary, schemas, summaries
+from app.routers.typing import compute_summary
+from benchmarks.suite import measure
+from benchmarks.typist import Typist, passage
+
+LENGTH = 5000
+
+
+def build(length: int) -> dict:
+    text = passage(length, seed=5)
+    events, user_input = Typist(seed=5, error_rate=0.04).type(text)
+    cols = analytics.columns_from_rows(
+        [(e["down_ts"], e["up_ts"], e["is_correction"], e["is_error"]) for e in events])
+    return compute_summary(1, text, user_input, cols)
+
+
+def main():
+    summary = build(LENGTH)
+    stored = summaries.dumps(summary)
+
+    def pydantic_path():
+        model = schemas.SessionSummary.model_validate(jsonable_encoder(summary))
+        return model.model_dump_json().encode()
+
+    cases = {
+        "pydantic validate + dump": pydantic_path,
+        "orjson dump": lambda: summaries.dumps(summary),
+        "stored bytes": lambda: compact_summary.summary_response(stored, False).body,
+        "compact": lambda: compact_summary.summary_response(stored, True).body,
+    }
+    print(f"{LENGTH}-char passage, {summary['error_count']} errors")
+    print(f"{'path':<26} {'median us':>10} {'p95 us':>10} {'bytes':>8}")
+    for name, fn in cases.items():
+        r = measure(fn, min_time=1.0)
+        print(f"{name:<26} {r['median_us']:>10.1f} {r['p95_us']:>10.1f} {len(fn()):>8}")
+
+
+if __name__ == "__main__":
+    main()
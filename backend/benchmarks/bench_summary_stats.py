@@ -0,0 +1,85 @@
+"""Keystroke timing stats: ORM objects + Python loops vs column fetch + NumPy.
+
+Run from backend/:  python -m benchmarks.bench_summary_stats
+"""
+import os
+import random
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app import analytics, models
+from app.database import Base
+
+
+def seed(db, sid: int, n: int):
+    rng = random.Random(n)
+    t = 0.0
+    rows = []
+    for i in range(n):
+        t += rng.uniform(0.03, 0.25)
+        rows.append({
+            "session_id": sid,
+            "key": rng.choice("asdfjkl; "),
+            "down_ts": t,
+            "up_ts": t + rng.uniform(0.05, 0.12),
+            "is_correction": "backspace" if i % 37 == 0 else None,
+            "is_error": "substitution" if i % 23 == 0 else None,
+        })
+    db.execute(insert(models.KeystrokeEvent), rows)
+    db.commit()
+
+
+def per_object(db, sid: int):
+    events = (
+        db.query(models.KeystrokeEvent)
+          .filter_by(session_id=sid)
+          .order_by(models.KeystrokeEvent.down_ts)
+          .all()
+    )
+    correction_count = len([e for e in events if e.is_correction])
+    error_events = [e for e in events if e.is_error]
+    count = len(events)
+    duration = events[-1].up_ts - events[0].down_ts
+    dwells = [(e.up_ts - e.down_ts) * 1000 for e in events]
+    flights = [(events[i].down_ts - events[i - 1].up_ts) * 1000 for i in range(1, count)]
+    return (duration, sum(dwells) / len(dwells), sum(flights) / len(flights),
+            correction_count, len(error_events))
+
+
+def columnar(db, sid: int):
+    return analytics.keystroke_stats(analytics.load_keystroke_columns(db, sid))
+
+
+def best_of(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+
+    print(f"{'events':>8} {'per-object ms':>14} {'numpy ms':>9} {'speedup':>8}")
+    for sid, n in enumerate((1_000, 10_000, 100_000), start=1):
+        with Session() as db:
+            db.add(models.User(id=sid, email=f"bench{sid}@example.com", password_hash="x"))
+            db.add(models.Session(id=sid, user_id=sid, target_text="x"))
+            db.commit()
+            seed(db, sid, n)
+        with Session() as db:
+            old = best_of(lambda: (per_object(db, sid), db.expunge_all()))
+            new = best_of(lambda: columnar(db, sid))
+        print(f"{n:>8} {old * 1000:>14.1f} {new * 1000:>9.1f} {old / new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Concurrent load on the typing endpoints: sync handlers vs the USE_ASYNC_DB ones.
+
+Each simulated client starts a session, uploads its keystrokes, ends it and
+reads the summary twice. Reports requests/sec and p50/p99 latency per stack.
+
+Run from backend/:  python -m benchmarks.load_async [clients]
+Set BENCH_POSTGRES_URL to run against PostgreSQL (psycopg2 / asyncpg)
+instead of a temporary SQLite file.
+"""
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import httpx
+import numpy as np
+from fastapi import FastAPI
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models, utils
+from app.database import Base, async_url, get_async_db, get_async_session_factory, get_db, get_session_factory
+from app.routers import typing, typing_async
+
+PROMPT = "the quick brown fox jumps over the lazy dog " * 4
+KEYSTROKES = 200
+
+
+def make_events(rng: random.Random) -> list[dict]:
+    t = 0.0
+    events = []
+    for i in range(KEYSTROKES):
+        t += rng.uniform(0.05, 0.2)
+        events.append({"key": PROMPT[i % len(PROMPT)], "down_ts": t, "up_ts": t + 0.08,
+                       "position_in_text": i % len(PROMPT)})
+    return events
+
+
+def build_apps(url: str):
+    connect_args = {"timeout": 30} if url.startswith("sqlite") else {}
+    engine = create_engine(url, connect_args=connect_args)
+    async_engine = create_async_engine(async_url(url), connect_args=connect_args)
+    Session = sessionmaker(bind=engine)
+    AsyncSession = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    def override_get_db():
+        with Session() as db:
+            yield db
+
+    async def override_get_async_db():
+        async with AsyncSession() as db:
+            yield db
+
+    apps = {}
+    for name, router in (("sync", typing.router), ("async", typing_async.router)):
+        app = FastAPI()
+        app.include_router(router)
+        # /input lives only on the sync router
+        if router is not typing.router:
+            app.include_router(typing.router)
+        app.dependency_overrides[get_db] = override_get_db
+        app.dependency_overrides[get_async_db] = override_get_async_db
+        app.dependency_overrides[get_session_factory] = lambda: Session
+        app.dependency_overrides[get_async_session_factory] = lambda: AsyncSession
+        apps[name] = app
+    return engine, async_engine, apps
+
+
+async def client_run(http: httpx.AsyncClient, headers: dict, rng: random.Random, latencies: list):
+    async def call(method, path, **kw):
+        start = time.perf_counter()
+        r = await http.request(method, path, headers=headers, **kw)
+        latencies.append(time.perf_counter() - start)
+        r.raise_for_status()
+        return r
+
+    sid = (await call("POST", "/typing/sessions/start", json={"prompt": PROMPT})).json()["session_id"]
+    await call("POST", f"/typing/sessions/{sid}/keystrokes", json=make_events(rng))
+    await call("POST", f"/typing/sessions/{sid}/input", json={"user_input": PROMPT[:KEYSTROKES]})
+    await call("POST", f"/typing/sessions/{sid}/end")
+    await call("GET", f"/typing/sessions/{sid}/summary")
+    await call("GET", f"/typing/sessions/{sid}/summary")
+
+
+async def run_stack(app: FastAPI, headers: dict, clients: int) -> tuple[float, list]:
+    latencies: list[float] = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            client_run(http, headers, random.Random(i), latencies) for i in range(clients)
+        ))
+        elapsed = time.perf_counter() - start
+    return elapsed, latencies
+
+
+def run(url: str, label: str, clients: int):
+    engine, async_engine, apps = build_apps(url)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with sessionmaker(bind=engine)() as db:
+        db.add(models.User(id=1, email="bench@example.com", password_hash="x"))
+        db.commit()
+    headers = {"Authorization": f"Bearer {utils.create_access_token('1')}"}
+
+    for name, app in apps.items():
+        elapsed, latencies = asyncio.run(run_stack(app, headers, clients))
+        ms = np.asarray(latencies) * 1000
+        print(f"{label:>10} {name:>6} {clients:>8} {len(ms) / elapsed:>10,.0f} "
+              f"{np.percentile(ms, 50):>9.1f} {np.percentile(ms, 99):>9.1f}")
+    asyncio.run(async_engine.dispose())
+    Base.metadata.drop_all(engine)
+
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    print(f"{'backend':>10} {'stack':>6} {'clients':>8} {'req/s':>10} {'p50 ms':>9} {'p99 ms':>9}")
+    if os.getenv("BENCH_POSTGRES_URL"):
+        run(os.environ["BENCH_POSTGRES_URL"], "postgresql", clients)
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            run(f"sqlite:///{os.path.join(tmp, 'bench.db')}", "sqlite", clients)
+
+
+if __name__ == "__main__":
+    main()
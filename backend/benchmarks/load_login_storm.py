@@ -0,0 +1,112 @@
+"""Typing-endpoint latency during a login storm: inline bcrypt vs the process pool.
+
+STORM clients log in at once while one client keeps uploading keystroke
+batches. "inline" hashes on the request threadpool, as the handlers used
+to; "pool" uses app.passwords with its bounded queue, so surplus logins get
+a fast 503 instead of queueing behind bcrypt.
+
+Run from backend/:  python -m benchmarks.load_login_storm [storm] [rounds]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import httpx
+import numpy as np
+from fastapi import FastAPI
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app import models, passwords, utils
+from app.database import Base, get_db, get_session_factory
+from app.passwords import PasswordHasher
+from app.routers import auth, typing
+
+BATCH = [{"key": "a", "down_ts": i * 0.1, "up_ts": i * 0.1 + 0.05} for i in range(20)]
+
+
+async def typist(http, headers, sid, stop: asyncio.Event, latencies: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        r = await http.post(f"/typing/sessions/{sid}/keystrokes", json=BATCH, headers=headers)
+        latencies.append(time.perf_counter() - start)
+        r.raise_for_status()
+
+
+async def storm(app, headers, sid, users: int) -> tuple[np.ndarray, dict, float]:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        # baseline latency with no logins in flight
+        stop, latencies = asyncio.Event(), []
+        task = asyncio.create_task(typist(http, headers, sid, stop, latencies))
+        await asyncio.sleep(0.5)
+        stop.set()
+        await task
+
+        stop, during = asyncio.Event(), []
+        task = asyncio.create_task(typist(http, headers, sid, stop, during))
+        start = time.perf_counter()
+        responses = await asyncio.gather(*(
+            http.post("/auth/login", data={"username": f"s{i}@example.com", "password": "pw"})
+            for i in range(users)
+        ))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await task
+
+    codes = {}
+    for r in responses:
+        codes[r.status_code] = codes.get(r.status_code, 0) + 1
+    return np.asarray(latencies) * 1000, np.asarray(during) * 1000, codes, elapsed
+
+
+def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    password_hash = utils.hash_password("pw", rounds)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}", connect_args={"timeout": 30})
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        with Session() as db:
+            db.execute(insert(models.User), [{"id": 1, "email": "typist@example.com", "password_hash": "x"}] + [
+                {"id": i + 2, "email": f"s{i}@example.com", "password_hash": password_hash} for i in range(users)
+            ])
+            db.add(models.Session(id=1, user_id=1, target_text="a"))
+            db.commit()
+
+        def override_get_db():
+            with Session() as db:
+                yield db
+
+        app = FastAPI()
+        app.include_router(auth.router)
+        app.include_router(typing.router)
+        app.dependency_overrides[get_db] = override_get_db
+        app.dependency_overrides[get_session_factory] = lambda: Session
+        headers = {"Authorization": f"Bearer {utils.create_access_token('1')}"}
+
+        workers = os.cpu_count() or 1
+        print(f"{users} logins at bcrypt cost {rounds}, {workers} worker process(es)")
+        print(f"{'mode':>7} {'idle p50':>9} {'storm p50':>10} {'storm p99':>10} {'storm s':>8}  logins")
+        for label, hasher in (
+            ("inline", PasswordHasher(workers=0, queue_size=users, rounds=rounds)),
+            ("pool", PasswordHasher(workers=workers, queue_size=workers * 4, rounds=rounds)),
+        ):
+            passwords.hasher = hasher
+            if hasher.workers:
+                asyncio.run(hasher.hash("warm up the worker processes"))
+            idle, during, codes, elapsed = asyncio.run(storm(app, headers, 1, users))
+            print(f"{label:>7} {np.percentile(idle, 50):>9.1f} {np.percentile(during, 50):>10.1f} "
+                  f"{np.percentile(during, 99):>10.1f} {elapsed:>8.2f}  {codes}")
+            hasher.shutdown()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""Typing pipeline benchmark suite with JSON output and regression checks.
+
+Micro benchmarks time the analysis functions on synthetic passages; macro
+benchmarks drive the ASGI app (typing router, temporary SQLite file)
+through upload, end, summary and one-request complete calls. Keystrokes
+come from benchmarks.typist, so every run sees the same inputs.
+
+Results are medians / p95 in microseconds keyed by benchmark name. With
+--baseline, each median is compared against the baseline file and the run
+exits 1 if any got slower by more than --threshold (a fraction).
+
+Run from backend/:
+    python -m benchmarks.suite [--quick] [-k NAME] [--output results.json]
+                               [--baseline baseline.json] [--threshold 0.2]
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import numpy as np
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import analytics, models, summaries, utils
+from app.alignment import analyze_errors
+from app.database import Base, get_db, get_session_factory
+from app.routers import typing
+from app.routers.typing import calculate_accuracy, compute_summary
+from benchmarks.typist import Typist, passage
+
+LENGTHS = (200, 1000, 5000)
+QUICK_LENGTHS = (200, 1000)
+
+
+def measure(fn, setup=None, min_time: float = 0.5, min_runs: int = 5, max_runs: int = 10000) -> dict:
+    """Time fn(*setup()) repeatedly; setup runs outside the timed region."""
+    samples = []
+    deadline = time.perf_counter() + min_time
+    while len(samples) < max_runs and (len(samples) < min_runs or time.perf_counter() < deadline):
+        args = setup() if setup else ()
+        start = time.perf_counter()
+        fn(*args)
+        samples.append(time.perf_counter() - start)
+    us = np.asarray(samples) * 1e6
+    return {"median_us": float(np.median(us)), "p95_us": float(np.percentile(us, 95)), "runs": len(samples)}
+
+
+def typed_session(length: int, seed: int = 0):
+    text = passage(length, seed)
+    events, user_input = Typist(seed=seed, error_rate=0.04).type(text)
+    return text, events, user_input
+
+
+def micro(lengths, min_time: float) -> dict:
+    results = {}
+    for n in lengths:
+        text, events, user_input = typed_session(n)
+        rows = [(e["down_ts"], e["up_ts"], e["is_correction"], e["is_error"]) for e in events]
+        cols = analytics.columns_from_rows(rows)
+        results[f"micro.calculate_accuracy[{n}]"] = measure(lambda: calculate_accuracy(text, user_input), min_time=min_time)
+        results[f"micro.analyze_errors[{n}]"] = measure(lambda: analyze_errors(text, user_input), min_time=min_time)
+        results[f"micro.keystroke_stats[{n}]"] = measure(lambda: analytics.keystroke_stats(cols), min_time=min_time)
+        results[f"micro.columns_from_rows[{n}]"] = measure(lambda: analytics.columns_from_rows(rows), min_time=min_time)
+        results[f"micro.compute_summary[{n}]"] = measure(
+            lambda: compute_summary(1, text, user_input, cols), min_time=min_time)
+    return results
+
+
+def build_app(url: str):
+    engine = create_engine(url, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        db.add(models.User(id=1, email="bench@example.com", password_hash="x"))
+        db.commit()
+
+    def override_get_db():
+        with Session() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(typing.router)
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_session_factory] = lambda: Session
+    return engine, Session, app
+
+
+def macro(lengths, min_time: float) -> dict:
+    results = {}
+    headers = {"Authorization": f"Bearer {utils.create_access_token('1')}"}
+    with tempfile.TemporaryDirectory() as tmp:
+        engine, Session, app = build_app(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        with TestClient(app) as http:
+            def call(method, path, **kw):
+                r = http.request(method, path, headers=headers, **kw)
+                r.raise_for_status()
+                return r
+
+            def new_session(text):
+                return call("POST", "/typing/sessions/start", json={"prompt": text}).json()["session_id"]
+
+            for n in lengths:
+                text, events, user_input = typed_session(n)
+                ended = []
+
+                def typed():
+                    sid = new_session(text)
+                    call("POST", f"/typing/sessions/{sid}/keystrokes", json=events)
+                    call("POST", f"/typing/sessions/{sid}/input", json={"user_input": user_input})
+                    ended.append(sid)
+                    return (sid,)
+
+                results[f"macro.start_session[{n}]"] = measure(lambda: new_session(text), min_time=min_time)
+                results[f"macro.upload_keystrokes[{n}]"] = measure(
+                    lambda sid: call("POST", f"/typing/sessions/{sid}/keystrokes", json=events),
+                    setup=lambda: (new_session(text),), min_time=min_time)
+                results[f"macro.end_session[{n}]"] = measure(
+                    lambda sid: call("POST", f"/typing/sessions/{sid}/end"), setup=typed, min_time=min_time)
+
+                def finish_in_four(sid):
+                    call("POST", f"/typing/sessions/{sid}/keystrokes", json=events)
+                    call("POST", f"/typing/sessions/{sid}/input", json={"user_input": user_input})
+                    call("POST", f"/typing/sessions/{sid}/end")
+                    call("GET", f"/typing/sessions/{sid}/summary")
+
+                results[f"macro.finish_four_requests[{n}]"] = measure(
+                    finish_in_four, setup=lambda: (new_session(text),), min_time=min_time)
+                results[f"macro.complete_session[{n}]"] = measure(
+                    lambda sid: call("POST", f"/typing/sessions/{sid}/complete",
+                                     json={"keystrokes": events, "user_input": user_input}),
+                    setup=lambda: (new_session(text),), min_time=min_time)
+
+                sid = ended[-1]
+                results[f"macro.summary_cached[{n}]"] = measure(
+                    lambda: call("GET", f"/typing/sessions/{sid}/summary"), min_time=min_time)
+
+                def drop_summary():
+                    with Session() as db:
+                        summaries.invalidate(db, sid)
+                        db.commit()
+                    return ()
+
+                results[f"macro.summary_cold[{n}]"] = measure(
+                    lambda: call("GET", f"/typing/sessions/{sid}/summary"), setup=drop_summary, min_time=min_time)
+        engine.dispose()
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[dict]:
+    """Per-benchmark median ratio against the baseline, with a regression flag."""
+    rows = []
+    for name, now in sorted(results.items()):
+        base = baseline.get(name)
+        if not base:
+            continue
+        ratio = now["median_us"] / base["median_us"] if base["median_us"] else float("inf")
+        rows.append({"name": name, "baseline_us": base["median_us"], "median_us": now["median_us"],
+                     "ratio": ratio, "regressed": ratio > 1 + threshold})
+    return rows
+
+
+def run(quick: bool = False, only: str | None = None) -> dict:
+    lengths = QUICK_LENGTHS if quick else LENGTHS
+    min_time = 0.2 if quick else 0.5
+    results = {}
+    for group in (micro, macro):
+        results.update(group(lengths, min_time))
+    if only:
+        results = {k: v for k, v in results.items() if only in k}
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "quick": quick,
+        },
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the typing pipeline.")
+    parser.add_argument("--quick", action="store_true", help="shorter passages and timing windows")
+    parser.add_argument("-k", dest="only", help="only report benchmarks whose name contains this")
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="fail when a median is this fraction slower than the baseline")
+    args = parser.parse_args(argv)
+
+    report = run(args.quick, args.only)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    print(f"{'benchmark':<36} {'median us':>11} {'p95 us':>11} {'runs':>6}")
+    for name, r in report["results"].items():
+        print(f"{name:<36} {r['median_us']:>11.1f} {r['p95_us']:>11.1f} {r['runs']:>6}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        rows = compare(report["results"], baseline, args.threshold)
+        print(f"\n{'benchmark':<36} {'baseline us':>11} {'now us':>11} {'ratio':>7}")
+        for row in rows:
+            flag = "  REGRESSION" if row["regressed"] else ""
+            print(f"{row['name']:<36} {row['baseline_us']:>11.1f} {row['median_us']:>11.1f} {row['ratio']:>7.2f}{flag}")
+        if any(row["regressed"] for row in rows):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Deterministic synthetic typist for the benchmarks.
+
+Turns a target passage into a realistic keystroke stream: log-normal
+inter-key intervals around a target WPM, normally distributed dwell, and
+errors drawn from QWERTY neighbours (substitutions), doubled keys
+(insertions) and skipped characters (omissions). A share of substitutions
+and insertions is noticed and fixed with Backspace. The same seed always
+produces the same stream.
+"""
+import math
+import random
+from dataclasses import dataclass
+
+WORDS = (
+    "the of and to in is you that it he was for on are as with his they at be this have from or one had "
+    "by word but not what all were we when your can said there use an each which she do how their if will "
+    "up other about out many then them these so some her would make like him into time has look two more "
+    "write go see number no way could people my than first water been call who oil its now find long down "
+    "day did get come made may part over new sound take only little work know place year live me back give "
+    "most very after thing our just name good sentence man think say great where help through much before "
+    "line right too mean old any same tell boy follow came want show also around form three small set put "
+    "end does another well large must big even such because turn here why ask went men read need land"
+).split()
+
+_ROWS = ("`1234567890-=", "qwertyuiop[]\\", "asdfghjkl;'", "zxcvbnm,./")
+
+
+def _neighbours() -> dict[str, str]:
+    where = {ch: (r, c) for r, row in enumerate(_ROWS) for c, ch in enumerate(row)}
+    out = {}
+    for ch, (r, c) in where.items():
+        near = [
+            _ROWS[rr][cc]
+            for rr in (r - 1, r, r + 1) if 0 <= rr < len(_ROWS)
+            for cc in (c - 1, c, c + 1) if 0 <= cc < len(_ROWS[rr]) and (rr, cc) != (r, c)
+        ]
+        out[ch] = "".join(near)
+    out[" "] = "cvbnm"
+    return out
+
+
+NEIGHBOURS = _neighbours()
+
+
+def passage(length: int, seed: int = 0) -> str:
+    """`length` characters of lowercase prose built from common English words."""
+    rng = random.Random(seed)
+    words, size = [], 0
+    while size < length:
+        word = rng.choice(WORDS)
+        words.append(word)
+        size += len(word) + 1
+    return " ".join(words)[:length]
+
+
+@dataclass
+class Typist:
+    seed: int = 0
+    wpm: float = 60.0
+    error_rate: float = 0.03       # chance per target character of a mistake
+    correction_rate: float = 0.7   # share of substitutions / insertions fixed with Backspace
+    dwell_ms: float = 95.0
+    dwell_sd_ms: float = 20.0
+    start_ts: float = 1.75e9
+
+    def type(self, text: str) -> tuple[list[dict], str]:
+        """Keystroke events (KeystrokeEventIn fields) and the final user_input for `text`."""
+        rng = random.Random(self.seed)
+        mean_interval = 60.0 / (self.wpm * 5)
+        sigma = 0.35
+        mu = math.log(mean_interval) - sigma * sigma / 2
+        events: list[dict] = []
+        typed: list[str] = []
+        t = self.start_ts
+
+        def press(key, target=None, position=None, error=None, correction=None):
+            nonlocal t
+            t += rng.lognormvariate(mu, sigma)
+            dwell = max(0.02, rng.gauss(self.dwell_ms, self.dwell_sd_ms) / 1000)
+            events.append({
+                "key": key, "down_ts": round(t, 6), "up_ts": round(t + dwell, 6),
+                "target_char": target, "position_in_text": position,
+                "is_correction": correction, "is_error": error,
+            })
+            if key == "Backspace":
+                if typed:
+                    typed.pop()
+            else:
+                typed.append(key)
+
+        for i, ch in enumerate(text):
+            if rng.random() >= self.error_rate:
+                press(ch, ch, i)
+                continue
+            kind = rng.random()
+            if kind < 0.7:
+                press(rng.choice(NEIGHBOURS.get(ch, ch) or ch), ch, i, error="substitution")
+                if rng.random() < self.correction_rate:
+                    press("Backspace", ch, i, correction="backspace")
+                    press(ch, ch, i)
+            elif kind < 0.85:
+                press(ch, ch, i)
+                press(ch, ch, i + 1, error="insertion")
+                if rng.random() < self.correction_rate:
+                    press("Backspace", None, i + 1, correction="backspace")
+            # else: omission, the character is skipped
+        return events, "".join(typed)
@@ -29,7 +29,7 @@ TestSessionLocal = sessionmaker(
 )
 
 # ─── 3) Import models first to ensure they are registered with SQLAlchemy metadata ─────────────
-from app import models
+from app import auth_cache, models
 from app.database import Base
 
 # ─── 4) Replace the app's database components with test ones ────────────────────────────────────────────────────────────────────────
@@ -56,6 +56,7 @@ app.dependency_overrides[get_db] = override_get_db
 @pytest.fixture(autouse=True)
 def reset_db():
     # drop & recreate every table so tests start from scratch
+    auth_cache.tokens.clear()
     Base.metadata.drop_all(bind=TEST_ENGINE)
     Base.metadata.create_all(bind=TEST_ENGINE)
     yield
@@ -0,0 +1,89 @@
+import random
+from collections import defaultdict
+
+import pytest
+
+from app import database, models
+from tests.test_endpoints import signup_and_get_token
+
+
+def expected_aggregates(events):
+    """Brute-force the typing_analytics contents from the full event list."""
+    events = sorted(events, key=lambda e: e["down_ts"])
+    agg = defaultdict(lambda: [0.0, 0, 0, 0.0])
+    for i, e in enumerate(events):
+        dwell = e["up_ts"] - e["down_ts"]
+        keys = [(e["key"], None)]
+        if i:
+            keys.append((e["key"], events[i - 1]["key"]))
+        for k in keys:
+            a = agg[k]
+            a[0] += dwell
+            a[1] += 1
+            a[2] += 1 if e.get("is_error") else 0
+            if k[1] is not None:
+                a[3] += e["down_ts"] - events[i - 1]["up_ts"]
+    return {
+        k: (a[0] / a[1], a[1], a[2], a[3] / a[1] if k[1] is not None else None)
+        for k, a in agg.items()
+    }
+
+
+def test_out_of_order_batches_fold_to_full_scan(client):
+    token, _ = signup_and_get_token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    sid = client.post("/typing/sessions/start", json={"prompt": "asdf jkl"}, headers=headers).json()["session_id"]
+
+    rng = random.Random(5)
+    events = []
+    t = 0.0
+    for _ in range(120):
+        t += rng.uniform(0.05, 0.2)
+        events.append({
+            "key": rng.choice("asdf jkl"),
+            "down_ts": t,
+            "up_ts": t + rng.uniform(0.03, 0.1),
+            "is_error": "substitution" if rng.random() < 0.1 else None,
+        })
+    batches = [events[i:i + 15] for i in range(0, len(events), 15)]
+    rng.shuffle(batches)
+    for batch in batches:
+        r = client.post(f"/typing/sessions/{sid}/keystrokes", json=batch, headers=headers)
+        assert r.status_code == 200, r.text
+
+    with database.SessionLocal() as db:
+        rows = db.query(models.TypingAnalytics).filter_by(session_id=sid).all()
+    got = {(r.char, r.prev_char): r for r in rows}
+    expected = expected_aggregates(events)
+
+    assert set(got) == set(expected)
+    for key, (avg_dwell, count, errors, flight) in expected.items():
+        row = got[key]
+        assert row.dwell_count == count
+        assert row.error_count == errors
+        assert row.avg_dwell_time == pytest.approx(avg_dwell)
+        if flight is None:
+            assert row.flight_time is None
+        else:
+            assert row.flight_time == pytest.approx(flight)
+
+
+def test_relinked_bigram_keeps_its_flight_delta(client):
+    token, _ = signup_and_get_token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    sid = client.post("/typing/sessions/start", json={"prompt": "aab"}, headers=headers).json()["session_id"]
+
+    # "a" then "b" first; the middle "a" lands between them, so the a->b
+    # bigram keeps its one press but its flight changes from 0.9 to 0.4
+    events = [
+        {"key": "a", "down_ts": 0.0, "up_ts": 0.1},
+        {"key": "b", "down_ts": 1.0, "up_ts": 1.1},
+        {"key": "a", "down_ts": 0.5, "up_ts": 0.6},
+    ]
+    client.post(f"/typing/sessions/{sid}/keystrokes", json=events[:2], headers=headers)
+    client.post(f"/typing/sessions/{sid}/keystrokes", json=events[2:], headers=headers)
+
+    with database.SessionLocal() as db:
+        row = db.query(models.TypingAnalytics).filter_by(session_id=sid, char="b", prev_char="a").one()
+    assert row.dwell_count == 1
+    assert row.flight_time == pytest.approx(expected_aggregates(events)[("b", "a")][3]) == pytest.approx(0.4)
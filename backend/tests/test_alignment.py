@@ -0,0 +1,102 @@
+import random
+
+from app.alignment import align, analyze_errors, analyze_errors_difflib
+
+WORDS = (
+    "the quick brown fox jumps over lazy dog typing coach practice keyboard "
+    "accuracy rhythm finger home row shift letter space bar tempo drill "
+    "passage minute steady pinky thumb wrist"
+).split()
+
+
+def make_transcript(rng, max_len=180, gap=6):
+    """Target text plus a typed copy with isolated, unambiguous slips.
+
+    Substituted and inserted characters come from outside the target
+    alphabet and slips are spaced apart, so every edit has exactly one
+    sensible explanation. Words are not repeated and texts stay under
+    difflib's 200-char autojunk threshold; outside those limits difflib's
+    longest-match heuristic misaligns and there is nothing to agree with.
+    """
+    target = " ".join(rng.sample(WORDS, len(WORDS)))[: rng.randint(1, max_len)]
+    typed = []
+    counts = {"substitutions": 0, "insertions": 0, "deletions": 0}
+    last_edit = -gap
+    for i, ch in enumerate(target):
+        if i - last_edit >= gap and i < len(target) - gap and rng.random() < 0.15:
+            last_edit = i
+            kind = rng.choice(list(counts))
+            counts[kind] += 1
+            if kind == "substitutions":
+                typed.append(rng.choice("0123456789"))
+            elif kind == "insertions":
+                typed.append(rng.choice("0123456789"))
+                typed.append(ch)
+            continue
+        typed.append(ch)
+    return target, "".join(typed), counts
+
+
+def test_banded_and_difflib_agree_on_error_counts():
+    rng = random.Random(1234)
+    for _ in range(500):
+        target, typed, counts = make_transcript(rng)
+
+        fast = analyze_errors(target, typed)
+        ref = analyze_errors_difflib(target, typed)
+
+        assert fast["total_errors"] == ref["total_errors"] == sum(counts.values()), (target, typed)
+        for kind, expected in counts.items():
+            assert len(fast[kind]) == len(ref[kind]) == expected, (target, typed)
+        assert fast["accuracy_by_position"] == ref["accuracy_by_position"]
+
+
+def test_transposition_counts_as_one_error():
+    result = analyze_errors("the quick fox", "teh quick fox")
+    assert result["total_errors"] == 1
+    assert result["transpositions"] == [{"position": 1, "expected": "he", "actual": "eh"}]
+    assert result["substitutions"] == result["insertions"] == result["deletions"] == []
+
+
+def test_unfinished_and_overlong_input():
+    assert align("hello", "hel") == [("D", 3, 3), ("D", 4, 3)]
+    assert align("hi", "hi!!") == [("I", 2, 2), ("I", 2, 3)]
+    assert analyze_errors("", "abc")["total_errors"] == 0
+
+
+def test_skipped_and_inserted_runs_resync():
+    rng = random.Random(11)
+    for words in (30, 3000):
+        target = " ".join(rng.choice(WORDS) for _ in range(words))
+        at = len(target) // 3
+        for k in (20, 50, 200):
+            if k > len(target) - at:
+                continue
+            skipped = analyze_errors(target, target[:at] + target[at + k:])
+            assert skipped["total_errors"] == len(skipped["deletions"]) == k, (words, k)
+            assert [d["position"] for d in skipped["deletions"]][-1] < at + k + 12
+            pasted = "".join(rng.choice("0123456789") for _ in range(k))
+            inserted = analyze_errors(target, target[:at] + pasted + target[at:])
+            assert inserted["total_errors"] == len(inserted["insertions"]) == k, (words, k)
+            assert "".join(e["actual"] for e in inserted["insertions"]) == pasted
+
+
+def test_runs_longer_than_the_window_resync():
+    rng = random.Random(13)
+    target = " ".join(rng.choice(WORDS) for _ in range(900))[:5000]
+    pasted = " ".join(rng.choice(WORDS) for _ in range(250))[:1250]
+    inserted = analyze_errors(target, target[:2000] + pasted + target[2000:])
+    assert inserted["total_errors"] == len(inserted["insertions"]) == 1250
+    skipped = analyze_errors(target, target[:2000] + target[3250:])
+    assert skipped["total_errors"] == len(skipped["deletions"]) == 1250
+
+
+def test_long_passage_stays_close_to_the_slips():
+    rng = random.Random(7)
+    target = " ".join(rng.choice(WORDS) for _ in range(3000))
+    typed = list(target)
+    for pos in range(50, len(typed) - 50, 97):
+        typed[pos] = "#"
+    result = analyze_errors(target, "".join(typed))
+    assert result["total_errors"] == len(range(50, len(target) - 50, 97))
+    assert len(result["substitutions"]) == result["total_errors"]
@@ -0,0 +1,42 @@
+import random
+
+import pytest
+
+from app.analytics import columns_from_rows, keystroke_stats
+
+
+def test_keystroke_stats_match_per_event_loops():
+    rng = random.Random(3)
+    rows = []
+    t = 0.0
+    for _ in range(500):
+        t += rng.uniform(0.02, 0.3)
+        rows.append((
+            t,
+            t + rng.uniform(0.05, 0.15),
+            rng.choice([None, None, None, "backspace", ""]),
+            rng.choice([None, None, "substitution"]),
+        ))
+
+    stats = keystroke_stats(columns_from_rows(rows))
+
+    dwells = [(up - down) * 1000 for down, up, _, _ in rows]
+    flights = [(rows[i][0] - rows[i - 1][1]) * 1000 for i in range(1, len(rows))]
+    assert stats.count == len(rows)
+    assert stats.duration_secs == pytest.approx(rows[-1][1] - rows[0][0])
+    assert stats.avg_dwell_ms == pytest.approx(sum(dwells) / len(dwells))
+    assert stats.avg_flight_ms == pytest.approx(sum(flights) / len(flights))
+    assert stats.correction_count == len([r for r in rows if r[2]])
+    assert stats.error_keystroke_count == len([r for r in rows if r[3]])
+    assert stats.dwell_percentiles_ms["p50"] == pytest.approx(sorted(dwells)[249], abs=1)
+    assert stats.wpm(100) == pytest.approx(20 / (stats.duration_secs / 60))
+
+
+def test_keystroke_stats_empty_and_single():
+    empty = keystroke_stats(columns_from_rows([]))
+    assert empty.count == 0 and empty.wpm(10) == 0 and empty.dwell_percentiles_ms == {}
+
+    single = keystroke_stats(columns_from_rows([(1.0, 1.1, None, None)]))
+    assert single.count == 1
+    assert single.avg_flight_ms == 0.0
+    assert single.avg_dwell_ms == pytest.approx(100)
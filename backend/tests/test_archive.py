@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta, timezone
+
+from app import archive, database, ingest, models, summaries
+from app.analytics import load_keystroke_columns
+from tests.test_endpoints import signup_and_get_token
+
+NOW = datetime(2025, 9, 1, tzinfo=timezone.utc)
+
+
+def make_rows(n, start=0.0):
+    return [("ab"[i % 2], start + i * 0.2, start + i * 0.2 + 0.08, "ab"[i % 2], i,
+             "backspace" if i % 7 == 0 else None, "substitution" if i % 5 == 0 else None)
+            for i in range(n)]
+
+
+def add_session(db, sid, ended_at, rows):
+    db.add(models.Session(id=sid, user_id=1, target_text="ab", ended_at=ended_at))
+    db.flush()
+    ingest.insert_rows(db, sid, rows)
+    stamp(db, sid, ended_at or NOW)
+    db.commit()
+
+
+def stamp(db, sid, created_at):
+    """Backdate a session's hot rows (created_at is the server's clock)."""
+    db.query(models.KeystrokeEvent).filter_by(session_id=sid).update({"created_at": created_at})
+
+
+def test_pack_roundtrip_and_size():
+    rows = make_rows(2000, start=1.75e9)
+    payload = archive.pack(rows)
+    assert archive.unpack(payload) == rows
+    assert len(payload) < len(rows) * 10
+
+
+def test_compaction_is_transparent_to_readers():
+    with database.SessionLocal() as db:
+        db.add(models.User(id=1, email="a@example.com", password_hash="x"))
+        add_session(db, 1, NOW - timedelta(days=2), make_rows(50))
+        add_session(db, 2, NOW - timedelta(minutes=5), make_rows(10))
+        add_session(db, 3, None, make_rows(10))
+        before = load_keystroke_columns(db, 1, with_keys=True)
+
+        report = archive.run(db, now=NOW, compact_after_hours=24, retention_days=0)
+        assert report["sessions_compacted"] == 1 and report["events_compacted"] == 50
+        assert db.query(models.KeystrokeEvent).filter_by(session_id=1).count() == 0
+        assert db.query(models.KeystrokeEvent).count() == 20
+
+        after = load_keystroke_columns(db, 1, with_keys=True)
+        assert after.down_ts.tolist() == before.down_ts.tolist()
+        assert after.is_error.tolist() == before.is_error.tolist()
+        assert after.key.tolist() == before.key.tolist()
+
+        # a late upload lands in the hot table and is merged on read, then
+        # folded in once it is older than the cutoff itself
+        ingest.insert_rows(db, 1, [("c", 100.0, 100.1, "c", 50, None, None)])
+        stamp(db, 1, NOW - timedelta(hours=1))
+        db.commit()
+        assert len(load_keystroke_columns(db, 1)) == 51
+        assert archive.run(db, now=NOW, compact_after_hours=24, retention_days=0)["sessions_compacted"] == 0
+        report = archive.run(db, now=NOW + timedelta(days=1), compact_after_hours=24, retention_days=0)
+        assert report["sessions_compacted"] == 2  # session 2 is old enough by now
+        assert db.get(models.KeystrokeArchive, 1).event_count == 51
+        assert len(load_keystroke_columns(db, 1)) == 51
+
+        # retention drops the raw archive only
+        report = archive.run(db, now=NOW + timedelta(days=30), compact_after_hours=24, retention_days=7)
+        assert report["archives_purged"] == 2
+        assert db.query(models.KeystrokeArchive).count() == 0
+        assert [s.id for s in db.query(models.Session).filter_by(keystrokes_purged=True)] == [1, 2]
+        assert db.query(models.KeystrokeEvent).filter_by(session_id=3).count() == 10
+
+
+def test_summary_reads_compacted_session(client):
+    token, _ = signup_and_get_token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    sid = client.post("/typing/sessions/start", json={"prompt": "ab"}, headers=headers).json()["session_id"]
+    evs = [{"key": "a", "down_ts": 0.0, "up_ts": 0.1}, {"key": "b", "down_ts": 0.2, "up_ts": 0.3}]
+    client.post(f"/typing/sessions/{sid}/keystrokes", json=evs, headers=headers)
+    client.post(f"/typing/sessions/{sid}/end", headers=headers)
+    expected = client.get(f"/typing/sessions/{sid}/summary", headers=headers).json()
+
+    with database.SessionLocal() as db:
+        archive.compact(db, datetime.now(timezone.utc) + timedelta(minutes=1))
+        db.query(models.SessionSummaryCache).delete()
+        db.commit()
+
+    r = client.get(f"/typing/sessions/{sid}/summary", headers=headers)
+    assert r.status_code == 200, r.text
+    assert r.json() == expected
+
+
+def test_purged_session_keeps_its_stored_summary(client, monkeypatch):
+    token, _ = signup_and_get_token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    sid = client.post("/typing/sessions/start", json={"prompt": "ab"}, headers=headers).json()["session_id"]
+    evs = [{"key": "a", "down_ts": 0.0, "up_ts": 0.1}, {"key": "b", "down_ts": 0.2, "up_ts": 0.3}]
+    client.post(f"/typing/sessions/{sid}/complete", json={"keystrokes": evs, "user_input": "ab"}, headers=headers)
+    expected = client.get(f"/typing/sessions/{sid}/summary", headers=headers).json()
+    assert expected["wpm"] > 0
+
+    later = datetime.now(timezone.utc) + timedelta(days=30)
+    with database.SessionLocal() as db:
+        archive.compact(db, later)
+        assert archive.purge_archives(db, later) == 1
+
+    # a SUMMARY_VERSION bump would normally recompute it, from no keystrokes
+    monkeypatch.setattr(summaries, "SUMMARY_VERSION", summaries.SUMMARY_VERSION + 1)
+    r = client.get(f"/typing/sessions/{sid}/summary", headers=headers)
+    assert r.status_code == 200, r.text
+    assert r.json() == expected
+    assert client.get(f"/typing/sessions/{sid}/analysis", headers=headers).status_code == 410
+    with database.SessionLocal() as db:
+        assert db.get(models.Session, sid).words_per_minute == expected["wpm"]
+
+        db.query(models.SessionSummaryCache).delete()
+        db.commit()
+    assert client.get(f"/typing/sessions/{sid}/summary", headers=headers).status_code == 410
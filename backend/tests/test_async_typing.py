@@ -0,0 +1,95 @@
+import os
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app import database, models
+from app.database import async_url, get_async_db, get_async_session_factory, get_db
+from app.main import app as sync_app
+from app.routers import auth, typing, typing_async
+from tests.test_endpoints import signup_and_get_token
+
+
+@pytest.fixture
+def async_client():
+    # NullPool: TestClient runs each request on its own event loop
+    engine = create_async_engine(async_url(os.environ["DATABASE_URL"]), poolclass=NullPool)
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with factory() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(auth.router)
+    app.include_router(typing_async.router)
+    app.include_router(typing.router)
+    app.dependency_overrides[get_db] = sync_app.dependency_overrides[get_db]
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_async_session_factory] = lambda: factory
+    return TestClient(app)
+
+
+def test_async_handlers_match_sync_flow(async_client):
+    client = async_client
+    token, _ = signup_and_get_token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    r = client.post("/typing/sessions/start", json={"prompt": "abc"}, headers=headers)
+    assert r.status_code == 200, r.text
+    sid = r.json()["session_id"]
+
+    evs = [
+        {"key": "a", "down_ts": 0.0, "up_ts": 0.1},
+        {"key": "b", "down_ts": 0.2, "up_ts": 0.3},
+        {"key": "d", "down_ts": 0.4, "up_ts": 0.5},
+    ]
+    r = client.post(f"/typing/sessions/{sid}/keystrokes", json=evs, headers=headers)
+    assert r.status_code == 200, r.text
+    assert r.json()["count"] == 3
+
+    client.post(f"/typing/sessions/{sid}/input", json={"user_input": "abd"}, headers=headers)
+    r = client.post(f"/typing/sessions/{sid}/end", headers=headers)
+    assert r.status_code == 200, r.text
+
+    with database.SessionLocal() as db:
+        assert db.get(models.SessionSummaryCache, sid) is not None
+        assert db.get(models.Session, sid).profiled
+
+    r = client.get(f"/typing/sessions/{sid}/summary", headers=headers)
+    assert r.status_code == 200, r.text
+    data = r.json()
+    assert data["keystroke_count"] == 3
+    assert data["error_count"] == 1
+    assert pytest.approx(data["duration_secs"], rel=1e-2) == 0.5
+
+    sid = client.post("/typing/sessions/start", json={"prompt": "abc"}, headers=headers).json()["session_id"]
+    r = client.post(f"/typing/sessions/{sid}/complete", json={"keystrokes": evs, "user_input": "abd"},
+                    headers=headers)
+    assert r.status_code == 200, r.text
+    assert r.json() == {**data, "session_id": sid}
+
+    # a retried /complete answers with the stored summary and stores nothing twice
+    r = client.post(f"/typing/sessions/{sid}/complete", json={"keystrokes": evs, "user_input": "abd"},
+                    headers=headers)
+    assert r.status_code == 200, r.text
+    assert r.json() == {**data, "session_id": sid}
+    with database.SessionLocal() as db:
+        assert db.query(models.KeystrokeEvent).filter_by(session_id=sid).count() == 3
+
+
+def test_async_handlers_reject_other_users_sessions(async_client):
+    client = async_client
+    token, _ = signup_and_get_token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    with database.SessionLocal() as db:
+        db.add(models.User(id=99, email="other@example.com", password_hash="x"))
+        db.add(models.Session(id=99, user_id=99, target_text="ab"))
+        db.commit()
+
+    r = client.post("/typing/sessions/99/keystrokes", json=[], headers=headers)
+    assert r.status_code == 404
+    assert client.get("/typing/sessions/99/summary", headers=headers).status_code == 404
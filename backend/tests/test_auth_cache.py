@@ -0,0 +1,58 @@
+from app import auth_cache, database, utils
+from app.auth_cache import TokenCache, UserSnapshot
+from app.main import app
+from tests.test_endpoints import signup_and_get_token
+
+ALICE = UserSnapshot(1, "alice@example.com")
+
+
+def test_entries_expire_at_ttl_or_token_exp():
+    cache = TokenCache(maxsize=10, ttl=60)
+    cache.put("a", ALICE, token_exp=None, now=1000)
+    cache.put("b", ALICE, token_exp=1010, now=1000)
+    assert cache.get("a", now=1059) == ALICE
+    assert cache.get("a", now=1060) is None
+    assert cache.get("b", now=1009) == ALICE
+    assert cache.get("b", now=1010) is None
+
+
+def test_least_recently_used_is_evicted():
+    cache = TokenCache(maxsize=2, ttl=60)
+    cache.put("a", ALICE, None, now=0)
+    cache.put("b", ALICE, None, now=0)
+    cache.get("a", now=1)
+    cache.put("c", ALICE, None, now=1)
+    assert cache.get("b", now=1) is None
+    assert cache.get("a", now=1) == ALICE and cache.get("c", now=1) == ALICE
+
+
+def test_token_verified_once_across_requests(client, monkeypatch):
+    token, user_id = signup_and_get_token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    calls = []
+    decode = utils.decode_access_token
+    monkeypatch.setattr(utils, "decode_access_token", lambda t: calls.append(t) or decode(t))
+
+    sid = client.post("/typing/sessions/start", json={"prompt": "ab"}, headers=headers).json()["session_id"]
+    r = client.post(f"/typing/sessions/{sid}/keystrokes", json=[], headers=headers)
+    assert r.status_code == 200, r.text
+    assert client.get(f"/users/{user_id}", headers=headers).json()["email"] == "test@example.com"
+    assert calls == [token]
+
+    # a bad token is never cached
+    assert client.get("/typing/profile", headers={"Authorization": "Bearer nope"}).status_code == 401
+    assert len(auth_cache.tokens) == 1
+
+
+def test_cache_hit_opens_no_session(client, monkeypatch):
+    token, user_id = signup_and_get_token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get(f"/users/{user_id}", headers=headers).status_code == 200
+
+    def boom():
+        raise AssertionError("session opened on a cache hit")
+
+    monkeypatch.setattr(database, "SessionLocal", boom)
+    monkeypatch.setitem(app.dependency_overrides, database.get_db, boom)
+    assert client.get(f"/users/{user_id}", headers=headers).json()["id"] == user_id
@@ -0,0 +1,37 @@
+from benchmarks import suite
+from benchmarks.typist import Typist, passage
+
+
+def test_typist_is_deterministic_and_consistent():
+    text = passage(2000, seed=3)
+    assert len(text) == 2000 and passage(2000, seed=3) == text
+
+    events, user_input = Typist(seed=7, error_rate=0.05, correction_rate=0.5).type(text)
+    assert (events, user_input) == Typist(seed=7, error_rate=0.05, correction_rate=0.5).type(text)
+    assert events != Typist(seed=8, error_rate=0.05, correction_rate=0.5).type(text)[0]
+
+    replay = []
+    for e in events:
+        if e["key"] == "Backspace":
+            replay.pop()
+        else:
+            replay.append(e["key"])
+    assert "".join(replay) == user_input
+    assert all(e["down_ts"] < e["up_ts"] for e in events)
+    assert all(a["down_ts"] < b["down_ts"] for a, b in zip(events, events[1:]))
+
+    errors = sum(1 for e in events if e["is_error"])
+    corrections = sum(1 for e in events if e["is_correction"])
+    assert 50 < errors < 160 and 0 < corrections < errors
+
+    clean, clean_input = Typist(seed=7, error_rate=0.0).type(text)
+    assert clean_input == text and len(clean) == len(text)
+
+
+def test_compare_flags_regressions_over_threshold():
+    baseline = {"a": {"median_us": 100.0}, "b": {"median_us": 100.0}, "gone": {"median_us": 1.0}}
+    results = {"a": {"median_us": 115.0}, "b": {"median_us": 130.0}, "new": {"median_us": 5.0}}
+    rows = {row["name"]: row for row in suite.compare(results, baseline, threshold=0.2)}
+    assert set(rows) == {"a", "b"}
+    assert not rows["a"]["regressed"] and rows["b"]["regressed"]
+    assert rows["b"]["ratio"] == 1.3
@@ -0,0 +1,73 @@
+from app import char_stats, database, models
+from tests.test_endpoints import signup_and_get_token
+
+
+def play(client, headers, keys, errors=(), end=True):
+    """Type `keys` (one keystroke each); indexes in `errors` are flagged as errors."""
+    text = "".join(k if len(k) == 1 else "" for k in keys)
+    sid = client.post("/typing/sessions/start", json={"prompt": text}, headers=headers).json()["session_id"]
+    evs = [{"key": k, "down_ts": i * 0.2, "up_ts": i * 0.2 + 0.1,
+            "is_error": "substitution" if i in errors else None} for i, k in enumerate(keys)]
+    client.post(f"/typing/sessions/{sid}/keystrokes", json=evs, headers=headers)
+    client.post(f"/typing/sessions/{sid}/input", json={"user_input": text}, headers=headers)
+    if end:
+        client.post(f"/typing/sessions/{sid}/end", headers=headers)
+    return sid
+
+
+def test_character_problems_from_incremental_totals(client):
+    token, user_id = signup_and_get_token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    url = "/typing/analytics/character-problems"
+    assert client.get(url, headers=headers).json() == {"problematic_characters": [], "total_sessions_analyzed": 0}
+
+    # 'e': 4 errors in 21 presses, 'q': 1 in 21, 'w': none; Backspace isn't a character
+    play(client, headers, list("qe" * 20), errors={1, 3, 5, 7})
+    play(client, headers, ["q", "Backspace", "e"] + ["w"] * 10, errors={0, 1})
+    play(client, headers, list("zzz"), errors={0}, end=False)  # not analysed until it ends
+
+    r = client.get(url, headers=headers)
+    assert r.status_code == 200, r.text
+    data = r.json()
+    assert data["total_sessions_analyzed"] == 2
+    problems = data["problematic_characters"]
+    assert [p["character"] for p in problems] == ["e", "q"]
+    assert problems[0] == {"character": "e", "error_count": 4, "total_typed": 21, "error_rate": 4 / 21 * 100}
+    assert problems[1]["total_typed"] == 21 and problems[1]["error_count"] == 1
+
+    assert [p["character"] for p in client.get(url + "?limit=1", headers=headers).json()["problematic_characters"]] == ["e"]
+    assert client.get(url + "?limit=0", headers=headers).status_code == 422
+
+    with database.SessionLocal() as db:
+        incremental = sorted((r.char, r.total_typed, r.error_count, round(r.dwell_sum, 6))
+                             for r in db.query(models.UserCharStat).filter_by(user_id=user_id))
+        assert "Backspace" not in {row[0] for row in incremental}
+        assert char_stats.rebuild(db, user_id) == len(incremental) == 3
+        assert incremental == sorted((r.char, r.total_typed, r.error_count, round(r.dwell_sum, 6))
+                                     for r in db.query(models.UserCharStat).filter_by(user_id=user_id))
+
+
+def test_difficulty_shrinks_rarely_typed_characters():
+    assert char_stats.difficulty(0, 100) == 0
+    assert char_stats.difficulty(1, 1) < char_stats.difficulty(10, 100)
+    assert char_stats.difficulty(10, 100) < char_stats.difficulty(20, 100)
+
+
+def test_late_uploads_reach_the_totals(client):
+    token, user_id = signup_and_get_token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    sid = play(client, headers, list("abab"), errors={1})
+
+    late = [{"key": k, "down_ts": 10 + i * 0.2, "up_ts": 10 + i * 0.2 + 0.05,
+             "is_error": "substitution" if k == "c" else None} for i, k in enumerate(["b", "c", "Shift"])]
+    assert client.post(f"/typing/sessions/{sid}/keystrokes", json=late, headers=headers).status_code == 200
+
+    def totals(db):
+        return sorted((r.char, r.total_typed, r.error_count, round(r.dwell_sum, 6))
+                      for r in db.query(models.UserCharStat).filter_by(user_id=user_id))
+
+    with database.SessionLocal() as db:
+        incremental = totals(db)
+        assert [row[:3] for row in incremental] == [("a", 2, 0), ("b", 3, 1), ("c", 1, 1)]
+        char_stats.rebuild(db, user_id)
+        assert totals(db) == incremental
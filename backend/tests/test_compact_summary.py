@@ -0,0 +1,59 @@
+import orjson
+
+from app import analytics, compact_summary, schemas
+from app.routers.typing import compute_summary
+from benchmarks.typist import Typist, passage
+from tests.test_endpoints import signup_and_get_token
+
+
+def test_rle_and_bitset_roundtrip():
+    bits = [1] * 40 + [0] + [1] * 9 + [0, 0]
+    assert compact_summary.rle(bits) == [1, 40, 1, 9, 2]
+    assert compact_summary.unrle(compact_summary.rle(bits)) == bits
+    assert compact_summary.rle([]) == [] and compact_summary.unrle([]) == []
+    positions = [0, 7, 8, 63, 100]
+    packed = compact_summary.bitset(positions, 101)
+    assert compact_summary.unbitset(packed, 101) == positions
+
+
+def test_compact_expand_roundtrip_on_long_passage():
+    text = passage(5000, seed=2)
+    events, user_input = Typist(seed=2, error_rate=0.04).type(text)
+    cols = analytics.columns_from_rows(
+        [(e["down_ts"], e["up_ts"], e["is_correction"], e["is_error"]) for e in events])
+    summary = compute_summary(1, text, user_input, cols)
+    full = orjson.loads(orjson.dumps(summary, option=orjson.OPT_SERIALIZE_NUMPY))
+    packed = compact_summary.compact(full)
+    assert "error_positions" not in packed["error_details"]
+    # the echoed texts are unchanged; the per-position data shrinks
+    assert len(orjson.dumps(packed["error_details"])) < len(orjson.dumps(full["error_details"])) / 3
+    assert compact_summary.expand(packed) == full
+    schemas.SessionSummary.model_validate(compact_summary.expand(packed))
+
+
+def test_summary_endpoint_full_and_compact(client):
+    token, _ = signup_and_get_token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    text = "the quick brown fox jumps over the lazy dog"
+    sid = client.post("/typing/sessions/start", json={"prompt": text}, headers=headers).json()["session_id"]
+    events, user_input = Typist(seed=1, error_rate=0.1).type(text)
+    client.post(f"/typing/sessions/{sid}/keystrokes", json=events, headers=headers)
+    client.post(f"/typing/sessions/{sid}/input", json={"user_input": user_input}, headers=headers)
+
+    # computed (session still open) and stored (after end) paths
+    computed = client.get(f"/typing/sessions/{sid}/summary", headers=headers)
+    assert computed.headers["content-type"] == "application/json"
+    client.post(f"/typing/sessions/{sid}/end", headers=headers)
+    full = client.get(f"/typing/sessions/{sid}/summary", headers=headers)
+    assert full.status_code == 200 and full.headers["content-type"] == "application/json"
+    schemas.SessionSummary.model_validate(full.json())
+    assert full.json()["error_details"]["accuracy_by_position"]
+
+    by_query = client.get(f"/typing/sessions/{sid}/summary?format=compact", headers=headers)
+    by_accept = client.get(f"/typing/sessions/{sid}/summary",
+                           headers={**headers, "Accept": compact_summary.COMPACT_MEDIA_TYPE})
+    for r in (by_query, by_accept):
+        assert r.headers["content-type"] == compact_summary.COMPACT_MEDIA_TYPE
+        assert "accuracy_runs" in r.json()["error_details"]
+        assert compact_summary.expand(r.json()) == full.json()
+    assert client.get(f"/typing/sessions/{sid}/summary?format=tiny", headers=headers).status_code == 422
@@ -0,0 +1,110 @@
+from collections import defaultdict
+
+import numpy as np
+import pytest
+
+from app import database, detailed_analysis, models, schemas
+from benchmarks.typist import Typist, passage
+from tests.test_endpoints import signup_and_get_token
+
+
+def rows_of(events):
+    return [(e["down_ts"], e["up_ts"], e["is_correction"], e["is_error"], e["key"]) for e in events]
+
+
+def test_running_matches_numpy():
+    values = np.random.default_rng(0).normal(120, 30, 1000)
+    running = detailed_analysis.Running()
+    for v in values:
+        running.add(float(v))
+    assert running.n == 1000
+    assert running.mean == pytest.approx(values.mean())
+    assert running.std == pytest.approx(values.std())
+    assert running.cv == pytest.approx(values.std() / values.mean())
+    assert detailed_analysis.Running().std == 0.0
+
+
+def test_single_pass_matches_batch_computation():
+    events, _ = Typist(seed=3, error_rate=0.05, correction_rate=0.6).type(passage(3000, seed=3))
+    analysis = detailed_analysis.analyse(7, iter(rows_of(events)))
+    schemas.DetailedAnalysis.model_validate(analysis)
+
+    dwell = np.array([(e["up_ts"] - e["down_ts"]) * 1000 for e in events])
+    flight = np.array([(b["down_ts"] - a["up_ts"]) * 1000 for a, b in zip(events, events[1:])])
+    per_char, per_pair = defaultdict(list), defaultdict(list)
+    for e, d in zip(events, dwell):
+        if len(e["key"]) == 1:
+            per_char[e["key"]].append(d)
+    for a, b, f in zip(events, events[1:], flight):
+        if len(a["key"]) == 1 and len(b["key"]) == 1:
+            per_pair[a["key"] + b["key"]].append(f)
+
+    rhythm = analysis["typing_rhythm"]
+    assert rhythm["keystrokes"] == len(events)
+    assert rhythm["dwell_std_ms"] == pytest.approx(dwell.std())
+    assert rhythm["flight_std_ms"] == pytest.approx(flight.std())
+    assert rhythm["correction_rate"] == pytest.approx(sum(1 for e in events if e["is_correction"]) / len(events))
+
+    slow = analysis["slow_characters"]
+    assert 0 < len(slow) <= detailed_analysis.TOP_N
+    assert [c["difficulty_score"] for c in slow] == sorted((c["difficulty_score"] for c in slow), reverse=True)
+    for c in slow:
+        assert c["dwell_count"] == len(per_char[c["char"]])
+        assert c["avg_dwell_time"] == pytest.approx(np.mean(per_char[c["char"]]))
+    for b in analysis["difficult_bigrams"]:
+        assert b["count"] == len(per_pair[b["bigram"]])
+        assert b["avg_flight_time"] == pytest.approx(np.mean(per_pair[b["bigram"]]))
+    assert all(len(c["char"]) == 1 for c in slow)
+
+    errors = analysis["common_errors"]
+    assert sum(v for k, v in errors.items() if k.startswith("error:")) == sum(1 for e in events if e["is_error"])
+    assert errors.get("correction:backspace") == sum(1 for e in events if e["is_correction"])
+    assert analysis["improvement_areas"]
+
+
+def test_empty_session():
+    analysis = detailed_analysis.analyse(1, [])
+    schemas.DetailedAnalysis.model_validate(analysis)
+    assert analysis["slow_characters"] == [] and analysis["improvement_areas"] == []
+
+
+def test_analysis_endpoint_stores_ended_sessions(client, monkeypatch):
+    token, _ = signup_and_get_token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    text = passage(400, seed=1)
+    events, user_input = Typist(seed=1, error_rate=0.05).type(text)
+    sid = client.post("/typing/sessions/start", json={"prompt": text}, headers=headers).json()["session_id"]
+    client.post(f"/typing/sessions/{sid}/keystrokes", json=events, headers=headers)
+
+    # open sessions are analysed on every read, never stored
+    r = client.get(f"/typing/sessions/{sid}/analysis", headers=headers)
+    assert r.status_code == 200, r.text
+    assert r.json()["typing_rhythm"]["keystrokes"] == len(events)
+    with database.SessionLocal() as db:
+        assert db.get(models.SessionAnalysisCache, sid) is None
+
+    client.post(f"/typing/sessions/{sid}/complete", json={"user_input": user_input}, headers=headers)
+    first = client.get(f"/typing/sessions/{sid}/analysis", headers=headers).json()
+    with database.SessionLocal() as db:
+        assert db.get(models.SessionAnalysisCache, sid) is not None
+
+    def boom(*args, **kwargs):
+        raise AssertionError("analysis recomputed")
+
+    with monkeypatch.context() as m:
+        m.setattr(detailed_analysis, "analyse", boom)
+        assert client.get(f"/typing/sessions/{sid}/analysis", headers=headers).json() == first
+
+    # a late upload drops it with the stored summary
+    late = [{"key": "z", "down_ts": 1e4, "up_ts": 1e4 + 0.1}]
+    client.post(f"/typing/sessions/{sid}/keystrokes", json=late, headers=headers)
+    with database.SessionLocal() as db:
+        assert db.get(models.SessionAnalysisCache, sid) is None
+    again = client.get(f"/typing/sessions/{sid}/analysis", headers=headers).json()
+    assert again["typing_rhythm"]["keystrokes"] == len(events) + 1
+
+    with database.SessionLocal() as db:
+        db.add(models.User(id=99, email="other@example.com", password_hash="x"))
+        db.add(models.Session(id=99, user_id=99, target_text="ab"))
+        db.commit()
+    assert client.get("/typing/sessions/99/analysis", headers=headers).status_code == 404
@@ -1,4 +1,10 @@
+from datetime import date, datetime, timedelta, timezone
+
 import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import Session as OrmSession
+
+from app import database, models
 
 # -------------------------------------------------------------------
 # helper — now takes the `client` fixture instead of a global
@@ -94,3 +100,140 @@ def test_start_session_includes_prompt(client):
     data = r.json()
     assert data["prompt"] == payload["prompt"]
     assert "session_id" in data and "started_at" in data
+
+
+# -------------------------------------------------------------------
+def test_summary_without_keystrokes(client):
+    token, _ = signup_and_get_token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    sid = client.post("/typing/sessions/start", json={"prompt": "abc"}, headers=headers).json()["session_id"]
+    client.post(f"/typing/sessions/{sid}/input", json={"user_input": "abd"}, headers=headers)
+    client.post(f"/typing/sessions/{sid}/end", headers=headers)
+
+    r = client.get(f"/typing/sessions/{sid}/summary", headers=headers)
+    assert r.status_code == 200, r.text
+    data = r.json()
+    assert data["keystroke_count"] == 0
+    assert data["wpm"] == 0
+    assert data["error_count"] == 1
+
+
+# -------------------------------------------------------------------
+def test_summary_is_stored_at_end_and_invalidated_by_late_uploads(client):
+    token, _ = signup_and_get_token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    sid = client.post("/typing/sessions/start", json={"prompt": "abc"}, headers=headers).json()["session_id"]
+    client.post(f"/typing/sessions/{sid}/input", json={"user_input": "abc"}, headers=headers)
+    client.post(f"/typing/sessions/{sid}/end", headers=headers)
+
+    with database.SessionLocal() as db:
+        assert db.get(models.SessionSummaryCache, sid) is not None
+
+    first = client.get(f"/typing/sessions/{sid}/summary", headers=headers).json()
+    assert first["error_count"] == 0
+    assert client.get(f"/typing/sessions/{sid}/summary", headers=headers).json() == first
+
+    # input uploaded after the end drops the stored summary; the next read recomputes
+    client.post(f"/typing/sessions/{sid}/input", json={"user_input": "abd"}, headers=headers)
+    with database.SessionLocal() as db:
+        assert db.get(models.SessionSummaryCache, sid) is None
+
+    r = client.get(f"/typing/sessions/{sid}/summary", headers=headers)
+    assert r.status_code == 200, r.text
+    assert r.json()["error_count"] == 1
+    with database.SessionLocal() as db:
+        assert db.get(models.SessionSummaryCache, sid) is not None
+
+
+def test_complete_session_in_one_request(client):
+    token, _ = signup_and_get_token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    evs = [
+        {"key": "a", "down_ts": 0.0, "up_ts": 0.1},
+        {"key": "b", "down_ts": 0.2, "up_ts": 0.3},
+        {"key": "d", "down_ts": 0.4, "up_ts": 0.5},
+    ]
+
+    # the four-request flow, for reference
+    old = client.post("/typing/sessions/start", json={"prompt": "abc"}, headers=headers).json()["session_id"]
+    client.post(f"/typing/sessions/{old}/keystrokes", json=evs, headers=headers)
+    client.post(f"/typing/sessions/{old}/input", json={"user_input": "abd"}, headers=headers)
+    client.post(f"/typing/sessions/{old}/end", headers=headers)
+    expected = client.get(f"/typing/sessions/{old}/summary", headers=headers).json()
+
+    sid = client.post("/typing/sessions/start", json={"prompt": "abc"}, headers=headers).json()["session_id"]
+    # a batch streamed earlier is analysed together with the final one
+    client.post(f"/typing/sessions/{sid}/keystrokes", json=evs[:1], headers=headers)
+    commits = []
+    listener = lambda session: commits.append(session)
+    event.listen(OrmSession, "after_commit", listener)
+    try:
+        r = client.post(f"/typing/sessions/{sid}/complete",
+                        json={"keystrokes": evs[1:], "user_input": "abd"}, headers=headers)
+    finally:
+        event.remove(OrmSession, "after_commit", listener)
+    assert r.status_code == 200, r.text
+    assert len(commits) == 1
+    assert r.json() == {**expected, "session_id": sid}
+
+    with database.SessionLocal() as db:
+        sess = db.get(models.Session, sid)
+        assert sess.ended_at is not None and sess.user_input == "abd" and sess.profiled
+        assert db.get(models.SessionSummaryCache, sid) is not None
+    assert client.get(f"/typing/sessions/{sid}/summary", headers=headers).json() == r.json()
+
+
+def test_complete_session_validates_and_checks_ownership(client):
+    token, _ = signup_and_get_token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    with database.SessionLocal() as db:
+        db.add(models.User(id=99, email="other@example.com", password_hash="x"))
+        db.add(models.Session(id=99, user_id=99, target_text="ab"))
+        db.commit()
+    assert client.post("/typing/sessions/99/complete", json={"user_input": "ab"}, headers=headers).status_code == 404
+
+    sid = client.post("/typing/sessions/start", json={"prompt": "ab"}, headers=headers).json()["session_id"]
+    r = client.post(f"/typing/sessions/{sid}/complete", json={"keystrokes": [{"key": "a"}]}, headers=headers)
+    assert r.status_code == 422
+    locs = {tuple(err["loc"]) for err in r.json()["detail"]}
+    assert ("body", "user_input") in locs and ("body", "keystrokes", 0, "down_ts") in locs
+
+    # a client end time in the future is capped at the server's clock
+    future = (datetime.now(timezone.utc) + timedelta(days=1)).isoformat()
+    r = client.post(f"/typing/sessions/{sid}/complete", json={"user_input": "ab", "ended_at": future},
+                    headers=headers)
+    assert r.status_code == 200, r.text
+    with database.SessionLocal() as db:
+        ended = db.get(models.Session, sid).ended_at
+    assert ended.replace(tzinfo=timezone.utc) <= datetime.now(timezone.utc)
+
+    # ... and one before the session started is raised to its start
+    sid = client.post("/typing/sessions/start", json={"prompt": "ab"}, headers=headers).json()["session_id"]
+    r = client.post(f"/typing/sessions/{sid}/complete", json={"user_input": "ab", "ended_at": "2001-01-01T00:00:00Z"},
+                    headers=headers)
+    assert r.status_code == 200, r.text
+    with database.SessionLocal() as db:
+        sess = db.get(models.Session, sid)
+        assert sess.ended_at == sess.started_at
+        assert not db.query(models.SessionRollup).filter(models.SessionRollup.period_start < date(2020, 1, 1)).count()
+
+
+def test_complete_session_retry_is_idempotent(client):
+    token, _ = signup_and_get_token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    sid = client.post("/typing/sessions/start", json={"prompt": "ab"}, headers=headers).json()["session_id"]
+    body = {"keystrokes": [{"key": "a", "down_ts": 0.0, "up_ts": 0.1}, {"key": "b", "down_ts": 0.2, "up_ts": 0.3}],
+            "user_input": "ab"}
+    first = client.post(f"/typing/sessions/{sid}/complete", json=body, headers=headers)
+    with database.SessionLocal() as db:
+        ended = db.get(models.Session, sid).ended_at
+
+    retry = client.post(f"/typing/sessions/{sid}/complete", json=body, headers=headers)
+    assert retry.status_code == 200, retry.text
+    assert retry.json() == first.json()
+    assert retry.json()["keystroke_count"] == 2
+    with database.SessionLocal() as db:
+        assert db.query(models.KeystrokeEvent).filter_by(session_id=sid).count() == 2
+        assert db.get(models.Session, sid).ended_at == ended
@@ -0,0 +1,140 @@
+import asyncio
+import gzip
+
+import pytest
+
+from app import database, http_cache, models, summaries
+from app.routers import typing
+from benchmarks.typist import Typist, passage
+from tests.test_endpoints import signup_and_get_token
+
+
+def test_negotiate_and_matches():
+    assert http_cache.negotiate("gzip, deflate") == "gzip"
+    assert http_cache.negotiate("gzip;q=0, deflate") is None
+    assert http_cache.negotiate("identity") is None and http_cache.negotiate(None) is None
+    assert http_cache.negotiate("*") == ("br" if http_cache.brotli else "gzip")
+    assert http_cache.negotiate("br;q=0.5, gzip") == "gzip"
+
+    tag = http_cache.etag(b"body")
+    assert tag != http_cache.etag(b"body", "compact") and tag == http_cache.etag(b"body")
+    assert http_cache.matches(tag, tag) and http_cache.matches(f'"x", W/{tag}', tag)
+    assert http_cache.matches("*", tag) and not http_cache.matches('"x"', tag)
+    assert not http_cache.matches(None, tag)
+
+
+def ended_session(client, headers, length=3000):
+    text = passage(length, seed=4)
+    events, user_input = Typist(seed=4, error_rate=0.05).type(text)
+    sid = client.post("/typing/sessions/start", json={"prompt": text}, headers=headers).json()["session_id"]
+    client.post(f"/typing/sessions/{sid}/keystrokes", json=events, headers=headers)
+    client.post(f"/typing/sessions/{sid}/input", json={"user_input": user_input}, headers=headers)
+    client.post(f"/typing/sessions/{sid}/end", headers=headers)
+    return sid
+
+
+def test_summary_etag_and_304_without_recomputing(client, monkeypatch):
+    token, _ = signup_and_get_token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    sid = ended_session(client, headers)
+    url = f"/typing/sessions/{sid}/summary"
+
+    first = client.get(url, headers=headers)
+    tag = first.headers["etag"]
+    assert first.headers["cache-control"] == "private, no-cache"
+    compact_tag = client.get(url + "?format=compact", headers=headers).headers["etag"]
+    assert compact_tag.removeprefix("W/") != tag.removeprefix("W/")
+
+    def boom(*args, **kwargs):
+        raise AssertionError("summary was decompressed or recomputed")
+
+    with monkeypatch.context() as m:
+        m.setattr(typing, "compute_summary", boom)
+        m.setattr(summaries, "payload_json", boom)
+        r = client.get(url, headers={**headers, "If-None-Match": tag})
+        assert r.status_code == 304 and r.content == b""
+        assert r.headers["etag"].removeprefix("W/") == tag.removeprefix("W/")
+
+    # a late input upload drops the stored summary, so the old tag no longer matches
+    client.post(f"/typing/sessions/{sid}/input", json={"user_input": "changed"}, headers=headers)
+    r = client.get(url, headers={**headers, "If-None-Match": tag})
+    assert r.status_code == 200 and r.json()["user_input"] == "changed"
+    assert r.headers["etag"] != tag
+
+
+def test_computed_summary_is_tagged_like_the_stored_one(client):
+    token, _ = signup_and_get_token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    sid = ended_session(client, headers)
+    url = f"/typing/sessions/{sid}/summary"
+
+    # a version bump makes the next read recompute it
+    with database.SessionLocal() as db:
+        db.get(models.SessionSummaryCache, sid).version = summaries.SUMMARY_VERSION - 1
+        db.commit()
+    computed = client.get(url, headers=headers)
+    assert computed.status_code == 200
+    with database.SessionLocal() as db:
+        payload = db.get(models.SessionSummaryCache, sid).payload
+    assert computed.headers["etag"].removeprefix("W/") == http_cache.etag(payload, "full")
+
+    r = client.get(url, headers={**headers, "If-None-Match": computed.headers["etag"]})
+    assert r.status_code == 304
+
+
+def test_generic_read_endpoints_get_etags(client):
+    token, _ = signup_and_get_token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    ended_session(client, headers, length=200)
+    for url in ("/typing/profile", "/typing/sessions", "/typing/trends"):
+        r = client.get(url, headers=headers)
+        assert r.status_code == 200 and "etag" in r.headers, url
+        again = client.get(url, headers={**headers, "If-None-Match": r.headers["etag"]})
+        assert again.status_code == 304 and again.content == b"", url
+    # writes are never tagged
+    r = client.post("/typing/sessions/start", json={"prompt": "x"}, headers=headers)
+    assert "etag" not in r.headers
+
+
+@pytest.mark.parametrize("accept_encoding", ["gzip", "identity"])
+def test_large_responses_are_compressed_when_accepted(client, accept_encoding):
+    token, user_id = signup_and_get_token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    sid = ended_session(client, headers)
+    url = f"/typing/sessions/{sid}/summary"
+    plain = client.get(url, headers={**headers, "Accept-Encoding": "identity"})
+
+    r = client.get(url, headers={**headers, "Accept-Encoding": accept_encoding})
+    assert r.json() == plain.json()
+    if accept_encoding == "gzip":
+        assert r.headers["content-encoding"] == "gzip" and "Accept-Encoding" in r.headers["vary"]
+        assert r.headers["etag"] == "W/" + plain.headers["etag"]
+        assert int(r.headers["content-length"]) < len(plain.content) / 2
+        assert r.status_code == 200
+    else:
+        assert "content-encoding" not in r.headers
+
+    # small bodies go out as they are
+    small = client.get(f"/users/{user_id}", headers={**headers, "Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+
+
+def test_compression_middleware_skips_non_text_bodies():
+    sent = []
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", scope["path"][1:].encode())]})
+        await send({"type": "http.response.body", "body": b"a" * 4096})
+
+    async def send(message):
+        sent.append(message)
+
+    middleware = http_cache.CompressionMiddleware(app, minimum_size=1024)
+    for ctype in ("application/json", "image/png"):
+        scope = {"type": "http", "method": "GET", "path": "/" + ctype,
+                 "headers": [(b"accept-encoding", b"gzip")]}
+        asyncio.run(middleware(scope, None, send))
+    json_body, png_body = sent[1]["body"], sent[3]["body"]
+    assert gzip.decompress(json_body) == b"a" * 4096
+    assert png_body == b"a" * 4096
@@ -0,0 +1,26 @@
+from app import database, models
+from app.ingest import copy_payload, insert_rows
+
+
+def test_copy_payload_escapes_and_nulls():
+    rows = [
+        ("a", 1.5, 1.625, "a", 0, None, None),
+        ("\t", 2.0, 2.1, None, None, "backspace", "insertion"),
+        ("\\", 3.0, 3.1, "\n", 2, None, None),
+    ]
+    lines = copy_payload(7, rows).getvalue().split("\n")
+    assert lines[0] == "7\ta\t1.5\t1.625\ta\t0\t\\N\t\\N"
+    assert lines[1] == "7\t\\t\t2.0\t2.1\t\\N\t\\N\tbackspace\tinsertion"
+    assert lines[2] == "7\t\\\\\t3.0\t3.1\t\\n\t2\t\\N\t\\N"
+    assert lines[3] == ""
+
+
+def test_insert_rows_executemany_fallback():
+    with database.SessionLocal() as db:
+        db.add(models.User(id=1, email="a@example.com", password_hash="x"))
+        db.add(models.Session(id=1, user_id=1, target_text="ab"))
+        db.commit()
+        insert_rows(db, 1, [("a", 0.0, 0.1, "a", 0, None, None), ("b", 0.2, 0.3, "b", 1, None, "substitution")])
+        db.commit()
+        events = db.query(models.KeystrokeEvent).order_by(models.KeystrokeEvent.down_ts).all()
+    assert [(e.key, e.position_in_text, e.is_error) for e in events] == [("a", 0, None), ("b", 1, "substitution")]
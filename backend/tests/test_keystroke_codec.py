@@ -0,0 +1,60 @@
+import pytest
+
+from app import keystroke_codec
+from tests.test_endpoints import signup_and_get_token
+
+ROWS = [
+    ("a", 0.0, 0.1, "a", 0, None, None),
+    ("x", 0.2, 0.3, "b", 1, None, "substitution"),
+    ("Backspace", 0.4, 0.45, None, None, "backspace", None),
+    ("é", 0.5, 0.6, "é", 2, None, None),
+]
+
+
+def test_roundtrip():
+    payload = keystroke_codec.encode(ROWS)
+    assert keystroke_codec.decode(payload) == ROWS
+    assert keystroke_codec.decode(keystroke_codec.encode([])) == []
+    assert keystroke_codec.decode(keystroke_codec.encode(ROWS, shuffle=True)) == ROWS
+
+
+@pytest.mark.parametrize("mangle", [
+    lambda p: b"NOPE" + p[4:],
+    lambda p: p[:-1],
+    lambda p: p + b"\x00",
+    lambda p: p[:20],
+    lambda p: p[:12] + b"\x02\x00\x00\x00" + p[16:],
+])
+def test_rejects_malformed_payloads(mangle):
+    with pytest.raises(keystroke_codec.CodecError):
+        keystroke_codec.decode(mangle(keystroke_codec.encode(ROWS)))
+
+
+def test_binary_upload_matches_json(client):
+    token, _ = signup_and_get_token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    sid = client.post("/typing/sessions/start", json={"prompt": "abé"}, headers=headers).json()["session_id"]
+
+    r = client.post(
+        f"/typing/sessions/{sid}/keystrokes",
+        content=keystroke_codec.encode(ROWS),
+        headers={**headers, "Content-Type": keystroke_codec.KEYSTROKES_CONTENT_TYPE},
+    )
+    assert r.status_code == 200, r.text
+    assert r.json() == {"count": len(ROWS)}
+
+    r = client.post(
+        f"/typing/sessions/{sid}/keystrokes",
+        content=b"garbage",
+        headers={**headers, "Content-Type": keystroke_codec.KEYSTROKES_CONTENT_TYPE},
+    )
+    assert r.status_code == 422
+
+    r = client.post(f"/typing/sessions/{sid}/keystrokes", json=[{"key": "a"}], headers=headers)
+    assert r.status_code == 422
+    assert r.json()["detail"][0]["loc"][0] == "body"
+
+    client.post(f"/typing/sessions/{sid}/end", headers=headers)
+    summary = client.get(f"/typing/sessions/{sid}/summary", headers=headers).json()
+    assert summary["keystroke_count"] == len(ROWS)
+    assert summary["correction_count"] == 1
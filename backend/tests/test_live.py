@@ -0,0 +1,131 @@
+import random
+
+import numpy as np
+import pytest
+
+from app import database, ingest, live, models
+from app.live import LiveState, LiveStore
+from tests.test_endpoints import signup_and_get_token
+
+
+def typed(text, start=0.0, step=0.2):
+    return [(ch, start + i * step, start + i * step + 0.08) for i, ch in enumerate(text)]
+
+
+def test_alignment_follows_backspace():
+    state = LiveState(1, 1, "cat")
+    for event in typed("cx") + [("Backspace", 0.5, 0.55), ("Shift", 0.6, 0.7)] + typed("at", start=1.0):
+        state.add(*event)
+    snap = state.snapshot()
+    assert snap["position"] == 3 and snap["next_char"] is None and snap["progress"] == 1.0
+    assert snap["uncorrected_errors"] == 0
+    assert snap["accuracy"] == pytest.approx(100 * 3 / 4)  # the x still counts
+    assert snap["keystrokes"] == 6
+
+
+def test_running_stats_match_batch_computation():
+    rng = random.Random(5)
+    target = "the quick brown fox " * 20
+    state = LiveState(1, 1, target)
+    events, t = [], 0.0
+    for ch in target:
+        t += rng.uniform(0.05, 0.3)
+        events.append((ch if rng.random() > 0.1 else "#", t, t + rng.uniform(0.05, 0.12)))
+    for event in events:
+        state.add(*event)
+
+    snap = state.snapshot()
+    dwell = np.array([up - down for _, down, up in events]) * 1000
+    flight = np.array([events[i][1] - events[i - 1][2] for i in range(1, len(events))]) * 1000
+    assert snap["avg_dwell_ms"] == pytest.approx(dwell.mean())
+    assert snap["dwell_std_ms"] == pytest.approx(dwell.std(ddof=1))
+    assert snap["avg_flight_ms"] == pytest.approx(flight.mean())
+    assert snap["flight_std_ms"] == pytest.approx(flight.std(ddof=1))
+
+    last = [ch == target[i] for i, (ch, _, _) in enumerate(events)][-live.ACCURACY_WINDOW:]
+    assert snap["rolling_accuracy"] == pytest.approx(100 * sum(last) / len(last))
+    last_down = events[-1][1]
+    in_window = [e for e in events if e[1] >= last_down - live.WPM_WINDOW]
+    assert snap["wpm"] == pytest.approx((len(in_window) / 5) / (live.WPM_WINDOW / 60))
+
+
+def test_store_evicts_idle_and_least_recent(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(live.time, "monotonic", lambda: clock[0])
+    store = LiveStore(max_sessions=2, idle_seconds=60)
+    store.rebuild(1, 1, "a", [])
+    store.rebuild(2, 1, "a", [])
+    clock[0] = 30
+    assert store.feed(1, typed("a"))
+    clock[0] = 50
+    store.rebuild(3, 1, "a", [])  # over capacity: 2 was least recently used
+    assert store.snapshot(2, 1) is None and len(store) == 2
+    assert store.snapshot(1, 2) is None  # another user's session
+    clock[0] = 95
+    assert store.snapshot(3, 1) is not None and store.snapshot(1, 1) is None
+
+
+def test_live_endpoint_rebuilds_then_updates_incrementally(client):
+    token, _ = signup_and_get_token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    sid = client.post("/typing/sessions/start", json={"prompt": "hello"}, headers=headers).json()["session_id"]
+    evs = [{"key": k, "down_ts": d, "up_ts": u} for k, d, u in typed("hel")]
+    client.post(f"/typing/sessions/{sid}/keystrokes", json=evs, headers=headers)
+
+    r = client.get(f"/typing/sessions/{sid}/live", headers=headers)
+    assert r.status_code == 200, r.text
+    assert r.json()["position"] == 3 and r.json()["next_char"] == "l"
+
+    evs = [{"key": k, "down_ts": d, "up_ts": u} for k, d, u in typed("lp", start=1.0)]
+    client.post(f"/typing/sessions/{sid}/keystrokes", json=evs, headers=headers)
+    incremental = client.get(f"/typing/sessions/{sid}/live", headers=headers).json()
+    assert incremental["position"] == 5 and incremental["uncorrected_errors"] == 1
+
+    live.store.drop(sid)
+    assert client.get(f"/typing/sessions/{sid}/live", headers=headers).json() == incremental
+    assert client.get("/typing/sessions/9999/live", headers=headers).status_code == 404
+
+
+def test_live_state_only_sees_committed_batches(client):
+    token, user_id = signup_and_get_token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    sid = client.post("/typing/sessions/start", json={"prompt": "hello"}, headers=headers).json()["session_id"]
+    live.store.drop(sid)
+    assert client.get(f"/typing/sessions/{sid}/live", headers=headers).json()["position"] == 0
+
+    row = ("h", 0.0, 0.08, None, None, None, None)
+    with database.SessionLocal() as db:
+        ingest.store_rows(db, db.get(models.Session, sid), [row])
+        assert live.store.snapshot(sid, user_id)["keystrokes"] == 0
+        db.rollback()
+        ingest.store_rows(db, db.get(models.Session, sid), [row])
+        db.commit()
+    assert live.store.snapshot(sid, user_id)["keystrokes"] == 1
+
+
+def test_rebuild_replays_batches_fed_while_reading():
+    store = LiveStore()
+    events = typed("hello")
+    store.begin_rebuild(1)
+    # committed after the read (the second overlaps it), fed before the state exists
+    assert not store.feed(1, events[2:4])
+    assert not store.feed(1, events[4:])
+    snap = store.rebuild(1, 1, "hello", events[:3])
+    assert snap["keystrokes"] == 5 and snap["position"] == 5
+
+    # without begin_rebuild nothing is queued
+    assert not store.feed(2, events)
+    assert store.rebuild(2, 1, "hello", [])["keystrokes"] == 0
+
+
+def test_live_on_ended_session_is_not_cached(client):
+    token, user_id = signup_and_get_token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    sid = client.post("/typing/sessions/start", json={"prompt": "hello"}, headers=headers).json()["session_id"]
+    evs = [{"key": k, "down_ts": d, "up_ts": u} for k, d, u in typed("hel")]
+    client.post(f"/typing/sessions/{sid}/keystrokes", json=evs, headers=headers)
+    client.post(f"/typing/sessions/{sid}/end", headers=headers)
+
+    r = client.get(f"/typing/sessions/{sid}/live", headers=headers)
+    assert r.status_code == 200 and r.json()["position"] == 3
+    assert live.store.snapshot(sid, user_id) is None
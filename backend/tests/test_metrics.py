@@ -0,0 +1,107 @@
+import json
+import pstats
+import re
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import metrics
+from tests.test_endpoints import signup_and_get_token
+
+
+def sample(text, line_prefix):
+    match = re.search(rf"^{re.escape(line_prefix)} (\S+)$", text, re.M)
+    return float(match.group(1)) if match else None
+
+
+def test_histogram_and_counter_render():
+    h = metrics.Histogram("t_seconds", "help", ("route",), buckets=(0.1, 1.0))
+    for v in (0.05, 0.5, 5.0):
+        h.observe(v, ("/a",))
+    c = metrics.Counter("t_total", "help", ("route",))
+    c.inc(3, ('/"b"',))
+    text = "\n".join(h.render() + c.render())
+    assert 't_seconds_bucket{route="/a",le="0.1"} 1' in text
+    assert 't_seconds_bucket{route="/a",le="1"} 2' in text
+    assert 't_seconds_bucket{route="/a",le="+Inf"} 3' in text
+    assert 't_seconds_count{route="/a"} 3' in text
+    assert 't_total{route="/\\"b\\""} 3' in text
+
+
+@pytest.fixture
+def scrape(monkeypatch):
+    monkeypatch.setattr(metrics, "SCRAPE_TOKEN", "scrape-secret")
+    return {"Authorization": "Bearer scrape-secret"}
+
+
+def test_metrics_endpoints_need_the_scrape_token(client, monkeypatch):
+    token, _ = signup_and_get_token(client)
+    for url in ("/metrics", "/metrics/db-pool"):
+        assert client.get(url).status_code == 404
+    monkeypatch.setattr(metrics, "SCRAPE_TOKEN", "scrape-secret")
+    for url in ("/metrics", "/metrics/db-pool"):
+        assert client.get(url).status_code == 401
+        assert client.get(url, headers={"Authorization": f"Bearer {token}"}).status_code == 401
+        assert client.get(url, headers={"Authorization": "Bearer scrape-secret"}).status_code == 200
+
+
+def test_metrics_endpoint_reports_requests_queries_and_keystrokes(client, scrape):
+    token, _ = signup_and_get_token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    before = client.get("/metrics", headers=scrape).text
+    sid = client.post("/typing/sessions/start", json={"prompt": "hi"}, headers=headers).json()["session_id"]
+    evs = [{"key": k, "down_ts": i * 0.2, "up_ts": i * 0.2 + 0.1} for i, k in enumerate("hi")]
+    client.post(f"/typing/sessions/{sid}/keystrokes", json=evs, headers=headers)
+    client.post(f"/typing/sessions/{sid}/input", json={"user_input": "hi"}, headers=headers)
+    client.post(f"/typing/sessions/{sid}/end", headers=headers)
+
+    r = client.get("/metrics", headers=scrape)
+    assert r.status_code == 200 and r.headers["content-type"].startswith("text/plain")
+    text = r.text
+    route = 'method="POST",route="/typing/sessions/{sid}/keystrokes"'
+    assert sample(text, f'http_requests_total{{{route},status="200"}}') >= 1
+    assert sample(text, f"http_request_duration_seconds_count{{{route}}}") >= 1
+    assert sample(text, f"http_request_size_bytes_sum{{{route}}}") >= len(json.dumps(evs, separators=(",", ":")))
+    assert sample(text, f"http_request_db_queries_sum{{{route}}}") >= 2
+    assert sample(text, "keystrokes_ingested_total") - (sample(before, "keystrokes_ingested_total") or 0) == 2
+    for fn in ("analyze_errors", "calculate_accuracy", "keystroke_stats", "summary_encode"):
+        assert sample(text, f'app_function_duration_seconds_count{{function="{fn}"}}') >= 1
+    assert sample(text, 'db_pool_connections_in_use{engine="sync"}') is not None
+    assert sample(text, "live_sessions") is not None
+    assert sample(text, 'http_requests_total{method="GET",route="unmatched",status="404"}') is None
+    client.get("/nope")
+    assert sample(client.get("/metrics", headers=scrape).text,
+                  'http_requests_total{method="GET",route="unmatched",status="404"}') >= 1
+
+
+def test_timed_is_free_when_disabled(monkeypatch):
+    def f():
+        return 1
+    monkeypatch.setattr(metrics, "ENABLED", False)
+    assert metrics.timed("f")(f) is f
+    monkeypatch.setattr(metrics, "ENABLED", True)
+    wrapped = metrics.timed("test_f")(f)
+    assert wrapped is not f and wrapped() == 1
+    assert metrics.FUNCTION_SECONDS.count(("test_f",)) == 1
+
+
+def test_sampled_profiles_of_slow_requests(tmp_path):
+    app = FastAPI()
+
+    @app.get("/sync")
+    def sync_endpoint():
+        return sum(range(1000))
+
+    @app.get("/async")
+    async def async_endpoint():
+        return sum(range(1000))
+
+    metrics.profile_endpoints(app)
+    app.add_middleware(metrics.MetricsMiddleware, sample_rate=1.0, slow_ms=0, profile_dir=str(tmp_path))
+    http = TestClient(app)
+    assert http.get("/sync").json() == http.get("/async").json() == 499500
+    profiles = {p.name.split("_", 1)[1]: p for p in tmp_path.iterdir()}
+    assert set(profiles) == {"GET_sync.prof", "GET_async.prof"}
+    functions = {name for _, _, name in pstats.Stats(str(profiles["GET_sync.prof"])).stats}
+    assert "sync_endpoint" in functions
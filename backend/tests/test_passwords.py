@@ -0,0 +1,35 @@
+from fastapi.testclient import TestClient
+
+from app import database, models, passwords, utils
+from app.main import app
+from app.passwords import PasswordHasher
+
+
+def test_login_rehashes_when_cost_factor_changes(client, monkeypatch):
+    monkeypatch.setattr(passwords, "hasher", PasswordHasher(workers=0, queue_size=4, rounds=5))
+    with database.SessionLocal() as db:
+        db.add(models.User(id=1, email="old@example.com", password_hash=utils.hash_password("pw", rounds=4)))
+        db.commit()
+
+    r = client.post("/auth/login", data={"username": "old@example.com", "password": "pw"})
+    assert r.status_code == 200, r.text
+    with database.SessionLocal() as db:
+        stored = db.get(models.User, 1).password_hash
+    assert utils.hash_rounds(stored) == 5 and utils.verify_password("pw", stored)
+
+    assert client.post("/auth/login", data={"username": "old@example.com", "password": "nope"}).status_code == 401
+
+
+def test_full_queue_answers_503(client, monkeypatch):
+    monkeypatch.setattr(passwords, "hasher", PasswordHasher(workers=0, queue_size=0))
+    r = client.post("/auth/signup", json={"email": "a@example.com", "password": "pw"})
+    assert r.status_code == 503
+    assert r.headers["retry-after"] == "1"
+
+
+def test_app_shutdown_stops_the_worker_pool(monkeypatch):
+    hasher = PasswordHasher(workers=1, queue_size=4)
+    monkeypatch.setattr(passwords, "hasher", hasher)
+    with TestClient(app):
+        hasher._pool()
+    assert hasher._executor is None
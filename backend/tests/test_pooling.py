@@ -0,0 +1,50 @@
+import threading
+
+from sqlalchemy import create_engine, text
+
+from app.pooling import PoolSettings, TimedQueuePool, engine_kwargs, install_sqlite_pragmas, pool_metrics
+
+
+def test_settings_from_env(monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE", "20")
+    monkeypatch.setenv("DB_POOL_PRE_PING", "0")
+    monkeypatch.setenv("DB_STATEMENT_TIMEOUT_MS", "1500")
+    settings = PoolSettings.from_env()
+    assert settings.pool_size == 20
+    assert settings.pre_ping is False
+    assert settings.max_overflow == PoolSettings.max_overflow
+
+    kw = engine_kwargs("postgresql://u:p@db/app", settings)
+    assert kw["pool_size"] == 20 and kw["poolclass"] is TimedQueuePool
+    assert kw["connect_args"] == {"options": "-c statement_timeout=1500"}
+    kw = engine_kwargs("postgresql+asyncpg://u:p@db/app", settings, is_async=True)
+    assert "poolclass" not in kw
+    assert kw["connect_args"] == {"server_settings": {"statement_timeout": "1500"}}
+    assert engine_kwargs("sqlite://", settings) == {}
+
+
+def test_sqlite_pragmas_and_pool_metrics(tmp_path):
+    settings = PoolSettings(pool_size=1, max_overflow=0, pool_timeout=5)
+    url = f"sqlite:///{tmp_path / 'pool.db'}"
+    engine = create_engine(url, **engine_kwargs(url, settings))
+    install_sqlite_pragmas(engine, settings)
+
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        metrics = pool_metrics(engine)
+        assert metrics["in_use"] == 1 and metrics["idle"] == 0
+
+        # a second checkout has to wait for this one to be returned
+        waiter = threading.Thread(target=lambda: engine.connect().close())
+        waiter.start()
+        waiter.join(0.2)
+    waiter.join()
+
+    metrics = pool_metrics(engine)
+    assert metrics["in_use"] == 0 and metrics["idle"] == 1
+    assert metrics["checkouts"] == 2
+    assert metrics["checkout_wait_seconds_max"] >= 0.15
+
+    engine.dispose()
+    assert pool_metrics(engine)["checkouts"] == 2
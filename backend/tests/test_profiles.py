@@ -0,0 +1,47 @@
+import pytest
+
+from app.profiles import merge_weighted
+from tests.test_endpoints import signup_and_get_token
+
+
+def run_session(client, headers, prompt, typed, events):
+    sid = client.post("/typing/sessions/start", json={"prompt": prompt}, headers=headers).json()["session_id"]
+    client.post(f"/typing/sessions/{sid}/keystrokes", json=events, headers=headers)
+    client.post(f"/typing/sessions/{sid}/input", json={"user_input": typed}, headers=headers)
+    client.post(f"/typing/sessions/{sid}/end", headers=headers)
+    return client.get(f"/typing/sessions/{sid}/summary", headers=headers).json()
+
+
+def test_profile_updates_once_per_session(client):
+    token, user_id = signup_and_get_token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    r = client.get("/typing/profile", headers=headers)
+    assert r.status_code == 200, r.text
+    assert r.json()["total_sessions"] == 0
+
+    events = [
+        {"key": "a", "down_ts": 0.0, "up_ts": 0.1},
+        {"key": "b", "down_ts": 0.3, "up_ts": 0.35},
+    ]
+    first = run_session(client, headers, "ab", "ab", events)
+    second = run_session(client, headers, "ab", "ax", events)
+    # re-reading a summary must not count the session again
+    client.get(f"/typing/sessions/{second['session_id']}/summary", headers=headers)
+
+    profile = client.get("/typing/profile", headers=headers).json()
+    assert profile["user_id"] == user_id
+    assert profile["total_sessions"] == 2
+    assert profile["avg_wpm"] == pytest.approx((first["wpm"] + second["wpm"]) / 2)
+    assert profile["avg_accuracy"] == pytest.approx(75.0)
+    assert profile["slow_characters"]["a"] == pytest.approx(100.0)
+    assert profile["difficult_bigrams"]["ab"] == pytest.approx(200.0)
+    assert profile["common_errors"] == {"substitutions": 1}
+
+
+def test_merge_weighted_decays_and_stays_bounded():
+    merged = merge_weighted({"a": [100.0, 10.0]}, {"a": (200.0, 1.0)}, decay=0.5)
+    assert merged["a"] == [pytest.approx(700.0 / 6), pytest.approx(6.0)]
+
+    big = merge_weighted({}, {str(i): (1.0, float(i + 1)) for i in range(100)}, size=8)
+    assert sorted(big, key=int) == [str(i) for i in range(92, 100)]
@@ -0,0 +1,67 @@
+from datetime import datetime
+
+from sqlalchemy import select, text
+
+from app import analytics, char_stats, database, history, models
+
+
+def query_plan(db, stmt) -> str:
+    sql = stmt.compile(dialect=db.bind.dialect, compile_kwargs={"literal_binds": True})
+    return "\n".join(row[-1] for row in db.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+
+
+def test_summary_scan_uses_session_down_ts_index():
+    with database.SessionLocal() as db:
+        plan = query_plan(db, analytics.keystroke_columns_query(1))
+    assert "ix_keystroke_events_session_id_down_ts" in plan
+    # the index already yields down_ts order
+    assert "TEMP B-TREE" not in plan
+
+
+def test_neighbour_lookup_uses_session_down_ts_index():
+    # the shape of aggregation._neighbours' previous-event lookup
+    E = models.KeystrokeEvent
+    stmt = (
+        select(E.key, E.down_ts, E.up_ts, E.is_error)
+        .where(E.session_id == 1, E.down_ts < 10.0)
+        .order_by(E.down_ts.desc())
+        .limit(1)
+    )
+    with database.SessionLocal() as db:
+        plan = query_plan(db, stmt)
+    assert "ix_keystroke_events_session_id_down_ts" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_session_history_uses_user_started_at_index():
+    S = models.Session
+    stmt = select(S.id, S.started_at).where(S.user_id == 1).order_by(S.started_at.desc()).limit(20)
+    with database.SessionLocal() as db:
+        plan = query_plan(db, stmt)
+    assert "ix_sessions_user_id_started_at" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_history_keyset_page_uses_user_started_at_index():
+    cursor = history.encode_cursor(datetime(2025, 9, 1), 42)
+    stmt = history.page_query(1, cursor, min_wpm=30).limit(21)
+    with database.SessionLocal() as db:
+        plan = query_plan(db, stmt)
+    assert "ix_sessions_user_id_started_at" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_leaderboard_reads_in_index_order():
+    U = models.UserRollup
+    stmt = select(U.user_id).order_by(U.best_wpm.desc()).limit(10)
+    with database.SessionLocal() as db:
+        plan = query_plan(db, stmt)
+    assert "ix_user_rollups_best_wpm" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_character_problems_read_in_index_order():
+    with database.SessionLocal() as db:
+        plan = query_plan(db, char_stats.problems_query(1, 10))
+    assert "ix_user_char_stats_user_difficulty" in plan
+    assert "TEMP B-TREE" not in plan
@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app import archive, database, ingest, models, reanalysis, summaries
+from app.routers.typing import build_summary
+
+NOW = datetime(2025, 9, 1, tzinfo=timezone.utc)
+
+
+def make_rows(text, start=0.0):
+    return [(ch, start + i * 0.2, start + i * 0.2 + 0.08, ch, i,
+             "backspace" if i % 7 == 3 else None, "substitution" if i % 5 == 4 else None)
+            for i, ch in enumerate(text)]
+
+
+def seed(db, n):
+    db.add(models.User(id=1, email="a@example.com", password_hash="x"))
+    for sid in range(1, n + 1):
+        typed = "the quick brown fox"[: 10 + sid]
+        db.add(models.Session(id=sid, user_id=1, target_text="the quick brown fox",
+                              user_input=typed.replace("q", "w"), ended_at=NOW - timedelta(days=2),
+                              accuracy_percentage=0.0, error_count=99, words_per_minute=0.0))
+        db.flush()
+        ingest.insert_rows(db, sid, make_rows(typed, start=sid * 100.0))
+    # an open session is never touched
+    db.add(models.Session(id=n + 1, user_id=1, target_text="x", user_input="x", error_count=99))
+    db.commit()
+
+
+def expected(db, sid):
+    sess = db.get(models.Session, sid)
+    summary = build_summary(db, sess)
+    db.rollback()
+    return summary
+
+
+def test_backfill_matches_summary_and_resumes(tmp_path):
+    checkpoint = str(tmp_path / "reanalysis.json")
+    with database.SessionLocal() as db:
+        seed(db, 5)
+        archive.archive_session(db, 2)  # compacted sessions are read from the archive
+        db.add(models.SessionSummaryCache(session_id=3, user_id=1, version=0, payload=summaries.encode({})))
+        db.commit()
+        want = {sid: expected(db, sid) for sid in range(1, 6)}
+
+        report = reanalysis.run(db, chunk_size=2, checkpoint=checkpoint, limit=3)
+        assert report["sessions"] == 3 and report["last_id"] == 3
+        assert reanalysis.load_checkpoint(checkpoint) == 3
+        assert db.get(models.Session, 4).error_count == 99
+
+        report = reanalysis.run(db, chunk_size=2, checkpoint=checkpoint)
+        assert report["resumed_after_id"] == 3 and report["sessions"] == 2
+
+        db.expire_all()
+        for sid, summary in want.items():
+            sess = db.get(models.Session, sid)
+            assert sess.error_count == summary["error_count"]
+            assert sess.correction_count == summary["correction_count"]
+            assert sess.accuracy_percentage == pytest.approx(summary["accuracy_percentage"])
+            assert sess.words_per_minute == pytest.approx(summary["wpm"])
+        assert db.get(models.Session, 6).error_count == 99
+
+        cached = db.get(models.SessionSummaryCache, 3)
+        assert cached.version == summaries.SUMMARY_VERSION
+        assert summaries.decode(cached.payload)["error_details"] == want[3]["error_details"]
+        assert db.get(models.SessionSummaryCache, 4) is None
+
+
+def test_sessions_without_keystrokes_keep_their_metrics(caplog):
+    with database.SessionLocal() as db:
+        seed(db, 3)
+        for sid in (1, 2):
+            sess = db.get(models.Session, sid)
+            db.add(models.SessionSummaryCache(session_id=sid, user_id=1, version=0,
+                                              payload=summaries.encode({"wpm": 42.0})))
+            sess.words_per_minute, sess.duration_secs = 42.0, 3.5
+        archive.archive_session(db, 1)
+        db.commit()
+        assert archive.purge_archives(db, NOW) == 1   # session 1: archive purged
+        db.query(models.KeystrokeEvent).filter_by(session_id=2).delete()  # session 2: rows gone
+        db.commit()
+
+        report = reanalysis.run(db, chunk_size=2)
+        assert report["sessions"] == 1 and report["skipped_no_keystrokes"] == 2
+        assert "skipped 2 ended sessions" in caplog.text
+
+        db.expire_all()
+        for sid in (1, 2):
+            sess = db.get(models.Session, sid)
+            assert (sess.words_per_minute, sess.duration_secs, sess.error_count) == (42.0, 3.5, 99)
+            cached = db.get(models.SessionSummaryCache, sid)
+            assert cached.version == 0 and summaries.decode(cached.payload) == {"wpm": 42.0}
+        assert db.get(models.Session, 3).error_count != 99
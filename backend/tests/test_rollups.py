@@ -0,0 +1,139 @@
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+from app import database, models, rollups
+from tests.test_endpoints import signup_and_get_token
+
+
+def add_sessions(db, user_id, specs, start_id=1):
+    """specs: (ended_at, wpm, accuracy, duration_secs) per session."""
+    for i, (ended_at, wpm, accuracy, secs) in enumerate(specs):
+        sess = models.Session(id=start_id + i, user_id=user_id, target_text="x", started_at=ended_at,
+                              ended_at=ended_at, words_per_minute=wpm, accuracy_percentage=accuracy,
+                              duration_secs=secs)
+        db.add(sess)
+        db.flush()
+        rollups.apply_session(db, sess, {"wpm": wpm, "accuracy_percentage": accuracy, "duration_secs": secs})
+    db.commit()
+
+
+def at(day, hour=12):
+    return datetime(2025, 9, day, hour, tzinfo=timezone.utc)
+
+
+def test_incremental_rollups_match_rebuild():
+    with database.SessionLocal() as db:
+        db.add_all([models.User(id=u, email=f"{u}@example.com", password_hash="x") for u in (1, 2)])
+        # Sep 1 2025 is a Monday: days 1-2 share a week, day 8 starts the next one
+        add_sessions(db, 1, [(at(1), 40, 90, 60), (at(1, 18), 60, 100, 30), (at(2), 50, 95, 45), (at(8), 70, 80, 20)])
+        add_sessions(db, 2, [(at(3), 58, 99, 10)], start_id=10)
+        rollups.apply_session(db, db.get(models.Session, 1), {"wpm": 1, "accuracy_percentage": 1, "duration_secs": 1})
+
+        days = rollups.trend(db, 1, "day", date(2025, 9, 1))
+        assert [(p["period_start"].day, p["sessions"]) for p in days] == [(1, 2), (2, 1), (8, 1)]
+        assert days[0]["avg_wpm"] == 50 and days[0]["best_wpm"] == 60 and days[0]["practice_secs"] == 90
+        weeks = rollups.trend(db, 1, "week", date(2025, 9, 1))
+        assert [(p["period_start"], p["sessions"], p["avg_wpm"]) for p in weeks] == [
+            (date(2025, 9, 1), 3, 50), (date(2025, 9, 8), 1, 70)]
+
+        incremental = {
+            "trend": [rollups.trend(db, u, p, date(2025, 1, 1)) for u in (1, 2) for p in rollups.PERIODS],
+            "board": rollups.leaderboard(db, "avg_wpm", 10),
+        }
+        assert rollups.rebuild(db) == 5
+        assert incremental == {
+            "trend": [rollups.trend(db, u, p, date(2025, 1, 1)) for u in (1, 2) for p in rollups.PERIODS],
+            "board": rollups.leaderboard(db, "avg_wpm", 10),
+        }
+        assert [e["user_id"] for e in rollups.leaderboard(db, "best_wpm", 10)] == [1, 2]
+        assert [e["user_id"] for e in incremental["board"]] == [2, 1]
+        assert rollups.rank_of(db, 1, "avg_wpm") == 2
+        assert rollups.rank_of(db, 2, "avg_wpm", min_sessions=2) is None
+
+
+def test_running_totals_and_progress():
+    with database.SessionLocal() as db:
+        db.add(models.User(id=1, email="1@example.com", password_hash="x"))
+        # (day, wpm, errors, corrections); day 3 arrives last, after day 8 has a running row
+        specs = [(1, 40, 4, 1), (1, 60, 0, 0), (2, 52, 2, 2), (8, 70, 1, 0), (3, 30, 6, 3)]
+        for sid, (day, wpm, errors, corrections) in enumerate(specs, start=1):
+            sess = models.Session(id=sid, user_id=1, target_text="x", started_at=at(day), ended_at=at(day),
+                                  words_per_minute=wpm, accuracy_percentage=90, duration_secs=60,
+                                  error_count=errors, correction_count=corrections)
+            db.add(sess)
+            db.flush()
+            rollups.apply_session(db, sess, {"wpm": wpm, "accuracy_percentage": 90, "duration_secs": 60,
+                                             "error_count": errors, "correction_count": corrections})
+        db.commit()
+
+        def snapshot():
+            return [rollups.running_totals(db, 1, date(2025, 8, 31) + timedelta(days=d)) for d in range(11)]
+
+        incremental = snapshot()
+        assert [t["sessions"] for t in incremental] == [0, 2, 3, 4, 4, 4, 4, 4, 5, 5, 5]
+        assert incremental[8]["error_sum"] == 13 and incremental[8]["correction_sum"] == 6
+        assert incremental[8]["best_wpm"] == 70
+        rollups.rebuild(db)
+        assert snapshot() == incremental
+
+        progress = rollups.progress(db, 1, days=8, today=date(2025, 9, 8))
+        assert progress["sessions_analyzed"] == 5
+        assert progress["avg_wpm"] == pytest.approx(252 / 5)
+        assert progress["total_practice_time"] == 300
+        assert (progress["total_errors"], progress["total_corrections"]) == (13, 6)
+        # 5-wpm buckets reported at their midpoints: 30, 40, 52, 60, 70
+        assert progress["wpm_percentiles"] == {"p10": 32.5, "p50": 52.5, "p90": 72.5}
+        # days 1-4 average 45.5 wpm, days 5-8 70
+        assert progress["improvement_trend"] == "improving"
+        assert [s["id"] for s in progress["recent_sessions"]] == [4, 5, 3, 2, 1]
+
+        # the window drops day 1
+        later = rollups.progress(db, 1, days=8, today=date(2025, 9, 9))
+        assert later["sessions_analyzed"] == 3 and later["avg_wpm"] == pytest.approx(152 / 3)
+        assert rollups.progress(db, 1, days=1, today=date(2025, 9, 8))["improvement_trend"] == "insufficient_data"
+        assert rollups.progress(db, 1, days=30, today=date(2025, 12, 1))["sessions_analyzed"] == 0
+
+
+def test_history_trends_and_leaderboard_endpoints(client):
+    token, user_id = signup_and_get_token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    sids = []
+    for i in range(5):
+        sid = client.post("/typing/sessions/start", json={"prompt": "ab"}, headers=headers).json()["session_id"]
+        evs = [{"key": k, "down_ts": j * 0.5, "up_ts": j * 0.5 + 0.1} for j, k in enumerate("ab"[: 1 + i % 2])]
+        client.post(f"/typing/sessions/{sid}/keystrokes", json=evs, headers=headers)
+        client.post(f"/typing/sessions/{sid}/input", json={"user_input": "ab"[: 1 + i % 2]}, headers=headers)
+        assert client.post(f"/typing/sessions/{sid}/end", headers=headers).status_code == 200
+        sids.append(sid)
+    client.post("/typing/sessions/start", json={"prompt": "open"}, headers=headers)
+
+    seen, cursor = [], None
+    while True:
+        r = client.get("/typing/sessions", params={"limit": 2, **({"cursor": cursor} if cursor else {})},
+                       headers=headers)
+        assert r.status_code == 200, r.text
+        seen += [s["id"] for s in r.json()["sessions"]]
+        cursor = r.json()["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == sids[::-1]
+
+    fast = client.get("/typing/sessions", params={"min_wpm": 100}, headers=headers).json()["sessions"]
+    assert fast and all(s["words_per_minute"] >= 100 for s in fast) and len(fast) < 5
+    assert client.get("/typing/sessions", params={"cursor": "nope"}, headers=headers).status_code == 400
+
+    r = client.get("/typing/sessions/history", params={"limit": 2, "offset": 2}, headers=headers).json()
+    assert r["total_count"] == 5 and [s["id"] for s in r["sessions"]] == sids[::-1][2:4]
+
+    points = client.get("/typing/trends", params={"period": "week"}, headers=headers).json()["points"]
+    assert sum(p["sessions"] for p in points) == 5
+
+    progress = client.get("/typing/analytics/progress", params={"days": 7}, headers=headers).json()
+    assert progress["sessions_analyzed"] == 5 and len(progress["recent_sessions"]) == 5
+    assert progress["avg_wpm"] == pytest.approx(sum(p["avg_wpm"] * p["sessions"] for p in points) / 5)
+    assert client.get("/typing/analytics/progress", params={"days": 0}, headers=headers).status_code == 422
+
+    board = client.get("/typing/leaderboard", headers=headers).json()
+    assert board["your_rank"] == 1 and board["entries"][0]["user_id"] == user_id
+    assert board["entries"][0]["best_wpm"] == pytest.approx(max(s["words_per_minute"] for s in fast))
@@ -0,0 +1,115 @@
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+from app import database, models
+from app.routers import stream
+from tests.test_endpoints import signup_and_get_token
+
+
+def start(client, headers):
+    return client.post("/typing/sessions/start", json={"prompt": "abc"}, headers=headers).json()["session_id"]
+
+
+def test_stream_acks_and_persists_on_close(client):
+    token, _ = signup_and_get_token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    sid = start(client, headers)
+
+    with client.websocket_connect(f"/typing/sessions/{sid}/stream?token={token}") as ws:
+        ws.send_json({"seq": 1, "events": [{"key": "a", "down_ts": 0.0, "up_ts": 0.1}]})
+        ack = ws.receive_json()
+        assert ack == {"type": "ack", "seq": 1, "persisted_seq": -1, "persisted": 0}
+
+        ws.send_json({"seq": 2, "events": [{"key": "b", "down_ts": "x", "up_ts": 0.3}]})
+        err = ws.receive_json()
+        assert err["type"] == "error" and err["seq"] == 2
+
+        ws.send_json({"seq": 2, "events": [{"key": "b", "down_ts": 0.2, "up_ts": 0.3}]})
+        assert ws.receive_json()["seq"] == 2
+        ws.send_json({"type": "flush"})
+        assert ws.receive_json() == {"type": "ack", "seq": 2, "persisted_seq": 2, "persisted": 2}
+
+        ws.send_json({"seq": 3, "events": [{"key": "c", "down_ts": 0.4, "up_ts": 0.5}]})
+        assert ws.receive_json()["persisted_seq"] == 2
+
+    client.post(f"/typing/sessions/{sid}/end", headers=headers)
+    summary = client.get(f"/typing/sessions/{sid}/summary", headers=headers).json()
+    assert summary["keystroke_count"] == 3
+
+
+def test_stream_flushes_by_size(client, monkeypatch):
+    monkeypatch.setattr(stream, "FLUSH_SIZE", 2)
+    token, _ = signup_and_get_token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    sid = start(client, headers)
+
+    with client.websocket_connect(f"/typing/sessions/{sid}/stream?token={token}") as ws:
+        ws.send_json({"seq": 1, "events": [{"key": "a", "down_ts": 0.0, "up_ts": 0.1}]})
+        assert ws.receive_json()["persisted"] == 0
+        ws.send_json({"seq": 2, "events": [{"key": "b", "down_ts": 0.2, "up_ts": 0.3}]})
+        assert ws.receive_json() == {"type": "ack", "seq": 2, "persisted_seq": 2, "persisted": 2}
+
+
+def test_stream_rejects_bad_token(client):
+    token, _ = signup_and_get_token(client)
+    sid = start(client, {"Authorization": f"Bearer {token}"})
+    with pytest.raises(WebSocketDisconnect):
+        with client.websocket_connect(f"/typing/sessions/{sid}/stream?token=nope"):
+            pass
+
+
+def test_stream_flushes_by_time(client, monkeypatch):
+    monkeypatch.setattr(stream, "FLUSH_INTERVAL", 0.05)
+    token, _ = signup_and_get_token(client)
+    sid = start(client, {"Authorization": f"Bearer {token}"})
+
+    with client.websocket_connect(f"/typing/sessions/{sid}/stream?token={token}") as ws:
+        ws.send_json({"seq": 1, "events": [{"key": "a", "down_ts": 0.0, "up_ts": 0.1}]})
+        assert ws.receive_json()["persisted"] == 0
+        assert ws.receive_json() == {"type": "flushed", "seq": None, "persisted_seq": 1, "persisted": 1}
+
+
+def test_stream_survives_bad_frames_and_persists_after_a_failed_write(client, monkeypatch):
+    token, _ = signup_and_get_token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    sid = start(client, headers)
+
+    real_write = stream._write
+    calls = []
+
+    def flaky_write(db, session, events):
+        calls.append(len(events))
+        if len(calls) == 1:
+            raise RuntimeError("database went away")
+        real_write(db, session, events)
+
+    monkeypatch.setattr(stream, "_write", flaky_write)
+    with pytest.raises(RuntimeError):
+        with client.websocket_connect(f"/typing/sessions/{sid}/stream?token={token}") as ws:
+            ws.send_text("not json")
+            assert ws.receive_json()["type"] == "error"
+            ws.send_json({"seq": 1, "events": [{"key": "a", "down_ts": 0.0, "up_ts": 0.1}]})
+            assert ws.receive_json()["seq"] == 1
+            ws.send_json({"type": "flush"})
+            ws.receive_json()
+
+    # the failed flush kept the acked event buffered and the handler's exit wrote it
+    assert calls == [1, 1]
+    client.post(f"/typing/sessions/{sid}/end", headers=headers)
+    assert client.get(f"/typing/sessions/{sid}/summary", headers=headers).json()["keystroke_count"] == 1
+
+
+def test_stream_accepts_seq_zero_and_rejects_negative(client):
+    token, _ = signup_and_get_token(client)
+    sid = start(client, {"Authorization": f"Bearer {token}"})
+
+    with client.websocket_connect(f"/typing/sessions/{sid}/stream?token={token}") as ws:
+        ws.send_json({"seq": -1, "events": [{"key": "x", "down_ts": 0.0, "up_ts": 0.1}]})
+        assert ws.receive_json()["type"] == "error"
+        ws.send_json({"seq": 0, "events": [{"key": "a", "down_ts": 0.0, "up_ts": 0.1}]})
+        assert ws.receive_json() == {"type": "ack", "seq": 0, "persisted_seq": -1, "persisted": 0}
+        ws.send_json({"type": "flush"})
+        assert ws.receive_json() == {"type": "ack", "seq": 0, "persisted_seq": 0, "persisted": 1}
+
+    with database.SessionLocal() as db:
+        assert [e.key for e in db.query(models.KeystrokeEvent).filter_by(session_id=sid)] == ["a"]